@@ -0,0 +1,49 @@
+# Compares capture backends side by side. Under Xvfb, for example:
+#   xvfb-run -s "-screen 0 3840x2160x24" python benchmarks/capture.py
+import os
+import sys
+from statistics import mean, median
+from time import perf_counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from PySide6.QtGui import QGuiApplication  # noqa: E402
+
+from screenshot import capture  # noqa: E402
+
+
+def run(backend: capture.CaptureBackend, rects, rounds: int) -> list[float]:
+    backend.grab(rects)  # warm up, allocates shared segments
+    times = []
+    for _ in range(rounds):
+        start = perf_counter()
+        images = backend.grab(rects)
+        # Touch the pixels, as merging the screenshots would
+        for image in images:
+            image.pixel(image.width() - 1, image.height() - 1)
+        times.append(perf_counter() - start)
+    return times
+
+
+def main() -> None:
+    app = QGuiApplication(sys.argv)
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    rects = [screen.geometry() for screen in app.screens()]
+    pixels = sum(r.width() * r.height() for r in rects)
+    print(f"{len(rects)} screen(s), {pixels/1e6:.1f} MP, {rounds} rounds")
+
+    for cls in capture.availableBackends():
+        try:
+            backend = cls()
+        except OSError as e:
+            print(f"{cls.name:8} unavailable: {e}")
+            continue
+        times = run(backend, rects, rounds)
+        backend.close()
+        print(f"{cls.name:8} mean {mean(times)*1000:7.2f} ms  "
+              f"median {median(times)*1000:7.2f} ms  "
+              f"min {min(times)*1000:7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
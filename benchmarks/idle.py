@@ -0,0 +1,68 @@
+# Measures the idle cost of the resident tray process: CPU time and thread
+# wakeups (context switches) while nothing happens, per hotkey backend.
+# Linux only, reads /proc. Under Xvfb, for example:
+#   xvfb-run python benchmarks/idle.py 30 x11 evdev
+import os
+import subprocess
+import sys
+from time import sleep
+
+MAIN = os.path.join(os.path.dirname(__file__), "..", "src", "main.py")
+TICKS = os.sysconf("SC_CLK_TCK")
+
+
+def sample(pid: int) -> tuple[float, int]:
+    # CPU seconds and context switches summed over all threads
+    cpu, switches = 0.0, 0
+    for tid in os.listdir(f"/proc/{pid}/task"):
+        try:
+            with open(f"/proc/{pid}/task/{tid}/stat") as f:
+                # Fields after the parenthesised command name
+                fields = f.read().rsplit(")", 1)[1].split()
+            cpu += (int(fields[11]) + int(fields[12])) / TICKS
+            with open(f"/proc/{pid}/task/{tid}/status") as f:
+                for line in f:
+                    if line.startswith(("voluntary_ctxt_switches",
+                                        "nonvoluntary_ctxt_switches")):
+                        switches += int(line.split()[1])
+        except FileNotFoundError:
+            pass  # Thread exited while sampling
+    return cpu, switches
+
+
+def measure(pid: int, seconds: float) -> tuple[float, float]:
+    cpu0, switches0 = sample(pid)
+    sleep(seconds)
+    cpu1, switches1 = sample(pid)
+    return (cpu1 - cpu0) / seconds * 100, (switches1 - switches0) / seconds
+
+
+def run(backend: str, seconds: float, settle: float) -> None:
+    env = dict(os.environ)
+    if backend != "auto":
+        env["UNISHOT_HOTKEY_BACKEND"] = backend
+    process = subprocess.Popen([sys.executable, MAIN], env=env)
+    try:
+        sleep(settle)  # Let startup finish
+        if process.poll() is not None:
+            print(f"{backend:8} exited with {process.returncode}")
+            return
+        threads = len(os.listdir(f"/proc/{process.pid}/task"))
+        cpu, wakeups = measure(process.pid, seconds)
+        print(f"{backend:8} cpu {cpu:6.3f} %  wakeups {wakeups:8.1f} /s  "
+              f"threads {threads}")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main() -> None:
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 10
+    backends = sys.argv[2:] or ["auto"]
+    print(f"Idle for {seconds:.0f} s after startup")
+    for backend in backends:
+        run(backend, seconds, settle=3)
+
+
+if __name__ == "__main__":
+    main()
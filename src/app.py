@@ -1,31 +1,33 @@
 from PySide6.QtGui import QIcon, QAction
 from PySide6.QtWidgets import QApplication, QSystemTrayIcon, QMenu
-from PySide6.QtCore import Signal, QObject, QThread
-import global_hotkeys as hotkeys
+from PySide6.QtCore import QTimer
 
 from screenshot.shooter import Screenshooter
 from options.options import OptionsWindow
-
-
-class HotkeyListener(QObject):
-    print_screen = Signal()
-
-    def run(self):
-        hotkeys.register_hotkey(
-            "print_screen", [], self.print_screen.emit
-        )
-        hotkeys.start_checking_hotkeys()
+from typings import ExportStats
+from memory import tracker
+from hotkeys import HotkeyManager
+from watchdog import Watchdog
+import instance
+from instance.server import InstanceServer
+from instance.automation import Automation
 
 
 class Unishot(QApplication):
-    def __init__(self) -> None:
+    def __init__(self, command: list[str] = None) -> None:
         super(Unishot, self).__init__()
+        command = command or []
         self.setQuitOnLastWindowClosed(False)
         self.setOrganizationName("Unishot")
         self.aboutToQuit.connect(self.quitEvent)
 
+        # Started first, so stalls while setting up are caught too
+        self.watchdog = Watchdog()
+        self.watchdog.start()
+
         self.shooter = Screenshooter()
         self.options = OptionsWindow()
+        self.options.watchdogChanged.connect(self.watchdog.start)
 
         menu = QMenu()
         icon = QIcon(":/icons/tray")
@@ -34,6 +36,22 @@ class Unishot(QApplication):
         options_.triggered.connect(self.options.show)
         menu.addAction(options_)
 
+        repeat_ = QAction("Repeat last region")
+        repeat_.triggered.connect(self.repeatRegion)
+        menu.addAction(repeat_)
+
+        reopen_ = QAction("Reopen last capture")
+        reopen_.triggered.connect(lambda: self.runCommand("reopen"))
+        menu.addAction(reopen_)
+
+        restore_ = QAction("Restore interrupted session")
+        restore_.triggered.connect(lambda: self.runCommand("restore"))
+        menu.addAction(restore_)
+
+        memory_ = QAction("Dump memory usage")
+        memory_.triggered.connect(self.dumpMemory)
+        menu.addAction(memory_)
+
         quit_ = QAction("Quit")
         quit_.triggered.connect(self.quit)
         menu.addAction(quit_)
@@ -43,29 +61,100 @@ class Unishot(QApplication):
         self.tray.setContextMenu(menu)
         self.tray.setVisible(True)
         self.tray.activated.connect(self.trayActivated)
+        if self.shooter.journal.recovered:
+            self.tray.showMessage(
+                "Unishot", "The last session was interrupted, "
+                "restore it from the tray menu", self.tray.icon())
+
+        self.shooter.exporter.finished.connect(self.exportFinished)
+        self.shooter.exporter.failed.connect(self.exportFailed)
+        self.shooter.failed.connect(self.showFailure)
+
+        # Hotkeys are delivered by the event loop, no thread is needed.
+        self.hotkeys = HotkeyManager()
+        self.hotkeys.activated.connect(self.runCommand)
+        self.hotkeys.failed.connect(
+            lambda message: self.showFailure("Unable to register hotkeys", message))
+        self.hotkeys.start()
+        self.options.hotkeysChanged.connect(self.hotkeys.start)
+
+        # Later launches forward their command here
+        self.automation = Automation(self.shooter)
+        self.instanceServer = InstanceServer(self.automation)
+        self.instanceServer.command.connect(self.runCommand)
+        if not self.instanceServer.listen() and InstanceServer.running():
+            # Another launch started at the same time and got the socket
+            instance.send(command or ["capture"])
+            QTimer.singleShot(0, self.quit)
+        elif command:
+            QTimer.singleShot(0, lambda: self.runCommand(command[0], command[1:]))
 
-        self.runHotkeyListener()
         self.exec()
 
-    def runHotkeyListener(self) -> None:
-        # Run HotkeyListener in a different thread to prevent freezing.
-        self.hotkeyThread = QThread()
-
-        self.hotkeyListener = HotkeyListener()
-
-        self.hotkeyListener.moveToThread(self.hotkeyThread)
-        self.hotkeyListener.print_screen.connect(self.screenshot)
-
-        self.hotkeyThread.started.connect(self.hotkeyListener.run)
-        self.hotkeyThread.start()
+    def runCommand(self, name: str, args: list[str] = None) -> None:
+        # Hotkeys and command line commands share their names
+        args = args or []
+        match name:
+            case "capture":
+                self.screenshot()
+            case "region":
+                if not self.shooter.active():
+                    self.shooter.captureLastRegion()
+            case "repeat":
+                self.repeatRegion()
+            case "copy":
+                if not self.shooter.active():
+                    self.shooter.copyScreen()
+            case "save":
+                if not self.shooter.active():
+                    self.shooter.saveScreen()
+            case "open":
+                if not self.shooter.active() and args:
+                    self.shooter.openImage(args[0])
+            case "reopen":
+                if not self.shooter.active():
+                    self.shooter.reopenLastCapture()
+            case "restore":
+                if not self.shooter.active():
+                    self.shooter.restoreSession()
 
     def screenshot(self) -> None:
-        if not self.shooter.active():
+        # Doubles as the end of a scrolling capture or a recording
+        if self.shooter.scrollCapture.active():
+            self.shooter.scrollCapture.finish()
+        elif self.shooter.recorder.active():
+            self.shooter.recorder.finish()
+        elif not self.shooter.active():
             self.shooter.activate()
 
+    def repeatRegion(self) -> None:
+        if not self.shooter.active():
+            self.shooter.repeatLastRegion()
+
     def trayActivated(self, activationReason: QSystemTrayIcon) -> None:
         if (activationReason == QSystemTrayIcon.ActivationReason.Trigger):
             self.screenshot()
 
+    def dumpMemory(self) -> None:
+        report = tracker.report()
+        print(report)
+        self.tray.showMessage("Memory usage", report, self.tray.icon())
+
+    def exportFinished(self, stats: ExportStats) -> None:
+        message = f"{stats.FileName} ({stats.Encoder}, " \
+            f"{stats.Size/1024:.1f} KiB in {stats.Time*1000:.0f} ms)"
+        self.tray.showMessage("Screenshot saved", message, self.tray.icon())
+
+    def exportFailed(self, fileName: str) -> None:
+        self.showFailure("Unable to save screenshot", fileName)
+
+    def showFailure(self, title: str, message: str) -> None:
+        self.tray.showMessage(title, message, QSystemTrayIcon.MessageIcon.Warning)
+
     def quitEvent(self) -> None:
-        self.hotkeyThread.quit()
+        self.shooter.exporter.wait()
+        self.shooter.journal.wait()
+        self.hotkeys.stop()
+        self.watchdog.stop()
+        self.instanceServer.server.close()
+        self.automation.close()
@@ -0,0 +1,595 @@
+import ctypes
+import ctypes.util
+import os
+import re
+import sys
+from time import monotonic
+
+from PySide6.QtCore import (QObject, QSettings, QSocketNotifier, Signal, Qt,
+                            QKeyCombination, QCoreApplication,
+                            QAbstractNativeEventFilter)
+from PySide6.QtGui import QKeySequence, QGuiApplication
+
+
+# Binding name: (label, default key sequence)
+BINDINGS = {
+    "capture": ("Capture screen", "Print"),
+    "region": ("Capture last region", "Ctrl+Print"),
+    "repeat": ("Repeat last region", "Shift+Print"),
+    "copy": ("Copy screen instantly", "Ctrl+Shift+Print"),
+    "save": ("Save screen instantly", "Ctrl+Alt+Print"),
+}
+
+
+def binding(name: str) -> str:
+    return QSettings().value("hotkeys/"+name, BINDINGS[name][1])
+
+
+def keyCombination(text: str) -> QKeyCombination:
+    sequence = QKeySequence(text)
+    if sequence.isEmpty():
+        return None
+    return sequence[0]
+
+
+def keyName(combo: QKeyCombination) -> str:
+    # Portable name of the key alone, e.g. "Print", "F5" or "A"
+    return QKeySequence(combo.key()).toString()
+
+
+class HotkeyBackend(QObject):
+    # Grabs key combinations system-wide and reports them by binding name.
+    # Backends wait on the system for key events, none of them polls.
+    pressed = Signal(str)
+
+    name: str = ""
+    label: str = ""
+
+    @staticmethod
+    def available() -> bool:
+        return True
+
+    def register(self, bindings: dict[str, QKeyCombination]) -> list[str]:
+        # Returns the names of bindings that could not be grabbed
+        raise NotImplementedError
+
+    def unregister(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.unregister()
+
+
+class FakeHotkeyBackend(HotkeyBackend):
+    name = "fake"
+    label = "Fake (testing)"
+
+    bindings: dict[str, QKeyCombination]
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.bindings = {}
+
+    def register(self, bindings: dict[str, QKeyCombination]) -> list[str]:
+        self.bindings = dict(bindings)
+        return []
+
+    def unregister(self) -> None:
+        self.bindings = {}
+
+    def press(self, text: str) -> None:
+        combo = keyCombination(text)
+        for name, bound in self.bindings.items():
+            if bound == combo:
+                self.pressed.emit(name)
+
+
+class X11HotkeyBackend(HotkeyBackend):
+    # XGrabKey on the root window. Events are read when the connection's
+    # socket becomes readable, so nothing runs while no key is pressed.
+    name = "x11"
+    label = "X11 key grabs"
+
+    KeyPress = 2
+    GrabModeAsync = 1
+    ShiftMask, LockMask, ControlMask = 1, 2, 4
+    Mod1Mask, Mod2Mask, Mod4Mask = 8, 16, 64
+    # Caps Lock and Num Lock must not stop a hotkey from matching
+    IGNORED = [0, LockMask, Mod2Mask, LockMask | Mod2Mask]
+
+    KEYSYMS = {
+        "PgUp": "Prior", "PgDown": "Next", "Ins": "Insert", "Del": "Delete",
+        "Esc": "Escape", "Backspace": "BackSpace", "Space": "space",
+    }
+
+    class XKeyEvent(ctypes.Structure):
+        _fields_ = [
+            ("type", ctypes.c_int), ("serial", ctypes.c_ulong),
+            ("send_event", ctypes.c_int), ("display", ctypes.c_void_p),
+            ("window", ctypes.c_ulong), ("root", ctypes.c_ulong),
+            ("subwindow", ctypes.c_ulong), ("time", ctypes.c_ulong),
+            ("x", ctypes.c_int), ("y", ctypes.c_int),
+            ("x_root", ctypes.c_int), ("y_root", ctypes.c_int),
+            ("state", ctypes.c_uint), ("keycode", ctypes.c_uint),
+            ("same_screen", ctypes.c_int),
+        ]
+
+    class XEvent(ctypes.Union):
+        pass
+
+    XEvent._fields_ = [
+        ("type", ctypes.c_int), ("xkey", XKeyEvent),
+        ("pad", ctypes.c_long * 24),
+    ]
+
+    ErrorHandler = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.c_void_p, ctypes.c_void_p)
+
+    grabs: dict[tuple[int, int], str]
+
+    @staticmethod
+    def available() -> bool:
+        return sys.platform.startswith("linux") \
+            and bool(os.environ.get("DISPLAY")) \
+            and QGuiApplication.platformName() == "xcb" \
+            and ctypes.util.find_library("X11") is not None
+
+    def __init__(self) -> None:
+        super().__init__()
+        x11 = self.x11 = ctypes.CDLL(ctypes.util.find_library("X11"))
+        x11.XOpenDisplay.restype = ctypes.c_void_p
+        x11.XOpenDisplay.argtypes = [ctypes.c_char_p]
+        x11.XCloseDisplay.argtypes = [ctypes.c_void_p]
+        x11.XDefaultRootWindow.restype = ctypes.c_ulong
+        x11.XDefaultRootWindow.argtypes = [ctypes.c_void_p]
+        x11.XConnectionNumber.argtypes = [ctypes.c_void_p]
+        x11.XStringToKeysym.restype = ctypes.c_ulong
+        x11.XStringToKeysym.argtypes = [ctypes.c_char_p]
+        x11.XKeysymToKeycode.restype = ctypes.c_ubyte
+        x11.XKeysymToKeycode.argtypes = [ctypes.c_void_p, ctypes.c_ulong]
+        x11.XGrabKey.argtypes = [
+            ctypes.c_void_p, ctypes.c_int, ctypes.c_uint, ctypes.c_ulong,
+            ctypes.c_int, ctypes.c_int, ctypes.c_int
+        ]
+        x11.XUngrabKey.argtypes = [
+            ctypes.c_void_p, ctypes.c_int, ctypes.c_uint, ctypes.c_ulong
+        ]
+        x11.XSync.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XPending.argtypes = [ctypes.c_void_p]
+        x11.XNextEvent.argtypes = [ctypes.c_void_p, ctypes.POINTER(self.XEvent)]
+        x11.XSetErrorHandler.restype = ctypes.c_void_p
+        x11.XSetErrorHandler.argtypes = [ctypes.c_void_p]
+
+        self.display = x11.XOpenDisplay(None)
+        if not self.display:
+            raise OSError("Unable to open X display")
+        self.root = x11.XDefaultRootWindow(self.display)
+        self.grabs = {}
+        self.errors = 0
+        self.event = self.XEvent()
+
+        self.notifier = QSocketNotifier(
+            x11.XConnectionNumber(self.display),
+            QSocketNotifier.Type.Read, self
+        )
+        self.notifier.activated.connect(self.dispatch)
+
+    def modifierMask(self, combo: QKeyCombination) -> int:
+        modifiers = combo.keyboardModifiers()
+        mask = 0
+        if modifiers & Qt.KeyboardModifier.ShiftModifier:
+            mask |= self.ShiftMask
+        if modifiers & Qt.KeyboardModifier.ControlModifier:
+            mask |= self.ControlMask
+        if modifiers & Qt.KeyboardModifier.AltModifier:
+            mask |= self.Mod1Mask
+        if modifiers & Qt.KeyboardModifier.MetaModifier:
+            mask |= self.Mod4Mask
+        return mask
+
+    def register(self, bindings: dict[str, QKeyCombination]) -> list[str]:
+        x11 = self.x11
+        failed = []
+
+        # A key grabbed by another client is reported asynchronously as
+        # BadAccess, which would terminate the process by default.
+        def onError(display, error) -> int:
+            self.errors += 1
+            return 0
+        handler = self.ErrorHandler(onError)
+        previous = x11.XSetErrorHandler(ctypes.cast(handler, ctypes.c_void_p))
+
+        try:
+            for name, combo in bindings.items():
+                key = keyName(combo)
+                keysym = x11.XStringToKeysym(self.KEYSYMS.get(key, key).encode())
+                keycode = x11.XKeysymToKeycode(self.display, keysym) if keysym else 0
+                if not keycode:
+                    failed.append(name)
+                    continue
+
+                mask = self.modifierMask(combo)
+                errors = self.errors
+                for ignored in self.IGNORED:
+                    x11.XGrabKey(
+                        self.display, keycode, mask | ignored, self.root,
+                        True, self.GrabModeAsync, self.GrabModeAsync
+                    )
+                x11.XSync(self.display, False)
+
+                if self.errors != errors:
+                    for ignored in self.IGNORED:
+                        x11.XUngrabKey(self.display, keycode, mask | ignored, self.root)
+                    x11.XSync(self.display, False)
+                    failed.append(name)
+                else:
+                    self.grabs[(keycode, mask)] = name
+        finally:
+            x11.XSetErrorHandler(previous)
+
+        # XSync may have queued events without the socket becoming readable
+        self.dispatch()
+        return failed
+
+    def unregister(self) -> None:
+        for keycode, mask in self.grabs:
+            for ignored in self.IGNORED:
+                self.x11.XUngrabKey(self.display, keycode, mask | ignored, self.root)
+        self.grabs = {}
+        self.x11.XSync(self.display, False)
+
+    def dispatch(self) -> None:
+        relevant = self.ShiftMask | self.ControlMask | self.Mod1Mask | self.Mod4Mask
+        while self.x11.XPending(self.display):
+            self.x11.XNextEvent(self.display, ctypes.byref(self.event))
+            if self.event.type != self.KeyPress:
+                continue
+            key = self.event.xkey
+            name = self.grabs.get((key.keycode, key.state & relevant))
+            if name:
+                self.pressed.emit(name)
+
+    def close(self) -> None:
+        if self.display:
+            self.unregister()
+            self.notifier.setEnabled(False)
+            self.x11.XCloseDisplay(self.display)
+            self.display = None
+
+
+class EvdevHotkeyBackend(HotkeyBackend):
+    # Reads keyboards under /dev/input directly, which also works on
+    # Wayland. The user needs read access to the devices, usually through
+    # the input group. Keys are observed, not grabbed.
+    name = "evdev"
+    label = "evdev (input devices)"
+
+    KEYS = {
+        "Print": ["KEY_SYSRQ", "KEY_PRINT"], "PgUp": ["KEY_PAGEUP"],
+        "PgDown": ["KEY_PAGEDOWN"], "Ins": ["KEY_INSERT"],
+        "Del": ["KEY_DELETE"], "Esc": ["KEY_ESC"], "Return": ["KEY_ENTER"],
+    }
+    MODIFIERS = {
+        "KEY_LEFTSHIFT": "shift", "KEY_RIGHTSHIFT": "shift",
+        "KEY_LEFTCTRL": "ctrl", "KEY_RIGHTCTRL": "ctrl",
+        "KEY_LEFTALT": "alt", "KEY_RIGHTALT": "alt",
+        "KEY_LEFTMETA": "meta", "KEY_RIGHTMETA": "meta",
+    }
+
+    bindings: dict[tuple[int, frozenset], str]
+    held: set[int]
+
+    @staticmethod
+    def available() -> bool:
+        if not sys.platform.startswith("linux"):
+            return False
+        try:
+            import evdev
+        except ImportError:
+            return False
+        return any(os.access(path, os.R_OK) for path in evdev.list_devices())
+
+    def __init__(self) -> None:
+        super().__init__()
+        import evdev
+        self.ecodes = evdev.ecodes
+        self.modifiers = {
+            self.ecodes.ecodes[key]: group for key, group in self.MODIFIERS.items()
+        }
+        self.bindings = {}
+        self.held = set()
+        self.devices = []
+        self.notifiers = []
+
+        for path in evdev.list_devices():
+            try:
+                device = evdev.InputDevice(path)
+            except OSError:
+                continue
+            keys = device.capabilities().get(self.ecodes.EV_KEY, [])
+            if self.ecodes.KEY_A not in keys:
+                device.close()  # Not a keyboard
+                continue
+            notifier = QSocketNotifier(
+                device.fd, QSocketNotifier.Type.Read, self
+            )
+            notifier.activated.connect(
+                lambda _, device=device, notifier=notifier:
+                    self.read(device, notifier)
+            )
+            self.devices.append(device)
+            self.notifiers.append(notifier)
+
+        if not self.devices:
+            raise OSError("No readable keyboard devices")
+
+    def register(self, bindings: dict[str, QKeyCombination]) -> list[str]:
+        failed = []
+        for name, combo in bindings.items():
+            key = keyName(combo)
+            codes = [
+                self.ecodes.ecodes[k]
+                for k in self.KEYS.get(key, ["KEY_" + key.upper()])
+                if k in self.ecodes.ecodes
+            ]
+            if not codes:
+                failed.append(name)
+                continue
+
+            modifiers = combo.keyboardModifiers()
+            groups = frozenset(group for group, flag in [
+                ("shift", Qt.KeyboardModifier.ShiftModifier),
+                ("ctrl", Qt.KeyboardModifier.ControlModifier),
+                ("alt", Qt.KeyboardModifier.AltModifier),
+                ("meta", Qt.KeyboardModifier.MetaModifier),
+            ] if modifiers & flag)
+            for code in codes:
+                self.bindings[(code, groups)] = name
+        return failed
+
+    def unregister(self) -> None:
+        self.bindings = {}
+
+    def read(self, device, notifier: QSocketNotifier) -> None:
+        try:
+            events = list(device.read())
+        except BlockingIOError:
+            return
+        except OSError:
+            notifier.setEnabled(False)  # Unplugged
+            return
+
+        for event in events:
+            if event.type != self.ecodes.EV_KEY:
+                continue
+            if event.value == 0:
+                self.held.discard(event.code)
+            elif event.value == 1:  # Autorepeat is 2
+                self.held.add(event.code)
+                groups = frozenset(
+                    self.modifiers[code] for code in self.held
+                    if code in self.modifiers
+                )
+                name = self.bindings.get((event.code, groups))
+                if name:
+                    self.pressed.emit(name)
+
+    def close(self) -> None:
+        self.unregister()
+        for notifier in self.notifiers:
+            notifier.setEnabled(False)
+        for device in self.devices:
+            device.close()
+        self.devices, self.notifiers = [], []
+
+
+class Win32HotkeyBackend(HotkeyBackend):
+    # RegisterHotKey posts WM_HOTKEY to the GUI thread's message queue,
+    # where Qt's event dispatcher hands it to a native event filter.
+    name = "win32"
+    label = "Windows RegisterHotKey"
+
+    WM_HOTKEY = 0x0312
+    MOD_ALT, MOD_CONTROL, MOD_SHIFT, MOD_WIN = 0x1, 0x2, 0x4, 0x8
+    MOD_NOREPEAT = 0x4000
+    VIRTUAL_KEYS = {
+        "Print": 0x2C, "Pause": 0x13, "Ins": 0x2D, "Del": 0x2E,
+        "Home": 0x24, "End": 0x23, "PgUp": 0x21, "PgDown": 0x22,
+        "Space": 0x20, "Esc": 0x1B, "Return": 0x0D, "Backspace": 0x08,
+    }
+
+    class Filter(QAbstractNativeEventFilter):
+        def __init__(self, backend: "Win32HotkeyBackend") -> None:
+            super().__init__()
+            self.backend = backend
+
+        def nativeEventFilter(self, eventType, message):
+            if eventType == b"windows_generic_MSG":
+                from ctypes import wintypes
+                msg = wintypes.MSG.from_address(int(message))
+                if msg.message == self.backend.WM_HOTKEY:
+                    name = self.backend.ids.get(msg.wParam)
+                    if name:
+                        self.backend.pressed.emit(name)
+                        return True, 0
+            return False, 0
+
+    ids: dict[int, str]
+
+    @staticmethod
+    def available() -> bool:
+        return sys.platform == "win32"
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.user32 = ctypes.windll.user32
+        self.ids = {}
+        self.filter = self.Filter(self)
+        QCoreApplication.instance().installNativeEventFilter(self.filter)
+
+    def virtualKey(self, key: str) -> int:
+        if key in self.VIRTUAL_KEYS:
+            return self.VIRTUAL_KEYS[key]
+        if len(key) == 1 and key.isalnum():
+            return ord(key.upper())
+        match = re.fullmatch(r"F(\d+)", key)
+        if match and 1 <= int(match[1]) <= 24:
+            return 0x6F + int(match[1])
+        return 0
+
+    def register(self, bindings: dict[str, QKeyCombination]) -> list[str]:
+        failed = []
+        for name, combo in bindings.items():
+            vk = self.virtualKey(keyName(combo))
+            modifiers = combo.keyboardModifiers()
+            mods = self.MOD_NOREPEAT
+            if modifiers & Qt.KeyboardModifier.AltModifier:
+                mods |= self.MOD_ALT
+            if modifiers & Qt.KeyboardModifier.ControlModifier:
+                mods |= self.MOD_CONTROL
+            if modifiers & Qt.KeyboardModifier.ShiftModifier:
+                mods |= self.MOD_SHIFT
+            if modifiers & Qt.KeyboardModifier.MetaModifier:
+                mods |= self.MOD_WIN
+
+            id = len(self.ids) + 1
+            if vk and self.user32.RegisterHotKey(None, id, mods, vk):
+                self.ids[id] = name
+            else:
+                failed.append(name)
+        return failed
+
+    def unregister(self) -> None:
+        for id in self.ids:
+            self.user32.UnregisterHotKey(None, id)
+        self.ids = {}
+
+    def close(self) -> None:
+        self.unregister()
+        QCoreApplication.instance().removeNativeEventFilter(self.filter)
+
+
+class PollHotkeyBackend(HotkeyBackend):
+    # The global_hotkeys package, which checks key states every 20 ms on a
+    # thread of its own. Only used when nothing event driven is available.
+    name = "poll"
+    label = "global_hotkeys (polling)"
+
+    KEYS = {
+        "Print": "print_screen", "PgUp": "page_up", "PgDown": "page_down",
+        "Ins": "insert", "Del": "delete", "Esc": "escape",
+    }
+
+    @staticmethod
+    def available() -> bool:
+        try:
+            import global_hotkeys
+        except ImportError:
+            return False
+        return True
+
+    def __init__(self) -> None:
+        super().__init__()
+        import global_hotkeys
+        self.hotkeys = global_hotkeys
+        self.checking = False
+
+    def register(self, bindings: dict[str, QKeyCombination]) -> list[str]:
+        for name, combo in bindings.items():
+            key = keyName(combo)
+            modifiers = combo.keyboardModifiers()
+            mods = [mod for mod, flag in [
+                ("control", Qt.KeyboardModifier.ControlModifier),
+                ("shift", Qt.KeyboardModifier.ShiftModifier),
+                ("alt", Qt.KeyboardModifier.AltModifier),
+            ] if modifiers & flag]
+            # Called on the checker thread, the signal is queued
+            self.hotkeys.register_hotkey(
+                self.KEYS.get(key, key.lower()), mods,
+                lambda name=name: self.pressed.emit(name)
+            )
+        # A second start would add a second checker thread
+        if not self.checking:
+            self.hotkeys.start_checking_hotkeys()
+            self.checking = True
+        return []
+
+    def unregister(self) -> None:
+        if self.checking:
+            self.hotkeys.stop_checking_hotkeys()
+            self.checking = False
+        self.hotkeys.clear_hotkeys()
+
+
+BACKENDS = [Win32HotkeyBackend, X11HotkeyBackend, EvdevHotkeyBackend,
+            PollHotkeyBackend, FakeHotkeyBackend]
+
+
+def availableBackends() -> list[type[HotkeyBackend]]:
+    return [b for b in BACKENDS if b.available()]
+
+
+def backend() -> HotkeyBackend:
+    # Selected with the UNISHOT_HOTKEY_BACKEND variable or in the options,
+    # otherwise the first event driven backend available.
+    name = os.environ.get("UNISHOT_HOTKEY_BACKEND") \
+        or QSettings().value("hotkeys/backend", "")
+    candidates = [cls for cls in availableBackends() if cls.name == name] + [
+        cls for cls in availableBackends()
+        if cls.name != name and cls is not FakeHotkeyBackend
+    ]
+    for cls in candidates:
+        try:
+            return cls()
+        except OSError:
+            continue  # The next one may do
+    return None
+
+
+class HotkeyManager(QObject):
+    # Owns the backend and the configured bindings. Repeated presses of
+    # the same binding within DEBOUNCE seconds are dropped, which covers
+    # keyboard autorepeat and bouncing keys.
+    activated = Signal(str)
+    # Bindings that do not work, with why, for the user to hear about
+    failed = Signal(str)
+
+    DEBOUNCE = 0.3
+
+    backend: HotkeyBackend
+    last: dict[str, float]
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.backend = None
+        self.last = {}
+
+    def start(self) -> None:
+        self.stop()
+        self.backend = backend()
+        if self.backend is None:
+            self.failed.emit("No global hotkey backend is available")
+            return
+        self.backend.pressed.connect(self.pressed)
+
+        bindings = {}
+        for name in BINDINGS:
+            combo = keyCombination(binding(name))
+            if combo is not None:
+                bindings[name] = combo
+        failed = self.backend.register(bindings)
+        if failed:
+            self.failed.emit(", ".join(
+                f"{binding(name)} ({name})" for name in failed))
+
+    def stop(self) -> None:
+        if self.backend is not None:
+            self.backend.close()
+            self.backend.deleteLater()
+            self.backend = None
+
+    def pressed(self, name: str) -> None:
+        now = monotonic()
+        if now - self.last.get(name, float("-inf")) < self.DEBOUNCE:
+            return
+        self.last[name] = now
+        self.activated.emit(name)
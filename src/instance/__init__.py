@@ -0,0 +1,102 @@
+# Single instance control. The running app listens on a local socket, a
+# second launch forwards its command there and exits. This side only uses
+# the standard library, so forwarding never has to load Qt, the listening
+# side is in instance.server.
+#
+# Messages are framed by a 4 byte little endian length. A command is its
+# fields separated by NUL, which can not be part of a path. Automation
+# requests get a JSON reply, see instance.client.
+import os
+import socket
+import struct
+import sys
+
+COMMANDS = ["capture", "region", "repeat", "copy", "save", "open", "reopen",
+            "restore"]
+USAGE = "usage: main.py [capture | region | repeat | copy | save | open FILE " \
+    "| reopen | restore]"
+
+
+def serverName() -> str:
+    # A named pipe on Windows, a socket file elsewhere
+    user = os.environ.get("USERNAME") or os.environ.get("USER") or "user"
+    name = f"unishot-{user}"
+    if sys.platform == "win32":
+        return name
+    directory = os.environ.get("XDG_RUNTIME_DIR") \
+        or os.environ.get("TMPDIR") or "/tmp"
+    return os.path.join(directory, name + ".sock")
+
+
+def parseArgs(args: list[str]) -> list[str]:
+    # [] when started without a command, None when the command is invalid
+    if not args:
+        return []
+    if args[0] not in COMMANDS:
+        return None
+    if args[0] == "open":
+        if len(args) != 2:
+            return None
+        # The running instance has a different working directory
+        return ["open", os.path.abspath(args[1])]
+    return args[:1]
+
+
+def frame(payload: bytes) -> bytes:
+    return struct.pack("<I", len(payload)) + payload
+
+
+def unframe(buffer: bytes) -> tuple[bytes, bytes]:
+    # (payload, rest), or (None, buffer) while the payload is incomplete
+    if len(buffer) < 4:
+        return None, buffer
+    size = struct.unpack("<I", buffer[:4])[0]
+    if len(buffer) < 4 + size:
+        return None, buffer
+    return buffer[4:4 + size], buffer[4 + size:]
+
+
+class Connection():
+    def __init__(self, timeout: float = 1) -> None:
+        if sys.platform == "win32":
+            self.pipe = open("\\\\.\\pipe\\" + serverName(), "r+b", buffering=0)
+            self.sock = None
+        else:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.settimeout(timeout)
+            try:
+                self.sock.connect(serverName())
+            except OSError:
+                self.sock.close()
+                raise
+
+    def write(self, data: bytes) -> None:
+        if self.sock is None:
+            self.pipe.write(data)
+        else:
+            self.sock.sendall(data)
+
+    def read(self) -> bytes:
+        data = self.pipe.read(65536) if self.sock is None else self.sock.recv(65536)
+        if not data:
+            raise ConnectionError("Connection closed by the running instance")
+        return data
+
+    def close(self) -> None:
+        (self.pipe if self.sock is None else self.sock).close()
+
+    def __enter__(self) -> "Connection":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+
+def send(command: list[str]) -> bool:
+    # False when no instance is running
+    try:
+        with Connection() as connection:
+            connection.write(frame("\0".join(command).encode()))
+    except OSError:
+        return False
+    return True
@@ -0,0 +1,151 @@
+import os
+from collections import OrderedDict
+from multiprocessing import shared_memory
+from time import time
+
+from PySide6.QtCore import QObject, QRect, QSettings, QTimer
+from PySide6.QtGui import QImage, QPainter, QGuiApplication
+
+from memory import tracker
+
+
+class Automation(QObject):
+    # Local automation of the running instance: grab the screens, list the
+    # recent captures and fetch their pixels. Pixels are handed over in a
+    # shared memory segment as RGBA8888, never encoded. Copied and saved
+    # screenshots are only kept when the settings ask for it, otherwise
+    # the idle process would hold a few full-size images. Grabs are kept
+    # apart from them, until the client releases them or they expire.
+    REQUESTS = ["grab", "list", "fetch", "release"]
+    FORMAT = QImage.Format.Format_RGBA8888
+
+    captures: OrderedDict[int, tuple[float, str, QImage]]
+    segments: dict[int, shared_memory.SharedMemory]
+    nextId: int
+    timer: QTimer
+
+    def __init__(self, shooter) -> None:
+        super().__init__()
+        self.shooter = shooter
+        self.captures = OrderedDict()
+        self.segments = {}
+        self.nextId = 1
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.expire)
+        shooter.captured.connect(self.record)
+
+    def limit(self) -> int:
+        # Copied and saved screenshots kept, 0 keeps only grabs
+        return max(0, int(QSettings().value("automation/recentCaptures", 0)))
+
+    def grabSeconds(self) -> int:
+        # How long a grab the client never released is kept
+        return max(1, int(QSettings().value("automation/grabSeconds", 60)))
+
+    def record(self, image: QImage, source: str) -> int:
+        # None when the screenshot is not kept
+        if source != "automation" and self.limit() == 0:
+            return None
+        id = self.nextId
+        self.nextId += 1
+        self.captures[id] = (time(), source, image)
+        recent = [id for id, c in self.captures.items() if c[1] != "automation"]
+        for oldest in recent[:max(0, len(recent) - self.limit())]:
+            self.drop(oldest)
+        if source == "automation" and not self.timer.isActive():
+            self.timer.start(self.grabSeconds() * 1000)
+        self.track()
+        return id
+
+    def drop(self, id: int) -> None:
+        self.captures.pop(id, None)
+        self.releaseSegment(id)
+
+    def expire(self) -> None:
+        # Drops grabs past their time and waits for the next one to be
+        now = time()
+        for id, (t, source, _) in list(self.captures.items()):
+            if source == "automation" and now - t >= self.grabSeconds():
+                self.drop(id)
+        grabs = [t for t, source, _ in self.captures.values() if source == "automation"]
+        if grabs:
+            self.timer.start(max(0, int(
+                (min(grabs) + self.grabSeconds() - now) * 1000)))
+        self.track()
+
+    def track(self) -> None:
+        tracker.track(
+            "Automation", "captures", [c[2] for c in self.captures.values()]
+        )
+
+    def handle(self, request: str, args: list[str]) -> dict:
+        match request:
+            case "grab":
+                return self.grab(args)
+            case "list":
+                return {"captures": [
+                    {"id": id, "time": t, "source": source,
+                     "width": image.width(), "height": image.height()}
+                    for id, (t, source, image) in self.captures.items()
+                ]}
+            case "fetch":
+                return self.fetch(int(args[0]))
+            case "release":
+                # A grab is done with, a kept screenshot stays listed
+                id = int(args[0])
+                if id in self.captures and self.captures[id][1] == "automation":
+                    self.drop(id)
+                    self.track()
+                else:
+                    self.releaseSegment(id)
+                return {}
+
+    def grab(self, args: list[str]) -> dict:
+        # All screens, or x y width height in global logical coordinates
+        if args:
+            if len(args) != 4:
+                raise ValueError("grab takes x, y, width and height, or nothing")
+            region = QRect(*[int(a) for a in args])
+        else:
+            region = QGuiApplication.primaryScreen().virtualGeometry()
+        image = self.shooter.grabRegion(region)
+        if image is None:
+            raise ValueError("Region is not on any screen")
+        return {"id": self.record(image, "automation")}
+
+    def fetch(self, id: int) -> dict:
+        if id not in self.captures:
+            raise ValueError(f"No recent capture {id}")
+        _, _, image = self.captures[id]
+        w, h = image.width(), image.height()
+
+        segment = self.segments.get(id)
+        if segment is None:
+            segment = shared_memory.SharedMemory(
+                f"unishot-{os.getpid()}-{id}", create=True, size=max(1, w*h*4)
+            )
+            # Converted straight into the segment, the only copy made
+            target = QImage(segment.buf, w, h, w*4, self.FORMAT)
+            painter = QPainter(target)
+            painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_Source)
+            painter.drawImage(0, 0, image)
+            painter.end()
+            del target
+            self.segments[id] = segment
+
+        return {"id": id, "segment": segment.name, "width": w, "height": h,
+                "stride": w*4, "format": "RGBA8888"}
+
+    def releaseSegment(self, id: int) -> None:
+        segment = self.segments.pop(id, None)
+        if segment is not None:
+            segment.close()
+            segment.unlink()
+
+    def close(self) -> None:
+        self.timer.stop()
+        for id in list(self.segments):
+            self.releaseSegment(id)
+        self.captures.clear()
+        tracker.release("Automation")
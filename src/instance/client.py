@@ -0,0 +1,78 @@
+# Automation client for a running instance, standard library only:
+#
+#   from instance import client
+#   id = client.grab()
+#   with client.fetch(id) as capture:
+#       pixels = capture.data  # RGBA8888 rows, capture.stride bytes apart
+import json
+import sys
+from multiprocessing import shared_memory
+
+from . import Connection, frame, unframe
+
+
+def request(*fields) -> dict:
+    with Connection(timeout=10) as connection:
+        connection.write(frame("\0".join(str(f) for f in fields).encode()))
+        payload, buffer = None, b""
+        while payload is None:
+            buffer += connection.read()
+            payload, buffer = unframe(buffer)
+    reply = json.loads(payload)
+    if "error" in reply:
+        raise RuntimeError(reply["error"])
+    return reply
+
+
+def grab(x: int = None, y: int = None, width: int = None, height: int = None) -> int:
+    # All screens by default, returns the id of the new capture
+    region = [] if x is None else [x, y, width, height]
+    return request("grab", *region)["id"]
+
+
+def captures() -> list[dict]:
+    # Most recent last, each with id, time, source, width and height
+    return request("list")["captures"]
+
+
+class Capture():
+    # Pixels of a capture, mapped from the instance's shared memory.
+    # Close it, or use it as a context manager, once done.
+    def __init__(self, reply: dict) -> None:
+        self.id = reply["id"]
+        self.width = reply["width"]
+        self.height = reply["height"]
+        self.stride = reply["stride"]
+        self.format = reply["format"]
+        self.segment = attach(reply["segment"])
+        self.data = self.segment.buf[:self.stride * self.height]
+
+    def close(self) -> None:
+        if self.segment is None:
+            return
+        self.data.release()
+        self.segment.close()
+        self.segment = None
+        request("release", self.id)
+
+    def __enter__(self) -> "Capture":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+
+def fetch(id: int) -> Capture:
+    return Capture(request("fetch", id))
+
+
+def attach(name: str) -> shared_memory.SharedMemory:
+    # The segment belongs to the instance, which unlinks it. Up to Python
+    # 3.12 attaching registers it for cleanup in this process too.
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name, track=False)
+    segment = shared_memory.SharedMemory(name)
+    if sys.platform != "win32":
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(segment._name, "shared_memory")
+    return segment
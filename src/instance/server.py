@@ -0,0 +1,81 @@
+import json
+
+from PySide6.QtCore import QObject, Signal
+from PySide6.QtNetwork import QLocalServer, QLocalSocket
+
+from . import serverName, frame, unframe, COMMANDS
+from .automation import Automation
+
+
+class InstanceServer(QObject):
+    # Receives the commands of later launches and automation requests.
+    # Commands are fire and forget, requests are answered with JSON.
+    command = Signal(str, list)
+
+    server: QLocalServer
+    buffers: dict[QLocalSocket, bytes]
+    automation: Automation
+
+    def __init__(self, automation: Automation = None) -> None:
+        super().__init__()
+        self.automation = automation
+        self.server = QLocalServer(self)
+        self.server.setSocketOptions(QLocalServer.SocketOption.UserAccessOption)
+        self.server.newConnection.connect(self.newConnection)
+        self.buffers = {}
+
+    def listen(self) -> bool:
+        # False when another instance listens already, or on failure. With
+        # access options Qt moves its socket over an existing one, so a live
+        # instance is looked for first.
+        name = serverName()
+        if self.running():
+            return False
+        # Left behind by an instance that did not quit cleanly
+        QLocalServer.removeServer(name)
+        return self.server.listen(name)
+
+    @staticmethod
+    def running() -> bool:
+        # Whether a live instance accepts connections on the socket
+        socket = QLocalSocket()
+        socket.connectToServer(serverName())
+        alive = socket.waitForConnected(500)
+        socket.abort()
+        return alive
+
+    def newConnection(self) -> None:
+        while self.server.hasPendingConnections():
+            socket = self.server.nextPendingConnection()
+            self.buffers[socket] = b""
+            socket.readyRead.connect(lambda socket=socket: self.read(socket))
+            socket.disconnected.connect(lambda socket=socket: self.close(socket))
+            self.read(socket)
+
+    def read(self, socket: QLocalSocket) -> None:
+        if socket not in self.buffers:
+            return
+        payload, self.buffers[socket] = unframe(
+            self.buffers[socket] + socket.readAll().data()
+        )
+        while payload is not None:
+            self.handle(socket, payload.decode(errors="replace").split("\0"))
+            payload, self.buffers[socket] = unframe(self.buffers[socket])
+
+    def handle(self, socket: QLocalSocket, fields: list[str]) -> None:
+        if fields == [""]:
+            return  # Empty, nothing to do
+        if fields[0] in COMMANDS:
+            self.command.emit(fields[0], fields[1:])
+        elif self.automation is not None and fields[0] in Automation.REQUESTS:
+            try:
+                reply = self.automation.handle(fields[0], fields[1:])
+            except (ValueError, KeyError, IndexError) as e:
+                reply = {"error": str(e)}
+            socket.write(frame(json.dumps(reply).encode()))
+            socket.flush()
+        # Anything else is from a different version, and ignored
+
+    def close(self, socket: QLocalSocket) -> None:
+        self.buffers.pop(socket, None)
+        socket.deleteLater()
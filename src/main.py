@@ -1,5 +1,15 @@
 if __name__ == "__main__":
     import sys
+    import instance
+
+    command = instance.parseArgs(sys.argv[1:])
+    if command is None:
+        sys.exit(instance.USAGE)
+    # Hand the command to a running instance, without loading Qt. Launching
+    # it again without a command captures.
+    if instance.send(command or ["capture"]):
+        sys.exit(0)
+
     import rc_icons
     from app import Unishot
-    sys.exit(Unishot())
+    sys.exit(Unishot(command))
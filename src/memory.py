@@ -0,0 +1,129 @@
+import ctypes
+import os
+import sys
+
+from PySide6.QtCore import QObject, Signal, Qt, QByteArray
+from PySide6.QtGui import QPixmap, QImage
+from PySide6.QtWidgets import QLabel, QWidget
+
+
+def bufferBytes(buffer: QPixmap | QImage | QByteArray | None) -> int:
+    if buffer is None or buffer.isNull():
+        return 0
+    if isinstance(buffer, QImage):
+        return buffer.sizeInBytes()
+    if isinstance(buffer, QByteArray):
+        return buffer.size()
+    return buffer.width() * buffer.height() * buffer.depth() // 8
+
+
+class PixelBufferTracker(QObject):
+    # Accounts bytes of large pixel buffers, grouped by owner.
+    changed = Signal()
+
+    buffers: dict[str, dict[str, int]]
+    peaks: dict[str, int]
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.buffers = {}
+        self.peaks = {}
+
+    def track(self, owner: str, name: str,
+              buffers: QPixmap | QImage | QByteArray | list | None) -> None:
+        if not isinstance(buffers, list):
+            buffers = [buffers]
+        self.buffers.setdefault(owner, {})[name] = sum(
+            bufferBytes(b) for b in buffers
+        )
+
+        total = self.ownerBytes(owner)
+        self.peaks[owner] = max(self.peaks.get(owner, 0), total)
+        self.changed.emit()
+
+    def release(self, owner: str, name: str = None) -> None:
+        if name is None:
+            self.buffers.pop(owner, None)
+        else:
+            self.buffers.get(owner, {}).pop(name, None)
+        self.changed.emit()
+
+    def ownerBytes(self, owner: str) -> int:
+        return sum(self.buffers.get(owner, {}).values())
+
+    def totalBytes(self) -> int:
+        return sum(self.ownerBytes(owner) for owner in self.buffers)
+
+    def report(self) -> str:
+        lines = []
+        for owner, buffers in self.buffers.items():
+            lines.append(
+                f"{owner}: {formatBytes(self.ownerBytes(owner))} "
+                f"(peak {formatBytes(self.peaks.get(owner, 0))})"
+            )
+            for name, size in buffers.items():
+                lines.append(f"    {name}: {formatBytes(size)}")
+        lines.append(f"Total: {formatBytes(self.totalBytes())}")
+        resident = residentBytes()
+        if resident:
+            lines.append(f"Resident: {formatBytes(resident)}")
+        return "\n".join(lines)
+
+
+def formatBytes(size: int) -> str:
+    return f"{size/1024/1024:.1f} MiB"
+
+
+def residentBytes() -> int:
+    # Current resident set size of the process, 0 where unknown
+    if sys.platform.startswith("linux"):
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    if sys.platform == "win32":
+        from ctypes import wintypes
+
+        class Counters(ctypes.Structure):
+            _fields_ = [
+                ("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                ("PeakWorkingSetSize", ctypes.c_size_t),
+                ("WorkingSetSize", ctypes.c_size_t),
+                ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                ("PagefileUsage", ctypes.c_size_t),
+                ("PeakPagefileUsage", ctypes.c_size_t),
+            ]
+        counters = Counters()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(
+            process, ctypes.byref(counters), counters.cb
+        ):
+            return counters.WorkingSetSize
+    return 0
+
+
+tracker = PixelBufferTracker()
+
+
+class MemoryOverlay(QLabel):
+    def __init__(self, parent: QWidget) -> None:
+        super().__init__(parent)
+        self.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents)
+        self.setStyleSheet(
+            "background-color: rgba(0, 0, 0, 170); color: white;"
+            "font-family: monospace; padding: 4px")
+        self.hide()
+        tracker.changed.connect(self.refresh)
+
+    def refresh(self) -> None:
+        if self.isVisible():
+            self.setText(tracker.report())
+            self.adjustSize()
+            self.raise_()
+
+    def showEvent(self, event) -> None:
+        self.setText(tracker.report())
+        self.adjustSize()
+        self.raise_()
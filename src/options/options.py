@@ -1,10 +1,20 @@
-from PySide6.QtWidgets import QWidget, QTabWidget, QBoxLayout, QCheckBox
-from PySide6.QtCore import QSettings
+from PySide6.QtWidgets import (QWidget, QTabWidget, QBoxLayout, QCheckBox,
+                               QFormLayout, QSpinBox, QComboBox,
+                               QKeySequenceEdit, QLineEdit)
+from PySide6.QtCore import QSettings, Signal
+from PySide6.QtGui import QKeySequence
 
 from . import startup
+import hotkeys
+from screenshot import capture
+from screenshot import edges
+from screenshot import quicksave
 
 
 class OptionsWindow(QTabWidget):
+    hotkeysChanged = Signal()
+    watchdogChanged = Signal()
+
     settings: QSettings
 
     def __init__(self) -> None:
@@ -22,8 +32,199 @@ class OptionsWindow(QTabWidget):
 
         generalLayout.addWidget(launchOnStartup)
 
+        backendLayout = QFormLayout()
+        captureBackend = QComboBox()
+        for backend in capture.availableBackends():
+            captureBackend.addItem(backend.label, backend.name)
+        captureBackend.setCurrentIndex(max(0, captureBackend.findData(
+            self.settings.value("capture/backend", "qt"))))
+        captureBackend.currentIndexChanged.connect(
+            lambda _: self.settings.setValue(
+                "capture/backend", captureBackend.currentData()))
+        backendLayout.addRow("Capture backend", captureBackend)
+
+        repeatAction = QComboBox()
+        repeatAction.addItem("Copy to clipboard", "copy")
+        repeatAction.addItem("Save to...", "save")
+        repeatAction.addItem("Quick-save", "quicksave")
+        repeatAction.addItem("Open pre-selected", "overlay")
+        repeatAction.setCurrentIndex(max(0, repeatAction.findData(
+            self.settings.value("capture/repeatAction", "copy"))))
+        repeatAction.currentIndexChanged.connect(
+            lambda _: self.settings.setValue(
+                "capture/repeatAction", repeatAction.currentData()))
+        repeatAction.setToolTip(hotkeys.binding("repeat"))
+        backendLayout.addRow("Repeat last region", repeatAction)
+        generalLayout.addLayout(backendLayout)
+
+        windowSnap = QCheckBox("Snap selection to windows")
+        windowSnap.setChecked(
+            self.settings.value("selection/windowSnap", True, type=bool))
+        windowSnap.toggled.connect(
+            lambda on: self.settings.setValue("selection/windowSnap", on))
+        generalLayout.addWidget(windowSnap)
+
+        edgeSnap = QCheckBox("Snap selection borders to edges (hold Alt to disable)")
+        edgeSnap.setChecked(
+            self.settings.value("selection/edgeSnap", True, type=bool))
+        edgeSnap.toggled.connect(
+            lambda on: self.settings.setValue("selection/edgeSnap", on))
+        edgeSnap.setEnabled(edges.np is not None)  # numpy is optional
+        generalLayout.addWidget(edgeSnap)
+
+        retentionLayout = QFormLayout()
+        retention = QComboBox()
+        retention.addItem("Release immediately", "release")
+        retention.addItem("Keep for a while", "keep")
+        retention.addItem("Keep compressed", "compress")
+        retention.setCurrentIndex(max(0, retention.findData(
+            self.settings.value("memory/retention", "release"))))
+        retention.currentIndexChanged.connect(
+            lambda _: self.settings.setValue(
+                "memory/retention", retention.currentData()))
+        retention.setToolTip(
+            "What is kept of the last capture once the overlay closes, "
+            "to reopen it from the tray menu")
+        retentionLayout.addRow("Last capture", retention)
+
+        keepSeconds = self.settingSpinBox("memory/keepSeconds", 30, 1, 3600)
+        keepSeconds.setSuffix(" s")
+        retentionLayout.addRow("Keep for", keepSeconds)
+        generalLayout.addLayout(retentionLayout)
+
+        automationLayout = QFormLayout()
+        recentCaptures = self.settingSpinBox(
+            "automation/recentCaptures", 0, 0, 20)
+        recentCaptures.setToolTip(
+            "Copied and saved screenshots automation clients can fetch, "
+            "held in memory while the app is idle")
+        automationLayout.addRow("Keep for automation", recentCaptures)
+        generalLayout.addLayout(automationLayout)
+
+        memoryOverlay = QCheckBox("Show memory usage overlay (debug)")
+        memoryOverlay.setChecked(
+            self.settings.value("debug/memoryOverlay", False, type=bool))
+        memoryOverlay.toggled.connect(
+            lambda on: self.settings.setValue("debug/memoryOverlay", on))
+        generalLayout.addWidget(memoryOverlay)
+
+        watchdogLayout = QFormLayout()
+        watchdog = QCheckBox("Log event loop stalls (debug)")
+        watchdog.setChecked(
+            self.settings.value("debug/watchdog", False, type=bool))
+        watchdog.setToolTip(
+            "Samples where the app was stuck, written to stalls.log")
+        watchdog.toggled.connect(
+            lambda on: self.setWatchdogSetting("debug/watchdog", on))
+        watchdogLayout.addRow(watchdog)
+
+        stallMs = self.settingSpinBox("debug/stallMs", 200, 20, 10000)
+        stallMs.setSuffix(" ms")
+        stallMs.valueChanged.connect(lambda _: self.watchdogChanged.emit())
+        watchdogLayout.addRow("Stalls longer than", stallMs)
+        generalLayout.addLayout(watchdogLayout)
+
         self.addTab(self.generalTab, "General")
 
+        self.exportTab = QWidget()
+        exportLayout = QFormLayout(self.exportTab)
+
+        pngCompression = self.settingSpinBox("export/pngCompression", 6, 0, 9)
+        pngCompression.setToolTip("0 is fastest, 9 is smallest")
+        exportLayout.addRow("PNG compression", pngCompression)
+
+        palettePng = QCheckBox("Save PNG with a color palette")
+        palettePng.setToolTip(
+            "Much smaller and faster for UI screenshots, lossy for photos")
+        palettePng.setChecked(
+            self.settings.value("export/palettePng", False, type=bool))
+        palettePng.toggled.connect(
+            lambda on: self.settings.setValue("export/palettePng", on))
+        exportLayout.addRow(palettePng)
+
+        exportLayout.addRow(
+            "JPEG quality", self.settingSpinBox("export/jpegQuality", 90, 0, 100))
+        webpQuality = self.settingSpinBox("export/webpQuality", 90, 0, 100)
+        webpQuality.setToolTip("100 is lossless")
+        exportLayout.addRow("WebP quality", webpQuality)
+
+        quickSaveFolder = QLineEdit(quicksave.folder())
+        quickSaveFolder.editingFinished.connect(
+            lambda: self.settings.setValue(
+                "quicksave/folder", quickSaveFolder.text()))
+        exportLayout.addRow("Quick-save folder", quickSaveFolder)
+
+        quickSaveTemplate = QLineEdit(quicksave.template())
+        quickSaveTemplate.setToolTip(
+            "Fields: {date} {time} {counter} {screen} {width} {height}, "
+            "e.g. {counter:04}")
+        quickSaveTemplate.editingFinished.connect(
+            lambda: self.settings.setValue(
+                "quicksave/template", quickSaveTemplate.text()))
+        exportLayout.addRow("Quick-save name", quickSaveTemplate)
+
+        streamed = self.settingSpinBox(
+            "export/streamedMegapixels", 16, 0, 1000)
+        streamed.setSuffix(" MP")
+        streamed.setToolTip(
+            "PNG images this large are written in strips to save memory, 0 disables")
+        exportLayout.addRow("Stream PNG from", streamed)
+
+        lazy = self.settingSpinBox("open/lazyMegapixels", 16, 0, 1000)
+        lazy.setSuffix(" MP")
+        lazy.setToolTip(
+            "Opened images this large are decoded in the background, 0 disables")
+        exportLayout.addRow("Decode lazily from", lazy)
+
+        animationFps = self.settingSpinBox("animation/fps", 15, 1, 50)
+        animationFps.setSuffix(" fps")
+        exportLayout.addRow("Recording frame rate", animationFps)
+        animationSeconds = self.settingSpinBox("animation/maxSeconds", 10, 1, 120)
+        animationSeconds.setSuffix(" s")
+        exportLayout.addRow("Longest recording", animationSeconds)
+
+        self.addTab(self.exportTab, "Export")
+
+        self.hotkeysTab = QWidget()
+        hotkeysLayout = QFormLayout(self.hotkeysTab)
+
+        hotkeyBackend = QComboBox()
+        hotkeyBackend.addItem("Automatic", "")
+        for backend in hotkeys.availableBackends():
+            hotkeyBackend.addItem(backend.label, backend.name)
+        hotkeyBackend.setCurrentIndex(max(0, hotkeyBackend.findData(
+            self.settings.value("hotkeys/backend", ""))))
+        hotkeyBackend.currentIndexChanged.connect(
+            lambda _: self.setHotkeySetting(
+                "hotkeys/backend", hotkeyBackend.currentData()))
+        hotkeysLayout.addRow("Backend", hotkeyBackend)
+
+        for name, (label, _) in hotkeys.BINDINGS.items():
+            edit = QKeySequenceEdit(QKeySequence(hotkeys.binding(name)))
+            edit.setMaximumSequenceLength(1)
+            edit.editingFinished.connect(
+                lambda name=name, edit=edit: self.setHotkeySetting(
+                    "hotkeys/"+name, edit.keySequence().toString()))
+            hotkeysLayout.addRow(label, edit)
+
+        self.addTab(self.hotkeysTab, "Hotkeys")
+
+    def settingSpinBox(self, key: str, default: int, minimum: int, maximum: int) -> QSpinBox:
+        spinBox = QSpinBox()
+        spinBox.setRange(minimum, maximum)
+        spinBox.setValue(int(self.settings.value(key, default)))
+        spinBox.valueChanged.connect(
+            lambda value: self.settings.setValue(key, value))
+        return spinBox
+
+    def setHotkeySetting(self, key: str, value: str) -> None:
+        self.settings.setValue(key, value)
+        self.hotkeysChanged.emit()
+
+    def setWatchdogSetting(self, key: str, value: bool) -> None:
+        self.settings.setValue(key, value)
+        self.watchdogChanged.emit()
+
     def setStartup(self, state: int):
         state = True if state == 2 else False
         startup.setStartup(state)
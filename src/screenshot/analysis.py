@@ -0,0 +1,91 @@
+from typing import Callable
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, QThread, Signal
+from PySide6.QtGui import QImage
+
+from . import edges
+
+
+class AnalysisJob(QRunnable):
+    class Signals(QObject):
+        finished = Signal(int, str, object)
+
+    def __init__(self, generation: int, name: str, func: Callable, image: QImage) -> None:
+        super().__init__()
+        self.generation = generation
+        self.name = name
+        self.func = func
+        self.image = image
+        self.signals = self.Signals()
+
+    def run(self) -> None:
+        try:
+            result = self.func(self.image)
+        except Exception:
+            result = None  # The capture is usable without it
+        self.image = None
+        self.signals.finished.emit(self.generation, self.name, result)
+
+
+class CaptureAnalysis(QObject):
+    # Derived products of a capture, computed on worker threads while the
+    # user is still selecting. Results are cached for the capture's lifetime
+    # and everything is dropped when it ends or a new capture starts.
+    ready = Signal(str, object)
+
+    class Priority:
+        High = 2
+        Normal = 1
+        Low = 0
+
+    generation: int
+    results: dict[str, object]
+    pending: dict[str, AnalysisJob]
+    jobs: set[AnalysisJob]
+    pool: QThreadPool
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.generation = 0
+        self.results = {}
+        self.pending = {}
+        self.jobs = set()  # Referenced until they finish running
+
+        # Leave a core for the GUI thread
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max(1, QThread.idealThreadCount() - 1))
+
+    def start(self, image: QImage) -> None:
+        self.cancel()
+
+        if edges.snapEnabled():
+            self.schedule("edges", edges.EdgeMap, image, self.Priority.High)
+
+    def schedule(self, name: str, func: Callable, image: QImage, priority: int) -> None:
+        job = AnalysisJob(self.generation, name, func, image)
+        job.setAutoDelete(False)
+        job.signals.finished.connect(self.finished)
+        job.signals.finished.connect(lambda *_: self.jobs.discard(job))
+        self.pending[name] = job
+        self.jobs.add(job)
+        self.pool.start(job, priority)
+
+    def cancel(self) -> None:
+        # Queued jobs are dropped, running ones are ignored once finished.
+        self.generation += 1
+        for job in self.pending.values():
+            if self.pool.tryTake(job):
+                self.jobs.discard(job)
+        self.pending.clear()
+        self.results.clear()
+
+    def finished(self, generation: int, name: str, result: object) -> None:
+        if generation != self.generation:
+            return
+        self.pending.pop(name, None)
+        if result is not None:
+            self.results[name] = result
+            self.ready.emit(name, result)
+
+    def result(self, name: str) -> object:
+        return self.results.get(name)
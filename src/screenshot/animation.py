@@ -0,0 +1,447 @@
+import os
+import struct
+import zlib
+from time import perf_counter
+from typing import Callable
+
+from PySide6.QtCore import QObject, QRect, QSize, QTimer, QSettings, Qt, Signal
+from PySide6.QtGui import QImage
+
+from memory import tracker
+from .control import CaptureControl
+from .edges import imageArray
+from .export import Encoder
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def fps() -> int:
+    return max(1, min(50, int(QSettings().value("animation/fps", 15))))
+
+
+def maxSeconds() -> int:
+    return max(1, int(QSettings().value("animation/maxSeconds", 10)))
+
+
+def pixels(image: QImage):
+    # (height, width) uint32 view, 0xAARRGGBB
+    return imageArray(image).view(np.uint32)[..., 0]
+
+
+def changedRect(previous: QImage, current: QImage) -> QRect:
+    # Bounding box of the pixels that differ, empty when none do
+    diff = pixels(previous) != pixels(current)
+    rows = np.flatnonzero(diff.any(axis=1))
+    if not rows.size:
+        return QRect()
+    top, bottom = int(rows[0]), int(rows[-1])
+    columns = np.flatnonzero(diff[top:bottom + 1].any(axis=0))
+    left, right = int(columns[0]), int(columns[-1])
+    return QRect(left, top, right - left + 1, bottom - top + 1)
+
+
+class Recording():
+    # Frames of a recorded region. The first frame is whole, every later one
+    # only keeps the rectangle that changed since the one before, and when
+    # it appeared. Grabs that change nothing add no frame at all.
+    size: QSize
+    frames: list[tuple[QRect, QImage]]
+    times: list[float]
+    end: float
+
+    def __init__(self, size: QSize) -> None:
+        self.size = size
+        self.frames = []
+        self.times = []
+        self.end = 0
+
+    def add(self, rect: QRect, patch: QImage, time: float) -> None:
+        self.frames.append((rect, patch))
+        self.times.append(time)
+        self.end = time
+        tracker.track("Recording", "frames", [f[1] for f in self.frames])
+
+    def delays(self, unit: int) -> list[int]:
+        # How long each frame shows, in 1/unit seconds. Rounded on the
+        # running time, so rounding errors do not add up. GIF and APNG
+        # store delays in 16 bits, longer ones are cut short.
+        marks = [round(t * unit) for t in self.times + [self.end]]
+        return [min(0xFFFF, max(1, b - a)) for a, b in zip(marks, marks[1:])]
+
+    def release(self) -> None:
+        self.frames = []
+        tracker.release("Recording")
+
+
+class Recorder(QObject):
+    # Grabs a region at a steady rate and keeps only what changed. Nothing
+    # is quantized or encoded while recording, that is left to the export.
+    finished = Signal(object)
+
+    SETTLE = 150  # For the overlay to leave the screen
+
+    region: QRect
+    recording: Recording
+    previous: QImage
+    control: CaptureControl
+
+    def __init__(self, grab: Callable[[QRect], QImage]) -> None:
+        super().__init__()
+        self.grab = grab
+        self.region = None
+        self.recording = None
+        self.previous = None
+        self.control = None
+        self.started = 0
+        self.timer = QTimer(self)
+        self.timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.timer.timeout.connect(self.tick)
+
+    @staticmethod
+    def available() -> bool:
+        return np is not None  # numpy is optional
+
+    def active(self) -> bool:
+        return self.recording is not None
+
+    def start(self, region: QRect) -> None:
+        self.region = region
+        self.recording = Recording(region.size())
+        self.previous = None
+        if self.control is None:
+            self.control = CaptureControl()
+            self.control.done.connect(self.finish)
+            self.control.cancelled.connect(self.cancel)
+        self.control.showFor(region, "Recording")
+        QTimer.singleShot(self.SETTLE, self.begin)
+
+    def begin(self) -> None:
+        if not self.active():
+            return
+        self.started = perf_counter()
+        self.timer.start(1000 // fps())
+        self.tick()
+
+    def tick(self) -> None:
+        now = perf_counter() - self.started
+        if now >= maxSeconds():
+            self.finish()
+            return
+        image = self.grab(self.region)
+        if image is None:
+            self.cancel()
+            return
+
+        if self.previous is None:
+            self.recording.add(image.rect(), image, now)
+        else:
+            rect = changedRect(self.previous, image)
+            if not rect.isEmpty():
+                self.recording.add(rect, image.copy(rect), now)
+        self.recording.end = now
+        self.previous = image
+        self.control.setStatus(
+            f"Recording {now:.1f} s, {len(self.recording.frames)} frames"
+        )
+
+    def finish(self) -> None:
+        if not self.active():
+            return
+        self.timer.stop()
+        self.control.hide()
+        recording = self.recording
+        recording.end = perf_counter() - self.started
+        self.recording = None
+        self.previous = None
+        if recording.frames:
+            self.finished.emit(recording)
+
+    def cancel(self) -> None:
+        self.timer.stop()
+        if self.control is not None:
+            self.control.hide()
+        if self.recording is not None:
+            self.recording.release()
+        self.recording = None
+        self.previous = None
+
+
+class Palette():
+    # At most 255 colors for a whole recording, index 255 is transparent.
+    # Colors are binned to 15 bits, the most used bins become the palette
+    # and every bin maps to its nearest entry through a lookup table, so
+    # indexing a frame is a couple of array operations.
+    TRANSPARENT = 255
+    SAMPLES = 1 << 20
+
+    colors: "np.ndarray"  # (n, 3) uint8, RGB
+    table: "np.ndarray"  # (32768,) uint8, bin to index
+
+    def __init__(self, images: list[QImage]) -> None:
+        total = sum(i.width() * i.height() for i in images)
+        step = max(1, total // self.SAMPLES)
+        sample = np.concatenate(
+            [pixels(i).ravel()[::step] for i in images]
+        )
+        bins = self.bins(sample)
+
+        counts = np.bincount(bins, minlength=32768)
+        used = np.flatnonzero(counts)
+        chosen = used[np.argsort(counts[used])[::-1][:self.TRANSPARENT]]
+
+        # Each entry is the mean of the colors that fell into its bin
+        colors = np.empty((chosen.size, 3), np.uint8)
+        for channel, shift in enumerate((16, 8, 0)):
+            sums = np.bincount(
+                bins, (sample >> shift) & 0xFF, minlength=32768)
+            colors[:, channel] = np.round(
+                sums[chosen] / counts[chosen]).astype(np.uint8)
+        self.colors = colors
+
+        self.table = np.empty(32768, np.uint8)
+        centers = np.stack([
+            (np.arange(32768) >> 10) & 0x1F,
+            (np.arange(32768) >> 5) & 0x1F,
+            np.arange(32768) & 0x1F,
+        ], axis=1).astype(np.int32) * 8 + 4
+        palette = colors.astype(np.int32)
+        for start in range(0, 32768, 4096):
+            distances = (
+                (centers[start:start + 4096, None, :] - palette[None, :, :])**2
+            ).sum(axis=2)
+            self.table[start:start + 4096] = distances.argmin(axis=1)
+        self.table[chosen] = np.arange(chosen.size, dtype=np.uint8)
+
+    @staticmethod
+    def bins(colors: "np.ndarray") -> "np.ndarray":
+        return ((colors >> 9) & 0x7C00) | ((colors >> 6) & 0x3E0) \
+            | ((colors >> 3) & 0x1F)
+
+    def index(self, image: QImage) -> "np.ndarray":
+        return self.table[self.bins(pixels(image))]
+
+    def rgb(self) -> bytes:
+        # Padded to 256 entries, the transparent one included
+        table = np.zeros((256, 3), np.uint8)
+        table[:len(self.colors)] = self.colors
+        return table.tobytes()
+
+
+class AnimationEncoder(Encoder):
+    # Takes a Recording instead of an image. Frames are quantized against
+    # one palette, and pixels a frame leaves as they were become
+    # transparent, which both formats compress to next to nothing.
+    streamed = True
+
+    def frames(self, recording: Recording, palette: Palette):
+        # (rect, indices) of every frame, in order. A frame only covers
+        # what changed once quantized, which can be less than what was
+        # recorded, and a single transparent pixel when nothing did.
+        canvas = np.zeros(
+            (recording.size.height(), recording.size.width()), np.uint8)
+        for i, (rect, patch) in enumerate(recording.frames):
+            indices = palette.index(patch)
+            area = canvas[rect.top():rect.bottom() + 1,
+                          rect.left():rect.right() + 1]
+            if i:
+                changed = indices != area
+                area[...] = indices
+                rows = np.flatnonzero(changed.any(axis=1))
+                if not rows.size:
+                    yield QRect(rect.topLeft(), QSize(1, 1)), \
+                        np.full((1, 1), Palette.TRANSPARENT, np.uint8)
+                    continue
+                columns = np.flatnonzero(changed.any(axis=0))
+                top, bottom = int(rows[0]), int(rows[-1]) + 1
+                left, right = int(columns[0]), int(columns[-1]) + 1
+                indices = np.where(changed, indices, Palette.TRANSPARENT)[
+                    top:bottom, left:right]
+                rect = QRect(rect.left() + left, rect.top() + top,
+                             right - left, bottom - top)
+            else:
+                area[...] = indices
+            yield rect, np.ascontiguousarray(indices, np.uint8)
+
+
+class GifEncoder(AnimationEncoder):
+    name = "GIF"
+    extensions = ("gif",)
+
+    CODE_SIZE = 8
+
+    def encode(self, recording: Recording, fileName: str) -> bool:
+        width, height = recording.size.width(), recording.size.height()
+        delays = recording.delays(100)
+        palette = Palette([patch for _, patch in recording.frames])
+        try:
+            with open(fileName, "wb") as file:
+                file.write(b"GIF89a")
+                # Global color table of 256 entries
+                file.write(struct.pack("<HHBBB", width, height, 0xF7, 0, 0))
+                file.write(palette.rgb())
+                # Loop forever
+                file.write(b"\x21\xFF\x0BNETSCAPE2.0\x03\x01\x00\x00\x00")
+
+                frames = self.frames(recording, palette)
+                for i, (rect, indices) in enumerate(frames):
+                    # Browsers play anything shorter than 2/100 s slowly
+                    self.frame(file, rect, indices, max(2, delays[i]), i > 0)
+
+                file.write(b"\x3B")
+        except OSError:
+            return False
+        finally:
+            recording.release()
+        return True
+
+    def frame(self, file, rect: QRect, indices: "np.ndarray",
+              delay: int, transparent: bool) -> None:
+        # Graphic control: keep the previous frame, delay in centiseconds
+        file.write(struct.pack(
+            "<BBBBHBB", 0x21, 0xF9, 4, 0x04 | int(transparent),
+            delay, Palette.TRANSPARENT, 0))
+        file.write(struct.pack(
+            "<BHHHHB", 0x2C, rect.left(), rect.top(),
+            rect.width(), rect.height(), 0))
+        file.write(bytes([self.CODE_SIZE]))
+        data = self.lzw(indices.tobytes())
+        for start in range(0, len(data), 255):
+            block = data[start:start + 255]
+            file.write(bytes([len(block)]))
+            file.write(block)
+        file.write(b"\x00")
+
+    def lzw(self, data: bytes) -> bytes:
+        # Variable-length LZW as GIF wants it, codes packed LSB first. The
+        # table is keyed by the strings themselves: every prefix of an
+        # entry is one as well, so the longest match is found by length,
+        # galloping then bisecting, in a few lookups instead of one per
+        # pixel. Transparent and flat areas, most of a recording, go ten
+        # times faster than byte by byte, noise about half as fast. APNG
+        # compresses in zlib and is still the fast choice for busy ones.
+        clear = 1 << self.CODE_SIZE
+        first = clear + 2
+        initial = {bytes([i]): i for i in range(clear)}
+        table = dict(initial)
+        codeSize = self.CODE_SIZE + 1
+        nextCode = first
+        codes, sizes = [clear], [codeSize]  # Starts with a clear code
+
+        n, i = len(data), 0
+        while i < n:
+            length, step = 1, 1
+            while i + length + step <= n and data[i:i + length + step] in table:
+                length += step
+                step *= 2
+            # Not in the table, or past the end
+            end = min(length + step, n - i + 1)
+            while end - length > 1:
+                middle = (length + end) // 2
+                if data[i:i + middle] in table:
+                    length = middle
+                else:
+                    end = middle
+            codes.append(table[data[i:i + length]])
+            sizes.append(codeSize)
+            i += length
+            if i == n:
+                break
+
+            if nextCode < 4096:
+                table[data[i - length:i + 1]] = nextCode
+                nextCode += 1
+                if nextCode > (1 << codeSize) and codeSize < 12:
+                    codeSize += 1
+            else:
+                # Table full, start over
+                codes.append(clear)
+                sizes.append(codeSize)
+                table = dict(initial)
+                nextCode = first
+                codeSize = self.CODE_SIZE + 1
+
+        # The decoder adds an entry for the last code as well
+        if nextCode < 4096 and nextCode + 1 > (1 << codeSize) and codeSize < 12:
+            codeSize += 1
+        codes.append(clear + 1)
+        sizes.append(codeSize)
+
+        # Packed all at once instead of a code at a time
+        codes = np.array(codes, np.uint16)
+        sizes = np.array(sizes, np.uint8)
+        bits = (codes[:, None] >> np.arange(12, dtype=np.uint16)) & 1
+        bits = bits[np.arange(12) < sizes[:, None]].astype(np.uint8)
+        return np.packbits(bits, bitorder="little").tobytes()
+
+
+class ApngEncoder(AnimationEncoder):
+    # Animated PNG with a palette. Players without APNG support show the
+    # first frame.
+    name = "APNG"
+    extensions = ("png", "apng")
+
+    compression: int
+
+    def __init__(self, compression=6) -> None:
+        self.compression = max(0, min(9, compression))
+
+    def chunk(self, file, tag: bytes, data: bytes) -> None:
+        file.write(struct.pack(">I", len(data)))
+        file.write(tag)
+        file.write(data)
+        file.write(struct.pack(">I", zlib.crc32(data, zlib.crc32(tag))))
+
+    def encode(self, recording: Recording, fileName: str) -> bool:
+        width, height = recording.size.width(), recording.size.height()
+        # Centiseconds, as in GIF, so a frame can show for ten minutes
+        delays = recording.delays(100)
+        palette = Palette([patch for _, patch in recording.frames])
+        sequence = 0
+        try:
+            with open(fileName, "wb") as file:
+                file.write(b"\x89PNG\r\n\x1a\n")
+                # 8 bit palette, no interlacing
+                self.chunk(file, b"IHDR", struct.pack(
+                    ">IIBBBBB", width, height, 8, 3, 0, 0, 0))
+                self.chunk(file, b"acTL", struct.pack(
+                    ">II", len(recording.frames), 0))
+                self.chunk(file, b"PLTE", palette.rgb())
+                self.chunk(file, b"tRNS", b"\xFF" * Palette.TRANSPARENT + b"\x00")
+
+                frames = self.frames(recording, palette)
+                for i, (rect, indices) in enumerate(frames):
+                    # Frame 0 replaces the canvas, later ones are blended
+                    # over it so transparent pixels keep what was there.
+                    self.chunk(file, b"fcTL", struct.pack(
+                        ">IIIIIHHBB", sequence, rect.width(), rect.height(),
+                        rect.left(), rect.top(), delays[i], 100, 0, int(i > 0)))
+                    sequence += 1
+
+                    # Each row is prefixed with filter type 0 (None)
+                    raw = np.zeros(
+                        (indices.shape[0], indices.shape[1] + 1), np.uint8)
+                    raw[:, 1:] = indices
+                    data = zlib.compress(raw.tobytes(), self.compression)
+                    if i == 0:
+                        self.chunk(file, b"IDAT", data)
+                    else:
+                        self.chunk(file, b"fdAT",
+                                   struct.pack(">I", sequence) + data)
+                        sequence += 1
+
+                self.chunk(file, b"IEND", b"")
+        except OSError:
+            return False
+        finally:
+            recording.release()
+        return True
+
+
+def animationEncoderFor(fileName: str) -> AnimationEncoder:
+    ext = os.path.splitext(fileName)[1].lower().lstrip(".")
+    if ext in GifEncoder.extensions:
+        return GifEncoder()
+    return ApngEncoder(int(QSettings().value("export/pngCompression", 6)))
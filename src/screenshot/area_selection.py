@@ -1,260 +1,434 @@
-from PySide6.QtWidgets import QWidget, QLabel, QToolTip, QApplication
-from PySide6.QtGui import QPixmap, QMouseEvent, Qt, QCursor
-from PySide6.QtCore import QRect, QPoint, QPointF, Signal, QLineF, QPointF, QRectF
+from math import floor
+
+from PySide6.QtWidgets import QWidget, QApplication
+from PySide6.QtGui import (QMouseEvent, QPaintEvent, QPainter, QPen, QColor,
+                           QTransform, Qt)
+from PySide6.QtCore import (QRect, QSize, QPoint, QPointF, Signal, QLineF, QRectF,
+                            QSettings)
 
 import utils
 from .drawing import PostEffects
-from typings import ResizePointAlignment
-
-
-class SelectionPreview(QLabel):
-    moveStart = Signal()
-    moved = Signal(QPoint)
-    moveEnd = Signal()
-
-    screenshot: QPixmap
-    selection: QRect
-    effects: PostEffects
-    borderWidth: int
-    dragPoint: QPointF
-
-    def __init__(self, parent: QWidget, borderWidth: int) -> None:
-        super().__init__(parent)
-        self.parent = parent
-        self.borderWidth = borderWidth
-        self.selection = QRect(0, 0, 0, 0)
-        self.effects = PostEffects()
-
-        self.setStyleSheet(
-            f"border: {borderWidth}px dashed white")
-        self.setCursor(QCursor(Qt.CursorShape.SizeAllCursor))
-
-    def start(self, screenshot) -> None:
-        self.screenshot = screenshot
-        self.effects.clear()
-        self.setSelection(QRect(0, 0, 0, 0))
-
-    def setSelection(self, newSelection: QRect) -> None:
-        self.selection = newSelection.normalized()
-
-        self.setGeometry(self.selection)
-
-        # Adjust to border width
-        self.move(
-            self.pos().x()-self.borderWidth,
-            self.pos().y()
-        )
-
-        self.updatePreview()
-
-    def setEffects(self, newEffects: PostEffects) -> None:
-        self.effects = newEffects
-        self.updatePreview()
-
-    def updatePreview(self) -> None:
-        self.setPixmap(
-            self.effects.apply(self.screenshot.copy(self.selection))
-        )
-
-    def mousePressEvent(self, event: QMouseEvent) -> None:
-        self.dragPoint = event.localPos()
-        self.moveStart.emit()
-        event.accept()
-
-    def mouseMoveEvent(self, event: QMouseEvent) -> None:
-        self.moved.emit(QPoint(
-            event.globalPos().x()-self.dragPoint.x(),
-            event.globalPos().y()-self.dragPoint.y()
-        ))
-
-        event.accept()
-
-    def mouseReleaseEvent(self, event: QMouseEvent) -> None:
-        self.moveEnd.emit()
-        event.accept()
-
-
-class SelectionResizePoint(QLabel):
-    dragStart = Signal()
-    drag = Signal(tuple)
-    dragEnd = Signal()
-    alignment: ResizePointAlignment
-    borderWidth: int
-
-    def __init__(self, parent: QWidget, alignWith: QWidget, alignment: ResizePointAlignment) -> None:
-        super().__init__(parent)
-        self.alignment = alignment
-        self.alignObj = alignWith
-        self.offset = 3
-
-        self.setFixedSize(8, 8)
-        self.setStyleSheet("background-color: white")
-
-        match alignment:
-            case ResizePointAlignment.TopLeft | ResizePointAlignment.BottomRight:
-                self.setCursor(Qt.CursorShape.SizeFDiagCursor)
-
-            case ResizePointAlignment.Top | ResizePointAlignment.Bottom:
-                self.setCursor(Qt.CursorShape.SizeVerCursor)
-
-            case ResizePointAlignment.BottomLeft | ResizePointAlignment.TopRight:
-                self.setCursor(Qt.CursorShape.SizeBDiagCursor)
-
-            case ResizePointAlignment.CenterLeft | ResizePointAlignment.CenterRight:
-                self.setCursor(Qt.CursorShape.SizeHorCursor)
-
-    def align(self) -> None:
-        frame = self.alignObj.geometry()
-        center = frame.center()
-
-        geom = self.geometry()
-        match self.alignment:
-            case ResizePointAlignment.TopLeft:
-                p = frame.topLeft()
-                geom.moveCenter(
-                    QPoint(p.x()-self.offset, p.y()-self.offset)
-                )
-
-            case ResizePointAlignment.Top:
-                p = frame.topLeft()
-                geom.moveCenter(
-                    QPoint(center.x(), p.y()-self.offset)
-                )
-
-            case ResizePointAlignment.TopRight:
-                p = frame.topRight()
-                geom.moveCenter(
-                    QPoint(p.x()+self.offset, p.y()-self.offset)
-                )
-
-            case ResizePointAlignment.CenterLeft:
-                p = frame.topLeft()
-                geom.moveCenter(
-                    QPoint(p.x()-self.offset, center.y())
-                )
-
-            case ResizePointAlignment.CenterRight:
-                p = frame.topRight()
-                geom.moveCenter(
-                    QPoint(p.x()+self.offset, center.y())
-                )
-
-            case ResizePointAlignment.BottomLeft:
-                p = frame.bottomLeft()
-                geom.moveCenter(
-                    QPoint(p.x()-self.offset, p.y()+self.offset)
-                )
-
-            case ResizePointAlignment.Bottom:
-                p = frame.bottomLeft()
-                geom.moveCenter(
-                    QPoint(center.x(), p.y()+self.offset)
-                )
-
-            case ResizePointAlignment.BottomRight:
-                p = frame.bottomRight()
-                geom.moveCenter(
-                    QPoint(p.x()+self.offset, p.y()+self.offset)
-                )
-        self.setGeometry(geom)
-
-    def mousePressEvent(self, event) -> None:
-        self.dragStart.emit()
-        event.accept()
-
-    def mouseMoveEvent(self, event: QMouseEvent) -> None:
-        self.drag.emit((self.alignment, event.globalPos()))
-        event.accept()
-
-    def mouseReleaseEvent(self, event) -> None:
-        self.dragEnd.emit()
-        event.accept()
+from .windows import WindowIndex
+from .edges import EdgeMap
+from .frame import Frame
+from .viewport import Viewport
+from typings import ResizePointAlignment, Drawing
 
 
 class AreaSelection(QWidget):
+    # The selection, its border, resize handles and size readout, painted
+    # in one pass by one widget. Handles are hit-tested arithmetically and
+    # a change only repaints the old and new bounds of the selection.
+    # The selection is kept in image space, handles and the readout are
+    # sized in view space. While a selection is drawn or resized, a loupe
+    # next to the cursor shows the pixels under it.
     transformStart = Signal()
     transformEnd = Signal(QRectF)
 
-    resizePoints: list[SelectionResizePoint]
-    selectionPreview: SelectionPreview
+    frame: Frame
+    effects: PostEffects
+    redactions: list[Drawing]
     selection: QRectF
     screenOffset: QPoint
     borderWidth: int = 2
+    painted: QRect
+
+    HANDLE_SIZE = 8
+    HANDLE_OFFSET = 3  # Handle centers lie this far outside the selection
+    HANDLE_HIT = 6
+    READOUT_MARGIN = 6
+    LOUPE_PIXELS = 15  # Odd, centered on the pixel under the cursor
+    LOUPE_ZOOM = 8
+    LOUPE_OFFSET = 24
+
+    DRAG_THRESHOLD = 3
+    windows: WindowIndex
+    edges: EdgeMap
+    hoveredWindow: QRect
+    pressPos: QPoint
+    pressPoint: QPoint
+    cursorPos: QPoint
+    loupe: bool
+    dragging: bool
+    transforming: bool
+    dragHandle: ResizePointAlignment
+    dragPoint: QPointF
 
-    def __init__(self, parent: QWidget) -> None:
+    def __init__(self, parent: QWidget, viewport: Viewport) -> None:
         super().__init__(parent)
+        self.viewport = viewport
+        self.viewport.changed.connect(self.viewChanged)
+        self.viewport.decoded.connect(self.frameDecoded)
+        self.frame = None
+        self.effects = PostEffects()
+        self.redactions = []
         self.selection = QRectF(0, 0, 0, 0)
         self.screenOffset = QPoint(0, 0)
         self.borderWidth = 2
-
+        self.painted = QRect()
+        self.windows = None
+        self.edges = None
+        self.hoveredWindow = None
+        self.dragging = False
+        self.transforming = False
+        self.dragHandle = None
+        self.dragPoint = None
+        self.cursorPos = None
+        self.loupe = True
+
+        self.borderPen = QPen(QColor(255, 255, 255), self.borderWidth,
+                              Qt.PenStyle.DashLine)
+        self.setMouseTracking(True)
         self.setCursor(Qt.CursorShape.CrossCursor)
 
-        self.selectionPreview = SelectionPreview(self, self.borderWidth)
-        self.selectionPreview.show()
-
-        self.selectionPreview.moveStart.connect(self.startTransform)
-        self.selectionPreview.moved.connect(self.moveSelection)
-        self.selectionPreview.moveEnd.connect(self.endTransform)
-
-        self.resizePoints = []
+    def start(self, frame: Frame, offset: QPoint, windows: WindowIndex = None) -> None:
+        self.frame = frame
+        self.redactions = []
+        self.effects.clear()
+        self.screenOffset = offset
+        self.selection = QRectF(0, 0, 0, 0)
+        self.cursorPos = None
+        self.loupe = QSettings().value("selection/loupe", True, type=bool)
+        self.painted = QRect()
+        self.update()
+
+        # Ready shortly after the capture, see setEdges
+        self.edges = None
+
+        # Until the first click, hovering snaps the selection to windows
+        self.windows = windows
+        self.hoveredWindow = None
+
+    def release(self) -> None:
+        self.frame = None
+        self.redactions = []
+        self.edges = None
+        self.windows = None
+
+    def setEffects(self, effects: PostEffects) -> None:
+        self.effects = effects
+        self.update(self.bounds())
+
+    def setRedactions(self, redactions: list[Drawing]) -> None:
+        self.redactions = redactions
+        self.update(self.bounds())
+
+    def selectionRect(self) -> QRect:
+        return self.selection.normalized().toRect()
+
+    def viewRect(self) -> QRect:
+        # The selection on screen
+        return self.viewport.viewRect(QRectF(self.selectionRect())).toRect()
+
+    def handleCenter(self, alignment: ResizePointAlignment, rect: QRect) -> QPoint:
+        # Corners and edge midpoints, just outside the selection
+        o = self.HANDLE_OFFSET
+        name = alignment.name
+        x = rect.left() - o if name.endswith("Left") \
+            else rect.right() + o if name.endswith("Right") \
+            else rect.center().x()
+        y = rect.top() - o if name.startswith("Top") \
+            else rect.bottom() + o if name.startswith("Bottom") \
+            else rect.center().y()
+        return QPoint(x, y)
+
+    def handleAt(self, pos: QPoint) -> ResizePointAlignment:
+        rect = self.viewRect()
+        if rect.isEmpty():
+            return None
+        for alignment in ResizePointAlignment:
+            center = self.handleCenter(alignment, rect)
+            if abs(pos.x() - center.x()) <= self.HANDLE_HIT and \
+                    abs(pos.y() - center.y()) <= self.HANDLE_HIT:
+                return alignment
+        return None
+
+    def cursorFor(self, pos: QPoint) -> Qt.CursorShape:
+        match self.handleAt(pos):
+            case ResizePointAlignment.TopLeft | ResizePointAlignment.BottomRight:
+                return Qt.CursorShape.SizeFDiagCursor
+            case ResizePointAlignment.Top | ResizePointAlignment.Bottom:
+                return Qt.CursorShape.SizeVerCursor
+            case ResizePointAlignment.BottomLeft | ResizePointAlignment.TopRight:
+                return Qt.CursorShape.SizeBDiagCursor
+            case ResizePointAlignment.CenterLeft | ResizePointAlignment.CenterRight:
+                return Qt.CursorShape.SizeHorCursor
+        if self.viewRect().contains(pos):
+            return Qt.CursorShape.SizeAllCursor
+        return Qt.CursorShape.CrossCursor
+
+    def readout(self) -> str:
+        return f"{round(abs(self.selection.width()))}x{round(abs(self.selection.height()))}"
+
+    def readoutRect(self, rect: QRect) -> QRect:
+        # Above the top left corner, inside it when there is no room
+        m = self.READOUT_MARGIN
+        size = self.fontMetrics().size(0, self.readout()) + QSize(2*m, m)
+        pos = QPoint(rect.left(), rect.top() - size.height() - 2*m)
+        if pos.y() < 0:
+            pos = QPoint(rect.left() + m, rect.top() + m)
+        return QRect(pos, size)
+
+    def showReadout(self) -> bool:
+        return self.transforming or self.windows is not None
+
+    def showLoupe(self) -> bool:
+        # While drawing or resizing, not while moving
+        return self.loupe and self.transforming and self.dragPoint is None \
+            and self.cursorPos is not None
+
+    def loupeRect(self) -> QRect:
+        # Beside the cursor, on the other side when there is no room
+        side = self.LOUPE_PIXELS * self.LOUPE_ZOOM
+        size = QSize(side, side + self.fontMetrics().height() + self.READOUT_MARGIN)
+        o = self.LOUPE_OFFSET
+        x, y = self.cursorPos.x() + o, self.cursorPos.y() + o
+        if x + size.width() > self.width():
+            x = self.cursorPos.x() - o - size.width()
+        if y + size.height() > self.height():
+            y = self.cursorPos.y() - o - size.height()
+        return QRect(QPoint(x, y), size)
+
+    def bounds(self) -> QRect:
+        # Everything painted for the current selection, in view space
+        bounds = QRect()
+        rect = self.viewRect()
+        if not self.selectionRect().isEmpty():
+            margin = self.HANDLE_OFFSET + self.HANDLE_SIZE // 2 + self.borderWidth
+            bounds = rect.adjusted(-margin, -margin, margin, margin)
+            if self.showReadout():
+                bounds = bounds.united(self.readoutRect(rect))
+        if self.showLoupe():
+            bounds = bounds.united(self.loupeRect())
+        return bounds
+
+    def paintEvent(self, event: QPaintEvent) -> None:
+        if self.frame is None:
+            return
+        painter = QPainter(self)
+        painter.setClipRect(event.rect())
+        rect = self.selectionRect()
+        if not rect.isEmpty():
+            self.paintSelection(painter, event.rect(), rect)
+        if self.showLoupe():
+            self.paintLoupe(painter)
+        painter.end()
+
+    def paintSelection(self, painter: QPainter, exposed: QRect, rect: QRect) -> None:
+        view = self.viewRect()
+
+        # The selected pixels, straight from the frame
+        painter.save()
+        painter.setClipRect(view, Qt.ClipOperation.IntersectClip)
+        effects = QTransform()
+        flip = self.effects.flip()
+        if flip.x != 1 or flip.y != 1 or self.effects.angle():
+            # Post effects turn the selection around its center
+            center = QRectF(rect).center()
+            effects = QTransform().translate(-center.x(), -center.y()) \
+                * QTransform().scale(flip.x, flip.y).rotate(self.effects.angle()) \
+                * QTransform().translate(center.x(), center.y())
+        # Only what is exposed, a lazily decoded frame stays undecoded
+        transform = effects * self.viewport.transform()
+        source = transform.inverted()[0].mapRect(
+            QRectF(exposed)).toAlignedRect().intersected(rect)
+        self.viewport.paint(painter, source, effects)
+        # Redactions replace captured pixels and turn with them
+        painter.setTransform(transform)
+        for drawing in self.redactions:
+            painter.drawPixmap(drawing.Position, drawing.Pixmap)
+        painter.restore()
+
+        painter.setPen(self.borderPen)
+        painter.setBrush(Qt.BrushStyle.NoBrush)
+        w = self.borderWidth
+        painter.drawRect(QRectF(view).adjusted(-w/2, -w/2, w/2, w/2))
+
+        painter.setPen(Qt.PenStyle.NoPen)
+        painter.setBrush(QColor(255, 255, 255))
+        half = self.HANDLE_SIZE // 2
         for alignment in ResizePointAlignment:
-            point = SelectionResizePoint(
-                self, self.selectionPreview, alignment)
-            self.resizePoints.append(point)
-
-            point.dragStart.connect(self.startTransform)
-            point.dragEnd.connect(self.endTransform)
-            point.drag.connect(
-                lambda tup: self.resizeSelection(tup[0], tup[1])
+            center = self.handleCenter(alignment, view)
+            painter.drawRect(center.x() - half, center.y() - half,
+                             self.HANDLE_SIZE, self.HANDLE_SIZE)
+
+        if self.showReadout():
+            box = self.readoutRect(view)
+            painter.setBrush(QColor(0, 0, 0, 160))
+            painter.drawRoundedRect(box, 4, 4)
+            painter.setPen(QColor(255, 255, 255))
+            painter.drawText(box, Qt.AlignmentFlag.AlignCenter, self.readout())
+
+    def paintLoupe(self, painter: QPainter) -> None:
+        # The pixels around the one under the cursor, unfiltered, and its
+        # image coordinates
+        box = self.loupeRect()
+        zoom, n = self.LOUPE_ZOOM, self.LOUPE_PIXELS
+        pixel = self.viewport.toImage(QPointF(self.cursorPos))
+        pixel = QPoint(floor(pixel.x()), floor(pixel.y()))
+        source = QRect(pixel.x() - n // 2, pixel.y() - n // 2, n, n)
+        grid = QRect(box.topLeft(), QSize(n * zoom, n * zoom))
+
+        painter.setPen(Qt.PenStyle.NoPen)
+        painter.setBrush(QColor(0, 0, 0, 200))
+        painter.drawRect(box)
+        visible = source.intersected(self.frame.rect())
+        if not visible.isEmpty():
+            offset = (visible.topLeft() - source.topLeft()) * zoom
+            painter.drawImage(
+                QRect(grid.topLeft() + offset, visible.size() * zoom),
+                self.frame.view(visible, wait=False)
             )
+        painter.setBrush(Qt.BrushStyle.NoBrush)
+        painter.setPen(QColor(255, 255, 255))
+        painter.drawRect(grid.adjusted(0, 0, -1, -1))
+        painter.drawRect(QRect(grid.topLeft() + QPoint(n // 2, n // 2) * zoom,
+                               QSize(zoom, zoom)))
+        painter.drawText(
+            QRect(box.left(), grid.bottom(), box.width(), box.bottom() - grid.bottom()),
+            Qt.AlignmentFlag.AlignCenter, f"{pixel.x()}, {pixel.y()}"
+        )
 
-    def start(self, newShot: QPixmap, offset: QPoint) -> None:
-        self.screenOffset = offset
-        self.setFixedSize(newShot.size())
-        self.hideResizePoints()
-        self.selectionPreview.start(newShot)
+    def viewChanged(self) -> None:
+        # Zoomed or panned, everything moved
+        self.painted = self.bounds()
+        self.update()
+
+    def frameDecoded(self, rect: QRect) -> None:
+        # The selection and loupe show the frame as it is decoded
+        self.update()
+
+    def setEdges(self, edges: EdgeMap) -> None:
+        self.edges = edges
+
+    def snapToEdges(self, alignment: ResizePointAlignment) -> None:
+        # Snap the dragged borders to strong edges, Alt disables snapping.
+        if self.edges is None or \
+                QApplication.keyboardModifiers() & Qt.KeyboardModifier.AltModifier:
+            return
+        sel = self.selection
+        name = alignment.name
+
+        if name.endswith("Left"):
+            sel.setLeft(self.edges.snapX(sel.left(), sel.top(), sel.bottom()))
+        elif name.endswith("Right"):
+            sel.setRight(self.edges.snapX(sel.right(), sel.top(), sel.bottom()))
+        if name.startswith("Top"):
+            sel.setTop(self.edges.snapY(sel.top(), sel.left(), sel.right()))
+        elif name.startswith("Bottom"):
+            sel.setBottom(self.edges.snapY(sel.bottom(), sel.left(), sel.right()))
+
+    def hoverWindow(self, globalPos: QPoint) -> None:
+        window = self.windows.windowAt(globalPos)
+        if window == self.hoveredWindow:
+            return
+        self.hoveredWindow = window
+        if window:
+            self.setSelection(
+                QRectF(window.translated(-self.screenOffset))
+            )
+        else:
+            self.setSelection(QRectF(0, 0, 0, 0))
 
     def mousePressEvent(self, event: QMouseEvent) -> None:
+        if event.button() != Qt.MouseButton.LeftButton:
+            event.ignore()  # Panning, see Screenshooter
+            return
+        self.pressPos = event.pos()
+        self.pressPoint = self.viewport.imagePoint(event.position())
+        self.cursorPos = event.pos()
         self.startTransform()
-        self.setSelection(QRectF(0, 0, 0, 0))
-        self.selection.moveTo(event.pos())
+        if self.windows is None:
+            # Grab a handle, the selection or start a new one
+            self.dragHandle = self.handleAt(event.pos())
+            if self.dragHandle is None and \
+                    self.viewRect().contains(event.pos()):
+                self.dragPoint = self.viewport.toImage(event.position()) \
+                    - self.selection.topLeft()
+                event.accept()
+                return
+            if self.dragHandle is not None:
+                event.accept()
+                return
+        self.dragging = self.hoveredWindow is None
+        if self.dragging:
+            self.startDrag()
         event.accept()
 
+    def startDrag(self) -> None:
+        self.dragging = True
+        self.hoveredWindow = None
+        self.setSelection(QRectF(0, 0, 0, 0))
+        self.selection.moveTo(self.pressPoint)
+
     def mouseMoveEvent(self, event: QMouseEvent) -> None:
+        point = self.viewport.imagePoint(event.position())
+        self.cursorPos = event.pos()
+        if not event.buttons():
+            if self.windows is not None:
+                self.hoverWindow(point + self.screenOffset)
+            else:
+                self.setCursor(self.cursorFor(event.pos()))
+            event.accept()
+            return
+
+        if self.dragHandle is not None:
+            self.resizeSelection(self.dragHandle, point)
+            event.accept()
+            return
+        if self.dragPoint is not None:
+            position = self.viewport.toImage(event.position())
+            self.moveSelection(QPoint(
+                round(position.x() - self.dragPoint.x()),
+                round(position.y() - self.dragPoint.y())
+            ))
+            event.accept()
+            return
+
+        if not self.dragging:
+            # A click selects the hovered window, a drag starts a new area
+            if (event.pos() - self.pressPos).manhattanLength() < self.DRAG_THRESHOLD:
+                self.selectionChanged()  # The loupe follows
+                event.accept()
+                return
+            self.startDrag()
+
         newSelection = QRectF()
         newSelection.setCoords(self.selection.x(), self.selection.y(),
-                               event.x(), event.y())
+                               point.x(), point.y())
         self.setSelection(
             newSelection
         )
         event.accept()
 
     def mouseReleaseEvent(self, event: QMouseEvent) -> None:
+        if event.button() != Qt.MouseButton.LeftButton:
+            event.ignore()
+            return
+        self.windows = None
+        self.dragging = False
+        self.dragHandle = None
+        self.dragPoint = None
         self.endTransform()
+        self.setCursor(self.cursorFor(event.pos()))
         event.accept()
 
     def setSelection(self, newSelection: QRectF) -> None:
-        self.showTooltip()
         self.selection = newSelection
         self.selectionChanged()
 
     def moveSelection(self, moveTo: QPoint) -> None:
-        # TODO this can be done better in future
-        moveTo = utils.QDiff(moveTo, self.screenOffset)
+        # Image space, the selection never leaves the frame
         prevPos = self.selection.topLeft()
 
         self.selection.moveTo(moveTo)
 
-        newPoints = [self.selection.topLeft(), self.selection.topRight(),
-                     self.selection.bottomLeft(), self.selection.bottomRight()]
-
-        for p in newPoints:
-            if not utils.isPointOnScreen(p.toPoint()):
-                self.selection.moveTo(prevPos)
+        if not self.frame.rect().toRectF().contains(self.selection):
+            self.selection.moveTo(prevPos)
         self.selectionChanged()
 
     def resizeSelection(self, alignment: ResizePointAlignment, point: QPoint) -> None:
-        point = utils.QDiff(point, self.screenOffset)
+        # point is in image space
         modifiers = QApplication.keyboardModifiers()
         prevSel = QRectF(self.selection)
 
@@ -308,7 +482,6 @@ class AreaSelection(QWidget):
 
             case ResizePointAlignment.BottomRight:
                 self.selection.setBottomRight(point)
-        self.showTooltip()
 
         if modifiers == Qt.KeyboardModifier.ControlModifier:
             if alignment.value == "y":
@@ -325,38 +498,27 @@ class AreaSelection(QWidget):
 
                 self.selection.setTop(self.selection.top()-diff/2)
                 self.selection.setBottom(self.selection.bottom()+(diff/2))
+        else:
+            self.snapToEdges(alignment)
 
         self.selectionChanged()
 
     def selectionChanged(self) -> None:
-        # Call this method after any change of self.selection
-        self.selectionPreview.setSelection(self.selection.toRect())
-        self.alignResizePoints()
-        self.showResizePoints()
-
-    def alignResizePoints(self) -> None:
-        for point in self.resizePoints:
-            point.show()
-            point.align()
-
-    def showResizePoints(self) -> None:
-        for point in self.resizePoints:
-            point.show()
-
-    def hideResizePoints(self) -> None:
-        for point in self.resizePoints:
-            point.hide()
-
-    def showTooltip(self) -> None:
-        QToolTip.showText(
-            QCursor.pos(),
-            f"{round(abs(self.selection.width()))}x{round(abs(self.selection.height()))}"
-        )
+        # Call this method after any change of self.selection. Only what
+        # was painted before and what is painted now gets repainted.
+        bounds = self.bounds()
+        if bounds != self.painted:
+            self.update(self.painted)
+        self.update(bounds)
+        self.painted = bounds
 
     def startTransform(self) -> None:
         self.selection = self.selection.normalized()
+        self.transforming = True
         self.transformStart.emit()
 
     def endTransform(self) -> None:
         self.selection = self.selection.normalized()
+        self.transforming = False
+        self.selectionChanged()  # Drops the readout
         self.transformEnd.emit(self.selection)
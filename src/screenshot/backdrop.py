@@ -0,0 +1,41 @@
+from PySide6.QtCore import QRect, QRectF
+from PySide6.QtWidgets import QWidget
+from PySide6.QtGui import QColor, QPainter, QPaintEvent
+
+from .frame import Frame
+from .viewport import Viewport
+
+
+class Backdrop(QWidget):
+    # The dimmed capture behind the selection, painted straight from the
+    # frame instead of a full-size pixmap. Only exposed regions are read,
+    # and a frame still being decoded is repainted as its rows arrive.
+    DIM = QColor(0, 0, 0, 80)
+
+    frame: Frame
+
+    def __init__(self, parent: QWidget, viewport: Viewport) -> None:
+        super().__init__(parent)
+        self.viewport = viewport
+        self.viewport.changed.connect(self.update)
+        self.viewport.decoded.connect(self.frameDecoded)
+        self.frame = None
+
+    def setFrame(self, frame: Frame) -> None:
+        self.frame = frame
+        self.update()
+
+    def release(self) -> None:
+        self.frame = None
+
+    def frameDecoded(self, rect: QRect) -> None:
+        self.update(self.viewport.viewRect(QRectF(rect)).toAlignedRect())
+
+    def paintEvent(self, event: QPaintEvent) -> None:
+        if self.frame is None:
+            return
+        painter = QPainter(self)
+        for rect in event.region():
+            self.viewport.paint(painter, self.viewport.imageRect(rect))
+        painter.resetTransform()
+        painter.fillRect(event.rect(), self.DIM)
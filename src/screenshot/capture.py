@@ -0,0 +1,367 @@
+import ctypes
+import ctypes.util
+import os
+import sys
+
+from PySide6.QtCore import QRect, QSettings, Qt
+from PySide6.QtGui import (QGuiApplication, QImage, QPainter, QColor,
+                           QLinearGradient)
+
+
+class CaptureBackend():
+    # Grabs rectangles of the virtual desktop, in global logical coordinates.
+    # Returned images are only guaranteed to stay valid until the next grab.
+    name: str = ""
+    label: str = ""
+
+    @staticmethod
+    def available() -> bool:
+        return True
+
+    def grab(self, rects: list[QRect]) -> list[QImage]:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class QtCaptureBackend(CaptureBackend):
+    name = "qt"
+    label = "Qt (QScreen.grabWindow)"
+
+    def grab(self, rects: list[QRect]) -> list[QImage]:
+        images = []
+        for rect in rects:
+            screen = QGuiApplication.screenAt(rect.center()) \
+                or QGuiApplication.primaryScreen()
+            local = rect.translated(-screen.geometry().topLeft())
+            images.append(screen.grabWindow(
+                0, local.x(), local.y(), local.width(), local.height()
+            ).toImage())
+        return images
+
+
+class FakeCaptureBackend(CaptureBackend):
+    # Deterministic desktop for tests and benchmarks. Every grab scrolls the
+    # content up by `scroll` pixels, which mimics scrolling a long page.
+    name = "fake"
+    label = "Fake (deterministic)"
+
+    scroll: int
+    grabs: int
+
+    def __init__(self, scroll=0) -> None:
+        self.scroll = scroll
+        self.grabs = 0
+
+    def grab(self, rects: list[QRect]) -> list[QImage]:
+        offset = self.scroll * self.grabs
+        self.grabs += 1
+        return [self.render(rect, offset) for rect in rects]
+
+    def render(self, rect: QRect, offset: int) -> QImage:
+        image = QImage(rect.size(), QImage.Format.Format_RGB32)
+        painter = QPainter(image)
+        painter.translate(-rect.x(), -rect.y() - offset)
+
+        content = QRect(rect.x(), rect.y() + offset,
+                        rect.width(), rect.height())
+        gradient = QLinearGradient(0, 0, 4096, 4096)
+        gradient.setColorAt(0, QColor(40, 60, 90))
+        gradient.setColorAt(1, QColor(220, 200, 160))
+        painter.fillRect(content, gradient)
+
+        # Window-like panels on a 64px grid, in a non-repeating pattern
+        step = 64
+        left = content.left() - content.left() % step
+        top = content.top() - content.top() % step
+        for y in range(top, content.bottom() + 1, step):
+            for x in range(left, content.right() + 1, step):
+                if ((x // step) * 73856093 ^ (y // step) * 19349663) % 5 == 0:
+                    painter.fillRect(x + 4, y + 4, step - 8, step - 8,
+                                     QColor(245, 245, 245))
+                    painter.setPen(Qt.GlobalColor.black)
+                    painter.drawText(x + 8, y + 24, f"{x},{y}")
+        painter.end()
+        return image
+
+
+class X11ShmCaptureBackend(CaptureBackend):
+    # Reads the root window straight into a MIT-SHM segment with XShmGetImage.
+    # The returned images wrap the shared memory, nothing is copied. Once
+    # shared memory fails, for example on a remote display, every later
+    # grab goes through Qt instead.
+    #
+    # Not the default: it has not been run against a real X server yet.
+    name = "x11shm"
+    label = "X11 shared memory (MIT-SHM, experimental)"
+
+    ZPixmap = 2
+    AllPlanes = ctypes.c_ulong(0xFFFFFFFFFFFFFFFF).value
+    IPC_PRIVATE = 0
+    IPC_CREAT = 0o1000
+    IPC_RMID = 0
+    SHMAT_FAILED = ctypes.c_void_p(-1).value
+
+    ErrorHandler = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.c_void_p, ctypes.c_void_p)
+
+    class XShmSegmentInfo(ctypes.Structure):
+        _fields_ = [
+            ("shmseg", ctypes.c_ulong),
+            ("shmid", ctypes.c_int),
+            ("shmaddr", ctypes.c_void_p),
+            ("readOnly", ctypes.c_int),
+        ]
+
+    class XImage(ctypes.Structure):
+        # Only the leading fields are needed
+        _fields_ = [
+            ("width", ctypes.c_int),
+            ("height", ctypes.c_int),
+            ("xoffset", ctypes.c_int),
+            ("format", ctypes.c_int),
+            ("data", ctypes.c_void_p),
+            ("byte_order", ctypes.c_int),
+            ("bitmap_unit", ctypes.c_int),
+            ("bitmap_bit_order", ctypes.c_int),
+            ("bitmap_pad", ctypes.c_int),
+            ("depth", ctypes.c_int),
+            ("bytes_per_line", ctypes.c_int),
+            ("bits_per_pixel", ctypes.c_int),
+        ]
+
+    class Segment():
+        def __init__(self, info, ximage, size: int) -> None:
+            self.info = info
+            self.ximage = ximage
+            self.size = size
+
+    @staticmethod
+    def libraries():
+        x11 = ctypes.util.find_library("X11")
+        xext = ctypes.util.find_library("Xext")
+        libc = ctypes.util.find_library("c")
+        if not (x11 and xext and libc):
+            return None
+        return ctypes.CDLL(x11), ctypes.CDLL(xext), ctypes.CDLL(libc, use_errno=True)
+
+    @staticmethod
+    def available() -> bool:
+        if not sys.platform.startswith("linux") or not os.environ.get("DISPLAY"):
+            return False
+        if QGuiApplication.platformName() not in ("xcb", ""):
+            return False
+        return X11ShmCaptureBackend.libraries() is not None
+
+    def __init__(self) -> None:
+        self.x11, self.xext, self.libc = self.libraries()
+        self.declare()
+
+        self.display = self.x11.XOpenDisplay(None)
+        if not self.display:
+            raise OSError("Unable to open X display")
+        if not self.xext.XShmQueryExtension(self.display):
+            self.x11.XCloseDisplay(self.display)
+            raise OSError("X server does not support MIT-SHM")
+
+        screen = self.x11.XDefaultScreen(self.display)
+        if self.x11.XDefaultDepth(self.display, screen) not in (24, 32):
+            self.x11.XCloseDisplay(self.display)
+            raise OSError("Only 24 and 32 bit X visuals are supported")
+        self.root = self.x11.XRootWindow(self.display, screen)
+        self.visual = self.x11.XDefaultVisual(self.display, screen)
+        self.depth = self.x11.XDefaultDepth(self.display, screen)
+        self.segments = []
+        self.fallback = None
+
+    def declare(self) -> None:
+        x11, xext, libc = self.x11, self.xext, self.libc
+        x11.XOpenDisplay.restype = ctypes.c_void_p
+        x11.XOpenDisplay.argtypes = [ctypes.c_char_p]
+        x11.XCloseDisplay.argtypes = [ctypes.c_void_p]
+        x11.XDefaultScreen.argtypes = [ctypes.c_void_p]
+        x11.XRootWindow.restype = ctypes.c_ulong
+        x11.XRootWindow.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XDefaultVisual.restype = ctypes.c_void_p
+        x11.XDefaultVisual.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XDefaultDepth.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XDestroyImage.argtypes = [ctypes.c_void_p]
+        x11.XSync.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XSetErrorHandler.restype = ctypes.c_void_p
+        x11.XSetErrorHandler.argtypes = [ctypes.c_void_p]
+
+        xext.XShmQueryExtension.argtypes = [ctypes.c_void_p]
+        xext.XShmCreateImage.restype = ctypes.POINTER(self.XImage)
+        xext.XShmCreateImage.argtypes = [
+            ctypes.c_void_p, ctypes.c_void_p, ctypes.c_uint, ctypes.c_int,
+            ctypes.c_char_p, ctypes.POINTER(self.XShmSegmentInfo),
+            ctypes.c_uint, ctypes.c_uint
+        ]
+        xext.XShmAttach.argtypes = [
+            ctypes.c_void_p, ctypes.POINTER(self.XShmSegmentInfo)]
+        xext.XShmDetach.argtypes = [
+            ctypes.c_void_p, ctypes.POINTER(self.XShmSegmentInfo)]
+        xext.XShmGetImage.argtypes = [
+            ctypes.c_void_p, ctypes.c_ulong, ctypes.POINTER(self.XImage),
+            ctypes.c_int, ctypes.c_int, ctypes.c_ulong
+        ]
+
+        libc.shmget.argtypes = [ctypes.c_int, ctypes.c_size_t, ctypes.c_int]
+        libc.shmat.restype = ctypes.c_void_p
+        libc.shmat.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_int]
+        libc.shmdt.argtypes = [ctypes.c_void_p]
+        libc.shmctl.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_void_p]
+
+    def segment(self, index: int, width: int, height: int) -> Segment:
+        # Segments are reused between grabs as long as the size matches.
+        if index < len(self.segments):
+            seg = self.segments[index]
+            if seg.ximage.contents.width == width and seg.ximage.contents.height == height:
+                return seg
+            self.destroySegment(seg)
+            self.segments[index] = None
+        else:
+            self.segments.append(None)
+
+        info = self.XShmSegmentInfo()
+        ximage = self.xext.XShmCreateImage(
+            self.display, self.visual, self.depth, self.ZPixmap,
+            None, ctypes.byref(info), width, height
+        )
+        if not ximage:
+            raise OSError("XShmCreateImage failed")
+
+        size = ximage.contents.bytes_per_line * height
+        info.shmid = self.libc.shmget(
+            self.IPC_PRIVATE, size, self.IPC_CREAT | 0o600)
+        if info.shmid < 0:
+            self.x11.XDestroyImage(ximage)
+            raise OSError(ctypes.get_errno(), "shmget failed")
+        address = self.libc.shmat(info.shmid, None, 0)
+        if address in (None, self.SHMAT_FAILED):
+            errno = ctypes.get_errno()
+            self.libc.shmctl(info.shmid, self.IPC_RMID, None)
+            self.x11.XDestroyImage(ximage)
+            raise OSError(errno, "shmat failed")
+        info.shmaddr = address
+        ximage.contents.data = info.shmaddr
+        info.readOnly = 0
+        try:
+            self.checked(lambda: self.xext.XShmAttach(
+                self.display, ctypes.byref(info)), "XShmAttach failed")
+        except OSError:
+            ximage.contents.data = None
+            self.x11.XDestroyImage(ximage)
+            self.libc.shmdt(info.shmaddr)
+            raise
+        finally:
+            # Removed once everyone has detached
+            self.libc.shmctl(info.shmid, self.IPC_RMID, None)
+
+        seg = self.Segment(info, ximage, size)
+        self.segments[index] = seg
+        return seg
+
+    def checked(self, call, message: str) -> None:
+        # X errors arrive asynchronously and terminate the process by
+        # default, so they are caught around the call and a round trip
+        errors = []
+
+        def onError(display, error) -> int:
+            errors.append(error)
+            return 0
+        handler = self.ErrorHandler(onError)
+        previous = self.x11.XSetErrorHandler(ctypes.cast(handler, ctypes.c_void_p))
+        try:
+            ok = call()
+            self.x11.XSync(self.display, 0)
+        finally:
+            self.x11.XSetErrorHandler(previous)
+        if not ok or errors:
+            raise OSError(message)
+
+    def destroySegment(self, seg: Segment) -> None:
+        self.xext.XShmDetach(self.display, ctypes.byref(seg.info))
+        seg.ximage.contents.data = None
+        self.x11.XDestroyImage(seg.ximage)
+        self.libc.shmdt(seg.info.shmaddr)
+
+    def grab(self, rects: list[QRect]) -> list[QImage]:
+        if self.fallback is None:
+            try:
+                return self.grabShared(rects)
+            except OSError:
+                self.closeSegments()
+                self.fallback = QtCaptureBackend()
+        return self.fallback.grab(rects)
+
+    def grabShared(self, rects: list[QRect]) -> list[QImage]:
+        images = []
+        for index, rect in enumerate(rects):
+            # X11 works in device pixels
+            screen = QGuiApplication.screenAt(rect.center()) \
+                or QGuiApplication.primaryScreen()
+            ratio = screen.devicePixelRatio()
+            x, y = round(rect.x()*ratio), round(rect.y()*ratio)
+            w, h = round(rect.width()*ratio), round(rect.height()*ratio)
+
+            seg = self.segment(index, w, h)
+            self.checked(lambda: self.xext.XShmGetImage(
+                self.display, self.root, seg.ximage, x, y, self.AllPlanes
+            ), "XShmGetImage failed")
+
+            ximage = seg.ximage.contents
+            buffer = (ctypes.c_char * seg.size).from_address(seg.info.shmaddr)
+            image = QImage(
+                buffer, w, h, ximage.bytes_per_line,
+                QImage.Format.Format_RGB32
+            )
+            image.setDevicePixelRatio(ratio)
+            images.append(image)
+        return images
+
+    def closeSegments(self) -> None:
+        for seg in self.segments:
+            if seg:
+                self.destroySegment(seg)
+        self.segments = []
+
+    def close(self) -> None:
+        self.closeSegments()
+        if self.display:
+            self.x11.XCloseDisplay(self.display)
+            self.display = None
+
+
+BACKENDS = [QtCaptureBackend, X11ShmCaptureBackend, FakeCaptureBackend]
+
+
+def availableBackends() -> list[type[CaptureBackend]]:
+    return [b for b in BACKENDS if b.available()]
+
+
+__backend: CaptureBackend = None
+__selected: str = None
+
+
+def backend() -> CaptureBackend:
+    # Selected with the UNISHOT_CAPTURE_BACKEND variable or in the options.
+    global __backend, __selected
+    name = os.environ.get("UNISHOT_CAPTURE_BACKEND") \
+        or QSettings().value("capture/backend", QtCaptureBackend.name)
+
+    if __backend is None or __selected != name:
+        __selected = name
+        if __backend is not None:
+            __backend.close()
+        __backend = None
+        for cls in availableBackends():
+            if cls.name == name:
+                try:
+                    __backend = cls()
+                except OSError:
+                    pass  # Falls back to Qt
+                break
+        if __backend is None:
+            __backend = QtCaptureBackend()
+    return __backend
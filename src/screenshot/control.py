@@ -0,0 +1,49 @@
+from PySide6.QtCore import QRect, QPoint, Qt, Signal
+from PySide6.QtGui import QGuiApplication
+from PySide6.QtWidgets import QWidget, QLabel, QPushButton, QHBoxLayout
+
+
+class CaptureControl(QWidget):
+    # Status and buttons shown next to a region being grabbed over and
+    # over, never over it.
+    done = Signal()
+    cancelled = Signal()
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.setWindowFlags(
+            Qt.WindowType.FramelessWindowHint | Qt.WindowType.Tool
+            | Qt.WindowType.WindowStaysOnTopHint
+            | Qt.WindowType.WindowDoesNotAcceptFocus
+        )
+        self.label = QLabel(self)
+        doneButton = QPushButton("Done", self)
+        doneButton.clicked.connect(self.done)
+        cancelButton = QPushButton("Cancel", self)
+        cancelButton.clicked.connect(self.cancelled)
+
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(6, 4, 6, 4)
+        layout.addWidget(self.label)
+        layout.addWidget(doneButton)
+        layout.addWidget(cancelButton)
+
+    def showFor(self, region: QRect, status: str) -> None:
+        self.setStatus(status)
+        self.adjustSize()
+        screen = QGuiApplication.screenAt(region.center()) \
+            or QGuiApplication.primaryScreen()
+        available = screen.availableGeometry()
+        pos = QPoint(region.left(), region.bottom() + 8)
+        if pos.y() + self.height() > available.bottom():
+            pos.setY(region.top() - self.height() - 8)
+        if pos.y() < available.top():
+            # No room outside, it goes in the corner and is grabbed too
+            pos.setY(available.top())
+        pos.setX(max(available.left(),
+                     min(pos.x(), available.right() - self.width())))
+        self.move(pos)
+        self.show()
+
+    def setStatus(self, text: str) -> None:
+        self.label.setText(text)
@@ -1,9 +1,23 @@
 from PySide6.QtWidgets import QWidget, QLabel, QTextEdit, QApplication
-from PySide6.QtCore import Qt, QRect, QLineF, Signal, QPoint
-from PySide6.QtGui import QMouseEvent, QPainter, QPixmap, QPainterPath, QPen, QColor, QWheelEvent, QTransform
+from PySide6.QtCore import Qt, QRect, QRectF, QLineF, Signal, QPoint
+from PySide6.QtGui import QMouseEvent, QPainter, QPixmap, QPainterPath, QPen, QColor, QWheelEvent, QTransform, QImage, QPaintEvent, QPolygon
 
 import utils
-from typings import DrawTools, Drawing
+from memory import tracker
+from typings import DrawTools, Drawing, Stroke
+from . import redaction
+from .frame import Frame
+from .viewport import Viewport
+
+
+def paintDrawings(target: QPixmap | QImage, drawings: list[Drawing], origin: QPoint) -> None:
+    # Paints canvas positioned drawings onto a target whose top left
+    # corner lies at origin on the canvas.
+    painter = QPainter(target)
+    painter.translate(-origin.x(), -origin.y())
+    for drawing in drawings:
+        painter.drawPixmap(drawing.Position, drawing.Pixmap)
+    painter.end()
 
 
 class PostEffects():
@@ -14,9 +28,9 @@ class PostEffects():
     __angle: int
     __flip: Flip
 
-    def __init__(self, angle=0, flip=Flip()) -> None:
+    def __init__(self, angle=0, flip: Flip = None) -> None:
         self.__angle = angle
-        self.__flip = flip
+        self.__flip = flip if flip is not None else self.Flip()
 
     def angle(self) -> int:
         return self.__angle
@@ -24,6 +38,10 @@ class PostEffects():
     def setAngle(self, angle: int) -> None:
         self.__angle = angle % 360
 
+    def rotate(self, degrees: int) -> None:
+        # Clockwise
+        self.setAngle(self.__angle + degrees)
+
     def flip(self) -> Flip:
         return self.__flip
 
@@ -41,8 +59,8 @@ class PostEffects():
         self.__flip.x = 1
         self.__flip.y = 1
 
-    def apply(self, pixmap: QPixmap) -> QPixmap:
-        return QPixmap(pixmap).transformed(
+    def apply(self, pixmap: QPixmap | QImage) -> QPixmap | QImage:
+        return pixmap.transformed(
             QTransform()
             .scale(
                 self.__flip.x,
@@ -85,6 +103,10 @@ class DrawTextEdit(QTextEdit):
 
 
 class Draw(QLabel):
+    redactionsChanged = Signal()
+    # "add" with the Stroke of a finished drawing, "undo" and "redo"
+    changed = Signal(str, object)
+
     Tools = DrawTools
     attribute = Qt.WidgetAttribute.WA_TransparentForMouseEvents
 
@@ -98,6 +120,10 @@ class Draw(QLabel):
         Tools.Square,
         Tools.Ellipse
     ]
+    RedactionTools = [
+        Tools.Pixelate,
+        Tools.Blur
+    ]
 
     textEdit: DrawTextEdit
 
@@ -106,16 +132,18 @@ class Draw(QLabel):
     color: QColor
     penWidth: int
     drawings: list[Drawing]
-    preview: QPixmap
+    frame: Frame
 
     undoHistory: list[Drawing]
     editingText: bool
     isDrawing: bool
     newDrawing: bool
-    brushPath: QPainterPath
+    brushPoints: list[QPoint]
 
-    def __init__(self, parent: QWidget) -> None:
+    def __init__(self, parent: QWidget, viewport: Viewport) -> None:
         super().__init__(parent)
+        self.viewport = viewport
+        self.viewport.changed.connect(self.viewChanged)
         self.__active = False
         self.editingText = False
         self.newDrawing = False
@@ -140,36 +168,61 @@ class Draw(QLabel):
         self.stopTextEdit()
         self.setTransparent(True)
 
-    def setCanvas(self, geometry: QRect) -> None:
+    def setCanvas(self, frame: Frame = None) -> None:
+        # Drawings are kept in image space, the viewport maps them
         self.penWidth = 5
         self.drawings = []
         self.undoHistory = []
+        # Captured pixels, needed by redaction tools
+        self.frame = frame
 
-        self.screenOffset = geometry.topLeft()
-        self.resize(geometry.size())
         self.updatePreview()
 
+    def release(self) -> None:
+        self.drawings = []
+        self.undoHistory = []
+        self.frame = None
+        self.clear()
+        tracker.release("Draw")
+        tracker.release("History")
+
     def mousePressEvent(self, event: QMouseEvent) -> None:
+        if event.button() != Qt.MouseButton.LeftButton:
+            event.ignore()  # Panning, see Screenshooter
+            return
         self.stopTextEdit()
 
         self.isDrawing = True
         self.newDrawing = True
-        self.startPoint = utils.QDiff(event.globalPos(), self.screenOffset)
-        self.brushPath = QPainterPath(self.startPoint)
+        self.startPoint = self.viewport.imagePoint(event.position())
+        self.brushPoints = [self.startPoint]
 
         event.accept()
 
     def mouseMoveEvent(self, event: QMouseEvent) -> None:
-        self.endPoint = self.getEndPoint(event.globalPos())
+        self.endPoint = self.getEndPoint(self.viewport.imagePoint(event.position()))
         self.toolAction()
         event.accept()
 
     def mouseReleaseEvent(self, event: QMouseEvent) -> None:
+        if event.button() != Qt.MouseButton.LeftButton:
+            event.ignore()
+            return
         self.isDrawing = False
+        if self.tool in self.RedactionTools and not self.newDrawing:
+            # Replace the fast preview with the exact redaction, rendered
+            # over the redactions before it only
+            self.drawings.pop()
+            self.drawings.append(self.getDrawing())
+            self.redactionsChanged.emit()
+            self.updatePreview()
+        if self.tool is not self.Tools.Text and not self.newDrawing \
+                and self.drawings:
+            self.changed.emit("add", self.drawings[-1].Stroke)
         event.accept()
 
-    def getEndPoint(self, cursorPos: QPoint) -> QPoint:
-        point = utils.QDiff(cursorPos, self.screenOffset)
+    def getEndPoint(self, point: QPoint) -> QPoint:
+        # point is in image space
 
         # Lock tools in 8 directions if CTRL is pressed
         if QApplication.keyboardModifiers() is Qt.KeyboardModifier.ControlModifier:
@@ -214,7 +267,7 @@ class Draw(QLabel):
 
     def toolAction(self) -> None:
         if self.tool is self.Tools.Brush:
-            self.brushPath.lineTo(self.endPoint)
+            self.brushPoints.append(self.endPoint)
         if self.tool is self.Tools.Text:
             self.startTextEdit()
         else:
@@ -233,14 +286,35 @@ class Draw(QLabel):
         self.updatePreview()
 
     def getDrawing(self) -> Drawing:
-        margin = self.penWidth*2.5  # Prevent cropping drawings
+        return self.render(self.stroke(), preview=self.isDrawing)
 
+    def stroke(self) -> Stroke:
+        points = self.brushPoints if self.tool is self.Tools.Brush \
+            else [self.startPoint, self.endPoint]
+        text, fontSize = "", 0
+        if self.tool is self.Tools.Text:
+            text = self.textEdit.toPlainText()
+            fontSize = self.textEdit.fontPointSize()
+        return Stroke(self.tool, self.color.rgba(), self.penWidth,
+                      [(p.x(), p.y()) for p in points], text, fontSize)
+
+    def render(self, stroke: Stroke, preview=False) -> Drawing:
+        # Draws a stroke, the same way every time it is given
+        if stroke.Tool in self.RedactionTools:
+            return self.getRedaction(stroke, preview)
+
+        points = [QPoint(x, y) for x, y in stroke.Points]
+        startPoint, endPoint = points[0], points[-1]
+        margin = stroke.PenWidth*2.5  # Prevent cropping drawings
+
+        # A brush stroke is only as large as the points it went through
         selectionRect = utils.expandRect(
-            QRect(self.startPoint, self.endPoint), margin
-        ) if not self.tool is self.Tools.Brush else self.geometry()
+            QRect(startPoint, endPoint), margin
+        ) if not stroke.Tool is self.Tools.Brush \
+            else utils.expandRect(QPolygon(points).boundingRect(), margin)
 
-        localStartPoint = utils.mapPointToRect(self.startPoint, selectionRect)
-        localEndPoint = utils.mapPointToRect(self.endPoint, selectionRect)
+        localStartPoint = utils.mapPointToRect(startPoint, selectionRect)
+        localEndPoint = utils.mapPointToRect(endPoint, selectionRect)
         localRect = QRect(localStartPoint, localEndPoint).normalized()
 
         pixmap = QPixmap(selectionRect.size())
@@ -249,24 +323,27 @@ class Draw(QLabel):
         painter = QPainter(pixmap)
         painter.setRenderHint(QPainter.RenderHint.Antialiasing)
 
-        pen = QPen(self.color)
-        pen.setWidth(self.penWidth)
+        pen = QPen(QColor.fromRgba(stroke.Color))
+        pen.setWidth(stroke.PenWidth)
         painter.setPen(pen)
 
-        match self.tool:
+        match stroke.Tool:
             case self.Tools.Brush:
-                painter.drawPath(self.brushPath)
+                path = QPainterPath(localStartPoint)
+                for point in points[1:]:
+                    path.lineTo(utils.mapPointToRect(point, selectionRect))
+                painter.drawPath(path)
             case self.Tools.Square:
                 painter.drawRect(localRect)
             case self.Tools.Ellipse:
                 painter.drawEllipse(localRect)
             case self.Tools.Arrow:
                 line = QLineF(localStartPoint, localEndPoint)
-                line.setLength(line.length()-self.penWidth)
+                line.setLength(line.length()-stroke.PenWidth)
                 painter.drawLine(line)
 
                 arrowLine = QLineF(localEndPoint, localStartPoint)
-                arrowLine.setLength(self.penWidth*2.25)
+                arrowLine.setLength(stroke.PenWidth*2.25)
                 ang = arrowLine.angle()
 
                 arrowLine.setAngle(ang-45)
@@ -277,29 +354,104 @@ class Draw(QLabel):
                 painter.drawLine(localStartPoint, localEndPoint)
             case self.Tools.Text:
                 font = self.textEdit.font()
-                font.setPointSize(self.textEdit.fontPointSize())
+                font.setPointSize(stroke.FontSize)
                 painter.setFont(font)
-                painter.drawText(localRect, self.textEdit.toPlainText())
+                painter.drawText(localRect, stroke.Text)
+        painter.end()
 
-        return Drawing(selectionRect, pixmap)
+        return Drawing(selectionRect, pixmap, False, stroke)
+
+    def getRedaction(self, stroke: Stroke, preview: bool) -> Drawing:
+        (x1, y1), (x2, y2) = stroke.Points[0], stroke.Points[-1]
+        rect = QRect(QPoint(x1, y1), QPoint(x2, y2)).normalized()
+        if self.frame is not None:
+            rect = rect.intersected(self.frame.rect())
+        if self.frame is None or rect.isEmpty():
+            return Drawing(rect, QPixmap(), True, stroke)
+
+        # Pen width sets the strength, scroll to change it
+        pixelating = stroke.Tool is self.Tools.Pixelate
+        if pixelating:
+            block = redaction.blockSize(stroke.PenWidth*2)
+            # Blocks sit on a grid anchored at the image origin
+            outer = redaction.alignedRect(rect, block, self.frame.rect())
+        else:
+            radius = max(2, stroke.PenWidth*2)
+            # Borders blur with their surroundings
+            outer = rect.adjusted(-2*radius, -2*radius, 2*radius, 2*radius) \
+                .intersected(self.frame.rect())
+
+        # Redactions already made are applied first, so this one never
+        # brings back what they hide. Every drawing present is earlier, the
+        # one being rendered is never in the list yet.
+        earlier = [dr for dr in self.redactions()
+                   if dr.Position.intersects(outer)]
+
+        # Previews while dragging come from the viewport's pyramid, which
+        # scales down only the tiles they cover. It knows nothing of other
+        # redactions, so those always start from the frame.
+        pyramid = self.viewport.pyramid
+        if preview and not earlier and pyramid is not None and pyramid.frame is self.frame:
+            image = redaction.previewPixelate(pyramid, rect, block) if pixelating \
+                else redaction.previewBlur(pyramid, rect, radius)
+            return Drawing(rect, QPixmap.fromImage(image), True, stroke)
+
+        # Only what the effect samples is read, so a lazily decoded frame
+        # waits for just those rows. Previews show what is decoded so far,
+        # the final one waits.
+        base = self.frame.view(outer, wait=not preview)
+        local = rect.translated(-outer.topLeft())
+        if earlier:
+            # Painting detaches the view, the frame is left untouched
+            paintDrawings(base, earlier, outer.topLeft())
+
+        if pixelating:
+            image = redaction.pixelate(base, local, block)
+        else:
+            image = redaction.blur(base, local, radius)
+
+        return Drawing(rect, QPixmap.fromImage(image), True, stroke)
+
+    def add(self, stroke: Stroke) -> None:
+        # A finished drawing from elsewhere, a journal or a project
+        drawing = self.render(stroke)
+        self.drawings.append(drawing)
+        self.updatePreview()
+        if drawing.Redaction:
+            self.redactionsChanged.emit()
+        self.changed.emit("add", stroke)
+
+    def annotations(self) -> list[Drawing]:
+        return [dr for dr in self.drawings if not dr.Redaction]
+
+    def redactions(self) -> list[Drawing]:
+        return [dr for dr in self.drawings if dr.Redaction]
 
     def startTextEdit(self) -> None:
         self.editingText = True
         self.textEdit.lostFocus.connect(self.stopTextEdit)
-        self.textEdit.setGeometry(
-            utils.expandRect(
-                QRect(self.startPoint,
-                      self.endPoint), 5  # 5 is default QTextEdit padding
-            )
-        )
+        self.textEdit.setGeometry(self.textRect())
         self.textEdit.show()
         self.textEdit.setFocus()
 
+    def textRect(self) -> QRect:
+        return self.viewport.viewRect(QRectF(utils.expandRect(
+            QRect(self.startPoint, self.endPoint), 5  # 5 is default QTextEdit padding
+        ))).toRect()
+
+    def viewChanged(self) -> None:
+        if self.editingText:
+            self.textEdit.setGeometry(self.textRect())
+        self.update()
+
     def stopTextEdit(self) -> None:
         if self.editingText:
             self.editingText = False
             self.textEdit.lostFocus.disconnect()
+            count = len(self.drawings)
             self.doDrawing()
+            if len(self.drawings) > count:
+                self.changed.emit("add", self.drawings[-1].Stroke)
 
             self.textEdit.hide()
             self.textEdit.clear()
@@ -328,6 +480,9 @@ class Draw(QLabel):
         try:
             self.undoHistory.append(self.drawings.pop())
             self.updatePreview()
+            if self.undoHistory[-1].Redaction:
+                self.redactionsChanged.emit()
+            self.changed.emit("undo", None)
         except IndexError:
             pass  # TODO: Play warning Windows sound
 
@@ -335,29 +490,44 @@ class Draw(QLabel):
         try:
             self.drawings.append(self.undoHistory.pop())
             self.updatePreview()
+            if self.drawings[-1].Redaction:
+                self.redactionsChanged.emit()
+            self.changed.emit("redo", None)
         except IndexError:
             pass  # TODO: Play warning Windows sound
 
     def updatePreview(self) -> None:
-        self.preview = self.drawPixmap()
-        self.setPixmap(self.preview)
-
-    def drawPixmap(self) -> QPixmap:
-        pixmap = QPixmap(self.size())
-        pixmap.fill("transparent")
-        painter = QPainter(pixmap)
-
-        for p, dr in self.drawings:
-            painter.drawPixmap(p, dr)
+        # Committed redactions are shown by the selection preview, under
+        # post effects. Only the one being dragged is shown here.
+        self.update()
+
+        tracker.track("Draw", "drawings", [dr.Pixmap for dr in self.drawings])
+        tracker.track("History", "redo", [dr.Pixmap for dr in self.undoHistory])
+
+    def paintEvent(self, event: QPaintEvent) -> None:
+        # Straight from the drawings, the canvas may be far larger than
+        # what is on screen
+        live = []
+        if self.isDrawing and self.drawings and self.drawings[-1].Redaction:
+            live = self.drawings[-1:]
+        exposed = self.viewport.imageRect(event.rect())
+        painter = QPainter(self)
+        painter.setClipRect(event.rect())
+        painter.setTransform(self.viewport.transform())
+        painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform,
+                              self.viewport.scale < 1)
+        for drawing in live + self.annotations():
+            if drawing.Position.intersects(exposed):
+                painter.drawPixmap(drawing.Position, drawing.Pixmap)
         painter.end()
 
-        return pixmap
-
     def setTransparent(self, transparent: bool) -> None:
         self.setAttribute(self.attribute, on=transparent)
 
     def wheelEvent(self, event: QWheelEvent) -> None:
-        if self.__active:
+        # Ctrl zooms, see Screenshooter
+        zoom = event.modifiers() & Qt.KeyboardModifier.ControlModifier
+        if self.__active and not zoom:
             delta = event.angleDelta().y()
             if delta > 0:
                 if self.editingText:
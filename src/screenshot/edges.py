@@ -0,0 +1,76 @@
+from PySide6.QtCore import QSettings
+from PySide6.QtGui import QImage
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def imageArray(image: QImage):
+    # Read-only view of a QImage's pixels. The view does not keep the image
+    # alive, keep a reference for as long as it is used.
+    bits = image.constBits()
+    depth = image.depth() // 8
+    array = np.frombuffer(bits, np.uint8, image.bytesPerLine() * image.height())
+    array = array.reshape(image.height(), image.bytesPerLine())
+    array = array[:, :image.width() * depth]
+    if depth > 1:
+        array = array.reshape(image.height(), image.width(), depth)
+    return array
+
+
+class EdgeMap():
+    # Column and row prefix sums of strong edges. Summing any span of a
+    # boundary is then a difference of two array reads.
+    THRESHOLD = 24
+
+    columns: "np.ndarray"  # (h+1, w+1), vertical boundaries at x
+    rows: "np.ndarray"  # (h+1, w+1), horizontal boundaries at y
+
+    def __init__(self, image: QImage) -> None:
+        grayImage = image.convertToFormat(QImage.Format.Format_Grayscale8)
+        gray = imageArray(grayImage).astype(np.int16)
+        del grayImage
+        h, w = gray.shape
+        dtype = np.uint16 if max(w, h) < 65536 else np.uint32
+
+        # Strong edge between pixel x-1 and x is recorded at boundary x
+        vertical = np.zeros((h, w + 1), np.uint8)
+        vertical[:, 1:w] = np.abs(np.diff(gray, axis=1)) > self.THRESHOLD
+        horizontal = np.zeros((h + 1, w), np.uint8)
+        horizontal[1:h, :] = np.abs(np.diff(gray, axis=0)) > self.THRESHOLD
+
+        self.columns = np.zeros((h + 1, w + 1), dtype)
+        np.cumsum(vertical, axis=0, dtype=dtype, out=self.columns[1:])
+        self.rows = np.zeros((h + 1, w + 1), dtype)
+        np.cumsum(horizontal, axis=1, dtype=dtype, out=self.rows[:, 1:])
+
+    def snap(self, prefix: "np.ndarray", value: float, start: float, end: float,
+             radius: int, minStrength: float) -> float:
+        spanLimit, limit = prefix.shape[0] - 1, prefix.shape[1] - 1
+        lo, hi = max(0, round(value) - radius), min(limit, round(value) + radius)
+        start, end = sorted((max(0, min(spanLimit, round(start))),
+                             max(0, min(spanLimit, round(end)))))
+        if hi < lo or end - start < 4:
+            return value
+
+        strength = (prefix[end, lo:hi + 1].astype(np.int32)
+                    - prefix[start, lo:hi + 1]) / (end - start)
+        candidates = np.flatnonzero(strength >= minStrength)
+        if candidates.size == 0:
+            return value
+        nearest = candidates[np.argmin(np.abs(lo + candidates - value))]
+        return float(lo + nearest)
+
+    def snapX(self, x: float, top: float, bottom: float, radius=8, minStrength=0.6) -> float:
+        return self.snap(self.columns, x, top, bottom, radius, minStrength)
+
+    def snapY(self, y: float, left: float, right: float, radius=8, minStrength=0.6) -> float:
+        # Rows are stored transposed, so both lookups slice the same way
+        return self.snap(self.rows.T, y, left, right, radius, minStrength)
+
+
+def snapEnabled() -> bool:
+    return np is not None and \
+        QSettings().value("selection/edgeSnap", True, type=bool)
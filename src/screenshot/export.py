@@ -0,0 +1,355 @@
+import os
+import struct
+import zlib
+from math import ceil
+from time import perf_counter
+
+from PySide6.QtCore import (Qt, QObject, QRunnable, QThreadPool, QSettings,
+                            Signal, QRect)
+from PySide6.QtGui import QImage, QImageWriter, QPainter, QTransform
+
+from typings import ExportStats
+from .frame import Frame
+
+
+class StripComposer():
+    # Composes the final screenshot a few rows at a time, so a huge selection
+    # never needs a full-size copy of the screenshot, effects or drawings.
+    # Each strip reads its rows through a view of the frame, so a lazily
+    # decoded one waits for just those, on the writer's thread.
+    STRIP_BYTES = 8 * 1024 * 1024
+
+    frame: Frame
+    selection: QRect
+    flip: tuple[int, int]
+    drawings: list[tuple[QRect, QImage]]
+    redactions: list[tuple[QRect, QImage]]
+
+    def __init__(self, frame: Frame, selection: QRect, flip: tuple[int, int],
+                 drawings: list[tuple[QRect, QImage]],
+                 redactions: list[tuple[QRect, QImage]] = None) -> None:
+        self.frame = frame
+        self.selection = selection.normalized()
+        self.flip = flip
+        self.drawings = drawings
+        self.redactions = redactions or []
+
+    def width(self) -> int:
+        return self.selection.width()
+
+    def height(self) -> int:
+        return self.selection.height()
+
+    def stripHeight(self) -> int:
+        return max(1, min(self.height(), self.STRIP_BYTES // max(1, self.width()*4)))
+
+    def strip(self, top: int, height: int) -> QImage:
+        sel = self.selection
+        fx, fy = self.flip
+
+        # Source rows mirror the output rows when flipped vertically
+        srcTop = sel.top() + top if fy == 1 \
+            else sel.top() + sel.height() - top - height
+        srcRect = QRect(sel.left(), srcTop, sel.width(), height)
+        strip = self.frame.view(srcRect)
+
+        # Redactions replace captured pixels, before effects
+        if self.redactions:
+            strip = strip.convertToFormat(
+                QImage.Format.Format_ARGB32_Premultiplied)
+            painter = QPainter(strip)
+            painter.translate(-srcRect.left(), -srcRect.top())
+            for rect, image in self.redactions:
+                if rect.intersects(srcRect):
+                    painter.drawImage(rect, image)
+            painter.end()
+
+        if fx != 1 or fy != 1:
+            strip = strip.transformed(QTransform().scale(fx, fy))
+        strip = strip.convertToFormat(QImage.Format.Format_ARGB32_Premultiplied)
+
+        # Post effects do not apply to drawings.
+        stripRect = QRect(sel.left(), sel.top() + top, sel.width(), height)
+        painter = QPainter(strip)
+        painter.translate(-stripRect.left(), -stripRect.top())
+        for rect, image in self.drawings:
+            if rect.intersects(stripRect):
+                painter.drawImage(rect, image)
+        painter.end()
+
+        return strip
+
+    def strips(self):
+        step = self.stripHeight()
+        for top in range(0, self.height(), step):
+            yield self.strip(top, min(step, self.height() - top))
+
+    def compose(self) -> QImage:
+        # The whole screenshot at once, for encoders that need an image
+        image = QImage(self.width(), self.height(),
+                       QImage.Format.Format_ARGB32_Premultiplied)
+        painter = QPainter(image)
+        painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_Source)
+        top = 0
+        for strip in self.strips():
+            painter.drawImage(0, top, strip)
+            top += strip.height()
+        painter.end()
+        return image
+
+
+class Encoder():
+    name: str = "Image"
+    format: bytes = b""
+    extensions: tuple[str, ...] = ()
+    streamed: bool = False
+
+    def prepare(self, image: QImage) -> QImage:
+        return image
+
+    def configure(self, writer: QImageWriter) -> None:
+        pass
+
+    def encode(self, image: QImage, fileName: str) -> bool:
+        writer = QImageWriter(fileName)
+        if self.format:
+            writer.setFormat(self.format)
+        self.configure(writer)
+        return writer.write(self.prepare(image))
+
+
+class PngEncoder(Encoder):
+    name = "PNG"
+    format = b"png"
+    extensions = ("png",)
+
+    compression: int
+
+    def __init__(self, compression=6) -> None:
+        # zlib level, 0 (fastest) to 9 (smallest)
+        self.compression = max(0, min(9, compression))
+
+    def configure(self, writer: QImageWriter) -> None:
+        # Qt expects a 0-100 ratio and maps it back onto zlib levels
+        writer.setCompression(ceil(self.compression * 100 / 9))
+
+
+class PalettePngEncoder(PngEncoder):
+    # Indexed PNG, a good fit for UI captures with few distinct colors.
+    name = "PNG (palette)"
+
+    dither: bool
+
+    def __init__(self, compression=6, dither=False) -> None:
+        super().__init__(compression)
+        self.dither = dither
+
+    def prepare(self, image: QImage) -> QImage:
+        # Exact palette when the image has few enough colors. Qt only looks
+        # for one in images without alpha, and screenshots come with an
+        # alpha channel that is almost always opaque.
+        flags = Qt.ImageConversionFlag.ThresholdDither | \
+            Qt.ImageConversionFlag.AvoidDither
+        if self.dither:
+            flags = Qt.ImageConversionFlag.DiffuseDither
+        if self.opaque(image):
+            image = image.convertToFormat(QImage.Format.Format_RGB32)
+        return image.convertToFormat(QImage.Format.Format_Indexed8, flags)
+
+    @staticmethod
+    def opaque(image: QImage) -> bool:
+        if not image.hasAlphaChannel():
+            return True
+        alpha = image.convertToFormat(QImage.Format.Format_Alpha8)
+        full = QImage(alpha.size(), QImage.Format.Format_Alpha8)
+        full.fill(255)
+        return alpha == full
+
+
+class StripPngEncoder(PngEncoder):
+    # Writes a StripComposer's output to disk strip by strip.
+    name = "PNG (streamed)"
+    streamed = True
+
+    def chunk(self, file, tag: bytes, data: bytes) -> None:
+        file.write(struct.pack(">I", len(data)))
+        file.write(tag)
+        file.write(data)
+        file.write(struct.pack(">I", zlib.crc32(data, zlib.crc32(tag))))
+
+    def encode(self, composer: StripComposer, fileName: str) -> bool:
+        width, height = composer.width(), composer.height()
+        if width <= 0 or height <= 0:
+            return False
+
+        rowBytes = width * 4
+        compressor = zlib.compressobj(self.compression)
+        try:
+            with open(fileName, "wb") as file:
+                file.write(b"\x89PNG\r\n\x1a\n")
+                # 8 bit RGBA, no interlacing
+                self.chunk(file, b"IHDR", struct.pack(
+                    ">IIBBBBB", width, height, 8, 6, 0, 0, 0))
+
+                for strip in composer.strips():
+                    strip = strip.convertToFormat(
+                        QImage.Format.Format_RGBA8888)
+                    bits = strip.constBits()
+                    stride = strip.bytesPerLine()
+
+                    # Each row is prefixed with filter type 0 (None)
+                    raw = bytearray()
+                    for y in range(strip.height()):
+                        raw += b"\x00"
+                        raw += bits[y*stride:y*stride+rowBytes]
+
+                    data = compressor.compress(raw)
+                    if data:
+                        self.chunk(file, b"IDAT", data)
+
+                self.chunk(file, b"IDAT", compressor.flush())
+                self.chunk(file, b"IEND", b"")
+        except OSError:
+            return False
+        return True
+
+
+class JpegEncoder(Encoder):
+    name = "JPEG"
+    format = b"jpg"
+    extensions = ("jpg", "jpeg")
+
+    quality: int
+
+    def __init__(self, quality=90) -> None:
+        self.quality = max(0, min(100, quality))
+
+    def configure(self, writer: QImageWriter) -> None:
+        writer.setQuality(self.quality)
+        writer.setOptimizedWrite(True)
+
+    def prepare(self, image: QImage) -> QImage:
+        # JPEG has no alpha channel
+        return image.convertToFormat(QImage.Format.Format_RGB32)
+
+
+class WebpEncoder(Encoder):
+    name = "WebP"
+    format = b"webp"
+    extensions = ("webp",)
+
+    quality: int
+
+    def __init__(self, quality=90) -> None:
+        # 100 is lossless
+        self.quality = max(0, min(100, quality))
+
+    def configure(self, writer: QImageWriter) -> None:
+        writer.setQuality(self.quality)
+
+
+def encoderFor(fileName: str, pixels: int = 0) -> Encoder:
+    # Pass the output pixel count to allow a streamed encoder for huge images.
+    settings = QSettings()
+    ext = os.path.splitext(fileName)[1].lower().lstrip(".")
+
+    if ext in JpegEncoder.extensions:
+        return JpegEncoder(int(settings.value("export/jpegQuality", 90)))
+    if ext in WebpEncoder.extensions:
+        return WebpEncoder(int(settings.value("export/webpQuality", 90)))
+
+    compression = int(settings.value("export/pngCompression", 6))
+    if ext in PngEncoder.extensions or not ext:
+        if settings.value("export/palettePng", False, type=bool):
+            return PalettePngEncoder(compression)
+        threshold = int(settings.value("export/streamedMegapixels", 16))
+        if threshold > 0 and pixels >= threshold * 1000000:
+            return StripPngEncoder(compression)
+        return PngEncoder(compression)
+
+    # Anything else is left to Qt's defaults for that extension
+    return Encoder()
+
+
+class EncodeTask(QRunnable):
+    class Signals(QObject):
+        finished = Signal(ExportStats)
+        failed = Signal(str)
+        composed = Signal(QImage)
+
+    def __init__(self, image: QImage | StripComposer, fileName: str, encoder: Encoder,
+                 reserved: bool = False) -> None:
+        super().__init__()
+        self.image = image
+        self.fileName = fileName
+        # What a failed encode leaves behind is removed, unless it was
+        # there before. A reserved file was only created to hold the name,
+        # see quicksave.nextFileName.
+        self.existed = os.path.exists(fileName) and not reserved
+        self.encoder = encoder
+        self.signals = self.Signals()
+
+    def run(self) -> None:
+        start = perf_counter()
+        try:
+            if isinstance(self.image, StripComposer) and not self.encoder.streamed:
+                self.image = self.image.compose()
+                self.signals.composed.emit(self.image)
+            ok = self.encoder.encode(self.image, self.fileName)
+        except Exception as e:
+            # Anything but a failed write is a bug, still reported as a
+            # failed save instead of never finishing
+            print(f"Unable to encode {self.fileName}:", e)
+            ok = False
+        elapsed = perf_counter() - start
+
+        if not ok and not self.existed:
+            try:
+                os.remove(self.fileName)
+            except OSError:
+                pass
+
+        if ok:
+            self.signals.finished.emit(ExportStats(
+                self.fileName, self.encoder.name,
+                elapsed, os.path.getsize(self.fileName)
+            ))
+        else:
+            self.signals.failed.emit(self.fileName)
+        self.image = None
+
+
+class Exporter(QObject):
+    finished = Signal(ExportStats)
+    failed = Signal(str)
+    # A screenshot composed on a worker thread, see save
+    composed = Signal(QImage)
+
+    pool: QThreadPool
+    tasks: set[EncodeTask]
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.pool = QThreadPool(self)
+        self.tasks = set()
+
+    def save(self, image: QImage | StripComposer, fileName: str, encoder: Encoder = None,
+             reserved: bool = False) -> None:
+        # QImage, unlike QPixmap, is safe to use outside of the GUI thread.
+        # Streamed encoders take a StripComposer instead of an image,
+        # animation encoders a Recording. A StripComposer handed to any
+        # other encoder is composed on the worker thread. A reserved file,
+        # from quicksave.nextFileName, is removed if the save fails.
+        task = EncodeTask(image, fileName, encoder or encoderFor(fileName), reserved)
+        task.setAutoDelete(False)
+        task.signals.finished.connect(self.finished)
+        task.signals.failed.connect(self.failed)
+        task.signals.composed.connect(self.composed)
+        task.signals.finished.connect(lambda _: self.tasks.discard(task))
+        task.signals.failed.connect(lambda _: self.tasks.discard(task))
+
+        self.tasks.add(task)
+        self.pool.start(task)
+
+    def wait(self) -> None:
+        self.pool.waitForDone()
@@ -0,0 +1,145 @@
+import ctypes
+import mmap
+
+from PySide6.QtCore import QRect, QSize
+from PySide6.QtGui import QImage
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+class Frame():
+    # The single CPU-side pixel buffer of a capture. Consumers get views of
+    # it instead of their own copies:
+    #   image()  - the whole frame, copy-on-write if anyone paints on it
+    #   view()   - a sub-rect sharing the buffer, copy-on-write as well
+    #   buffer() - a read-only memoryview of the raw pixels
+    #   array()  - a read-only numpy view, optionally of a sub-rect
+    # Views keep the frame alive for as long as they are referenced.
+    #
+    # A frame may be mapped from a file and decoded in the background:
+    # view() and array() of a sub-rect wait for just that rect, anything
+    # else for the whole frame. Painting asks with request() or a view
+    # that does not wait, and shows what is there so far. The mapping
+    # belongs to the frame, and goes with it and the last of its views.
+    FORMAT = QImage.Format.Format_ARGB32_Premultiplied
+    DEPTH = 4
+
+    __image: QImage
+    __address: int
+    mapping: mmap.mmap
+    source: str  # File the pixels are mapped from, if any
+    loader: object  # Decodes the pixels from a file as they are needed
+
+    def __init__(self, image: QImage, loader=None) -> None:
+        # Takes over the image, which nobody else should paint on afterwards.
+        if image.format() != self.FORMAT:
+            image = image.convertToFormat(self.FORMAT)
+        self.__image = image
+        self.mapping = None
+        self.source = None
+        self.loader = loader
+        # Not shared yet, so bits() does not detach
+        self.__address = ctypes.addressof(ctypes.c_char.from_buffer(image.bits()))
+
+    @classmethod
+    def mapped(cls, path: str, offset: int, width: int, height: int,
+               stride: int, writable=False, loader=None) -> "Frame":
+        # Raw pixels at offset in a file. Writes reach the file only when
+        # writable, otherwise they stay private to the process.
+        with open(path, "r+b" if writable else "rb") as file:
+            mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_WRITE
+                                if writable else mmap.ACCESS_COPY)
+        # The image holds on to the memoryview, which holds on to the
+        # mapping. It is unmapped, and the file closed, once both are gone.
+        pixels = memoryview(mapping)[offset:offset + stride*height]
+        frame = cls(QImage(pixels, width, height, stride, cls.FORMAT), loader)
+        frame.mapping = mapping
+        frame.source = path
+        return frame
+
+    def load(self, rect: QRect = None) -> None:
+        # Waits for what is still missing of rect, or of the whole frame
+        if self.loader is not None:
+            self.loader.load(self, self.rect() if rect is None else rect)
+
+    def request(self, rect: QRect) -> bool:
+        # Asks for what is missing of rect without waiting, True when
+        # nothing is
+        return self.loader is None or self.loader.request(self, rect)
+
+    def width(self) -> int:
+        return self.__image.width()
+
+    def height(self) -> int:
+        return self.__image.height()
+
+    def size(self) -> QSize:
+        return self.__image.size()
+
+    def rect(self) -> QRect:
+        return self.__image.rect()
+
+    def stride(self) -> int:
+        return self.__image.bytesPerLine()
+
+    def sizeInBytes(self) -> int:
+        return self.__image.sizeInBytes()
+
+    def image(self) -> QImage:
+        # Implicitly shared, painting on it detaches a private copy. Like
+        # views, it keeps the frame alive, and with it a mapped buffer.
+        self.load()
+        image = QImage(self.__image)
+        image._frame = self
+        return image
+
+    def memory(self, offset: int, size: int) -> ctypes.Array:
+        memory = (ctypes.c_char * size).from_address(self.__address + offset)
+        memory._frame = self
+        return memory
+
+    def view(self, rect: QRect, wait=True) -> QImage:
+        # Without waiting, what is not decoded yet is transparent
+        rect = rect.normalized().intersected(self.rect())
+        if rect.isEmpty():
+            return QImage()
+        if rect == self.rect() and wait:
+            return self.image()
+
+        if wait:
+            self.load(rect)
+        else:
+            self.request(rect)
+        stride = self.stride()
+        offset = rect.top()*stride + rect.left()*self.DEPTH
+        size = (rect.height() - 1)*stride + rect.width()*self.DEPTH
+        view = QImage(
+            self.memory(offset, size), rect.width(), rect.height(),
+            stride, self.FORMAT
+        )
+        # Hand out a second reference, so writes detach instead of
+        # reaching the frame. It keeps the view, and the frame, alive.
+        shared = QImage(view)
+        shared._view = view
+        return shared
+
+    def buffer(self) -> memoryview:
+        self.load()
+        return memoryview(self.memory(0, self.sizeInBytes())).toreadonly()
+
+    def array(self, rect: QRect = None):
+        # (height, width, 4) uint8 array in BGRA order on little endian
+        self.load(rect)
+        pixels = memoryview(self.memory(0, self.sizeInBytes())).toreadonly()
+        array = np.frombuffer(pixels, np.uint8).reshape(
+            self.height(), self.stride()
+        )[:, :self.width()*self.DEPTH].reshape(
+            self.height(), self.width(), self.DEPTH
+        )
+        if rect is not None:
+            rect = rect.normalized().intersected(self.rect())
+            array = array[rect.top():rect.bottom() + 1,
+                          rect.left():rect.right() + 1]
+        return array
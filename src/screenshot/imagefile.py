@@ -0,0 +1,194 @@
+import os
+import tempfile
+import threading
+import weakref
+from math import ceil
+
+from PySide6.QtCore import QObject, QRect, QSettings, QStandardPaths, Signal
+from PySide6.QtGui import QImageReader, QImageIOHandler
+
+from .frame import Frame
+
+
+def lazyMegapixels() -> int:
+    # Files from this size on are decoded in the background, 0 never
+    return int(QSettings().value("open/lazyMegapixels", 16))
+
+
+def cacheDirectory() -> str:
+    return os.path.join(QStandardPaths.writableLocation(
+        QStandardPaths.StandardLocation.CacheLocation), "images")
+
+
+def clearCache() -> None:
+    # Caches are deleted as soon as they are mapped, where the system lets
+    # a mapped file be deleted. Elsewhere they are left for the next run.
+    for name in os.listdir(cacheDirectory()):
+        try:
+            os.remove(os.path.join(cacheDirectory(), name))
+        except OSError:
+            pass
+
+
+class LazyDecoder(QObject):
+    # Decodes an image file into a frame mapped over a raw cache file, on a
+    # thread of its own, top to bottom. Bands of rows are filled as they
+    # arrive, and decoded announces them, so what is painted meanwhile only
+    # shows what is there so far. What is asked for jumps the queue.
+    #
+    # Every read of a file starts over from its top, so rows are read in a
+    # few large chunks rather than band by band. Formats that cannot decode
+    # a clip rect are read whole. A chunk that fails to decode keeps its
+    # bands missing; they are tried again when someone waits for them.
+    # Decoded pages belong to the cache file, so the system can write them
+    # out and drop them instead of holding the image in memory.
+    decoded = Signal(QRect)  # Emitted from the decoding thread
+
+    BAND = 256
+    CHUNK = 64 * 1024 * 1024  # Bytes of rows per read
+
+    path: str
+    clip: bool
+    missing: set[int]
+    failed: set[int]  # Missing bands whose last read failed
+    wanted: list[int]  # First bands of the latest requests, newest last
+    thread: threading.Thread
+    frame: weakref.ref
+
+    def __init__(self, path: str, height: int, clip: bool) -> None:
+        super().__init__()
+        self.path = path
+        self.clip = clip
+        self.missing = set(range(ceil(height / self.BAND)))
+        self.failed = set()
+        self.wanted = []
+        self.thread = None
+        self.frame = None
+        self.condition = threading.Condition()
+
+    def bands(self, frame: Frame, rect: QRect) -> range:
+        rect = rect.normalized().intersected(frame.rect())
+        if rect.isEmpty():
+            return range(0)
+        return range(rect.top() // self.BAND, rect.bottom() // self.BAND + 1)
+
+    def request(self, frame: Frame, rect: QRect) -> bool:
+        # Queues what is missing of rect without waiting, True when nothing is
+        with self.condition:
+            bands = [band for band in self.bands(frame, rect)
+                     if band in self.missing]
+            if not bands:
+                return True
+            self.wanted.append(bands[0])
+            self.start(frame)
+            return False
+
+    def load(self, frame: Frame, rect: QRect) -> None:
+        # Waits for rect, retrying bands that failed before
+        bands = self.bands(frame, rect)
+        with self.condition:
+            self.failed.difference_update(bands)
+            if self.request(frame, rect):
+                return
+            self.condition.wait_for(lambda: not any(
+                band in self.missing and band not in self.failed
+                for band in bands))
+
+    def start(self, frame: Frame) -> None:
+        # With the condition held
+        self.frame = weakref.ref(frame)
+        if self.thread is None:
+            self.thread = threading.Thread(
+                target=self.run, name="LazyDecoder", daemon=True)
+            self.thread.start()
+
+    def next(self, frame: Frame) -> range:
+        # The bands to read next, with the condition held. None when done.
+        pending = self.missing - self.failed
+        if not pending:
+            return None
+        if not self.clip:
+            return range(ceil(frame.height() / self.BAND))
+        while self.wanted and self.wanted[-1] not in pending:
+            self.wanted.pop()
+        first = self.wanted[-1] if self.wanted else min(pending)
+        count = max(1, self.CHUNK // (self.BAND * frame.stride()))
+        last = first
+        while last + 1 in pending and last + 1 - first < count:
+            last += 1
+        return range(first, last + 1)
+
+    def run(self) -> None:
+        # Runs on the decoding thread for as long as bands are pending
+        while True:
+            with self.condition:
+                frame = self.frame()
+                bands = None if frame is None else self.next(frame)
+                if bands is None:
+                    self.thread = None
+                    self.condition.notify_all()
+                    return
+            top = bands.start * self.BAND
+            bottom = min(frame.height(), bands.stop * self.BAND)
+            rect = QRect(0, top, frame.width(), bottom - top)
+            decoded = self.decode(frame, rect)
+            frame = None  # Lets the frame go while nothing is read
+            with self.condition:
+                if decoded:
+                    self.missing.difference_update(bands)
+                else:
+                    self.failed.update(bands)
+                self.condition.notify_all()
+            if decoded:
+                self.decoded.emit(rect)
+
+    def decode(self, frame: Frame, rect: QRect) -> bool:
+        reader = QImageReader(self.path)
+        if rect != frame.rect():
+            reader.setClipRect(rect)
+        image = reader.read()
+        if image.isNull():
+            # Stays transparent, there is no one to tell from here
+            return False
+        image = image.convertToFormat(Frame.FORMAT)
+
+        stride = frame.stride()
+        rows = min(image.height(), rect.height())
+        length = min(image.bytesPerLine(), stride)
+        source = image.constBits()
+        if image.bytesPerLine() == stride:
+            target = memoryview(frame.memory(rect.top()*stride, rows*stride))
+            target.cast("B")[:] = source[:rows*stride]
+            return True
+        for y in range(rows):
+            target = memoryview(frame.memory((rect.top() + y)*stride, length))
+            start = y * image.bytesPerLine()
+            target.cast("B")[:] = source[start:start + length]
+        return True
+
+
+def openImageFile(path: str) -> Frame:
+    # None when the file cannot be read
+    reader = QImageReader(path)
+    size = reader.size()
+    w, h = size.width(), size.height()
+    threshold = lazyMegapixels() * 1_000_000
+    if not size.isValid() or not threshold or w * h < threshold:
+        image = reader.read()
+        return None if image.isNull() else Frame(image)
+
+    os.makedirs(cacheDirectory(), exist_ok=True)
+    clearCache()
+    handle, cache = tempfile.mkstemp(".raw", dir=cacheDirectory())
+    stride = w * Frame.DEPTH
+    with os.fdopen(handle, "wb") as file:
+        file.truncate(stride * h)  # Sparse, nothing is written yet
+
+    decoder = LazyDecoder(os.path.abspath(path), h, reader.supportsOption(
+        QImageIOHandler.ImageOption.ClipRect))
+    frame = Frame.mapped(cache, 0, w, h, stride, writable=True, loader=decoder)
+    try:
+        os.remove(cache)  # Mapped, it lives until the mapping goes
+    except OSError:
+        pass
+    return frame
@@ -0,0 +1,260 @@
+import json
+import os
+import struct
+from typing import NamedTuple
+
+from PySide6.QtCore import QObject, QRect, QRunnable, QThreadPool, QStandardPaths
+from PySide6.QtGui import QImage
+
+from typings import Stroke
+from .drawing import PostEffects
+from .frame import Frame
+
+
+class JournalSession(NamedTuple):
+    Geometry: QRect
+    Image: QImage
+    # ("add", Stroke), ("undo", None), ("redo", None),
+    # ("selection", QRect) and ("effects", (flipX, flipY, angle)) in order
+    Operations: list[tuple[str, object]]
+    Path: str = None  # Image or project file the capture is read from
+
+
+class Journal(QObject):
+    # Append-only log of an overlay session: the capture once, then every
+    # annotation operation as it happens. The file is deleted once the
+    # screenshot was saved or copied, or the overlay was closed on purpose.
+    # Losing focus or a crash leave it behind to be restored. All file
+    # access runs in order on one worker thread. A write that fails ends
+    # journaling for the session, the overlay carries on without it.
+    #
+    # A record is a 4 byte little endian payload length, a type byte and
+    # the payload. A record cut short by a crash is ignored.
+    MAGIC = b"UNISHOTJ\x01"
+    BASE = b"B"
+    FILE = b"F"
+    ADD = b"A"
+    UNDO = b"U"
+    REDO = b"R"
+    SELECTION = b"S"
+    EFFECTS = b"E"
+
+    frame: Frame
+    geometry: QRect
+    begun: bool
+    file: object
+    recovered: bool
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.frame = None
+        self.geometry = None
+        self.begun = False
+        self.file = None
+
+        os.makedirs(self.directory(), exist_ok=True)
+        # Left behind by a crash
+        self.recovered = os.path.exists(self.sessionPath())
+        if self.recovered:
+            os.replace(self.sessionPath(), self.interruptedPath())
+
+    @staticmethod
+    def directory() -> str:
+        return os.path.join(QStandardPaths.writableLocation(
+            QStandardPaths.StandardLocation.AppLocalDataLocation), "journal")
+
+    def sessionPath(self) -> str:
+        return os.path.join(self.directory(), "session.journal")
+
+    def interruptedPath(self) -> str:
+        return os.path.join(self.directory(), "interrupted.journal")
+
+    def run(self, func) -> None:
+        self.pool.start(QRunnable.create(func))
+
+    def start(self, frame: Frame, geometry: QRect) -> None:
+        # Nothing is written until the first operation
+        self.close()
+        self.frame = frame
+        self.geometry = QRect(geometry)
+        self.begun = False
+
+    def begin(self) -> None:
+        if self.begun or self.frame is None:
+            return
+        self.begun = True
+        frame, g = self.frame, self.geometry
+        header = struct.pack("<iiiii", g.x(), g.y(), frame.width(),
+                             frame.height(), frame.stride())
+
+        # A capture read from a file, a lazily decoded image or a project,
+        # is journaled by path, instead of read and copied
+        path = None
+        if frame.loader is not None:
+            path = frame.loader.path.encode()
+        elif frame.source is not None:
+            path = frame.source.encode()
+
+        def open_() -> None:
+            try:
+                # The last unfinished session becomes the interrupted one
+                if os.path.exists(self.sessionPath()):
+                    os.replace(self.sessionPath(), self.interruptedPath())
+                self.file = open(self.sessionPath(), "wb")
+                self.file.write(self.MAGIC)
+                if path is not None:
+                    self.file.write(struct.pack(
+                        "<IB", len(header) + len(path), self.FILE[0]))
+                    self.file.write(header)
+                    self.file.write(path)
+                else:
+                    self.file.write(struct.pack(
+                        "<IB", len(header) + frame.sizeInBytes(), self.BASE[0]))
+                    self.file.write(header)
+                    self.file.write(frame.buffer())
+                self.file.flush()
+            except OSError:
+                self.closeFile()
+        self.run(open_)
+
+    def record(self, kind: bytes, payload: bytes = b"") -> None:
+        if self.frame is None:
+            return
+        self.begin()
+        data = struct.pack("<IB", len(payload), kind[0]) + payload
+
+        def write() -> None:
+            if self.file is not None:
+                try:
+                    self.file.write(data)
+                    self.file.flush()
+                except OSError:
+                    self.closeFile()
+        self.run(write)
+
+    def change(self, operation: str, stroke: Stroke) -> None:
+        # Connected to Draw.changed
+        match operation:
+            case "add":
+                self.record(self.ADD, json.dumps(
+                    stroke.toList(), separators=(",", ":")).encode())
+            case "undo":
+                self.record(self.UNDO)
+            case "redo":
+                self.record(self.REDO)
+
+    def selection(self, rect: QRect) -> None:
+        self.record(self.SELECTION, struct.pack(
+            "<iiii", rect.x(), rect.y(), rect.width(), rect.height()))
+
+    def effects(self, effects: PostEffects) -> None:
+        flip = effects.flip()
+        self.record(self.EFFECTS, struct.pack(
+            "<bbh", flip.x, flip.y, effects.angle()))
+
+    def close(self) -> None:
+        # The session ended without a result, the file stays
+        self.frame = None
+        self.begun = False
+
+        self.run(self.closeFile)
+
+    def closeFile(self) -> None:
+        # On the worker. Without a file later writes do nothing. A record
+        # a failed write cut short is ignored, what came before it can
+        # still be restored.
+        file, self.file = self.file, None
+        if file is not None:
+            try:
+                file.close()
+            except OSError:
+                pass
+
+    def discard(self) -> None:
+        # The session ended with a saved or copied screenshot, or was
+        # dismissed
+        wasBegun = self.begun
+        self.close()
+        if wasBegun:
+            def remove() -> None:
+                try:
+                    os.remove(self.sessionPath())
+                except OSError:
+                    pass  # Never written, or gone already
+            self.run(remove)
+
+    def interrupted(self) -> bool:
+        self.pool.waitForDone()
+        return os.path.exists(self.interruptedPath())
+
+    def restore(self) -> JournalSession:
+        # Reads the interrupted session and removes it. It is journaled
+        # again as soon as it is reopened. Raises OSError or ValueError when
+        # it cannot be read, and leaves it there.
+        if not self.interrupted():
+            return None
+        path = self.interruptedPath()
+        try:
+            session = self.read(path)
+        except struct.error as e:
+            raise ValueError(f"Damaged session journal: {e}")
+        os.remove(path)
+        return session
+
+    @classmethod
+    def read(cls, path: str) -> JournalSession:
+        with open(path, "rb") as file:
+            if file.read(len(cls.MAGIC)) != cls.MAGIC:
+                raise ValueError("Not a session journal")
+            geometry, image, path, operations = None, None, None, []
+            while True:
+                head = file.read(5)
+                if len(head) < 5:
+                    break
+                size, kind = struct.unpack("<IB", head)
+                payload = file.read(size)
+                if len(payload) < size:
+                    break  # Cut short by a crash
+
+                match bytes([kind]):
+                    case cls.BASE:
+                        x, y, w, h, stride = struct.unpack_from("<iiiii", payload)
+                        geometry = QRect(x, y, w, h)
+                        image = QImage(w, h, Frame.FORMAT)
+                        # One copy, straight into the image
+                        pixels = memoryview(payload)[20:]
+                        bits = image.bits()
+                        if image.bytesPerLine() == stride:
+                            bits[:stride*h] = pixels[:stride*h]
+                        else:
+                            row = w * Frame.DEPTH
+                            for i in range(h):
+                                start = i * image.bytesPerLine()
+                                bits[start:start + row] = \
+                                    pixels[i*stride:i*stride + row]
+                    case cls.FILE:
+                        x, y, w, h, stride = struct.unpack_from("<iiiii", payload)
+                        geometry = QRect(x, y, w, h)
+                        path = payload[20:].decode()
+                    case cls.ADD:
+                        operations.append(
+                            ("add", Stroke.fromList(json.loads(payload))))
+                    case cls.UNDO:
+                        operations.append(("undo", None))
+                    case cls.REDO:
+                        operations.append(("redo", None))
+                    case cls.SELECTION:
+                        operations.append(
+                            ("selection", QRect(*struct.unpack("<iiii", payload))))
+                    case cls.EFFECTS:
+                        operations.append(
+                            ("effects", struct.unpack("<bbh", payload)))
+
+        if image is None and path is None:
+            raise ValueError("No capture in the journal")
+        return JournalSession(geometry, image, operations, path)
+
+    def wait(self) -> None:
+        self.pool.waitForDone()
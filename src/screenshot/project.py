@@ -0,0 +1,127 @@
+import json
+import os
+import struct
+from typing import NamedTuple
+
+from PySide6.QtCore import QRect
+
+from typings import Stroke
+from .export import Encoder
+from .frame import Frame
+
+# A .unishot project keeps a screenshot editable: the capture, the selection,
+# the post effects and every annotation as the strokes it was drawn from.
+#
+#   0     header, padded to a page
+#   4096  raw ARGB32 premultiplied pixels, page aligned
+#   ...   JSON metadata
+#
+# Reopening maps the pixels instead of decoding them, so it takes about the
+# same time whatever the size. Metadata comes last, saving a reopened
+# project again only rewrites the metadata and the header.
+MAGIC = b"UNISHOTP"
+VERSION = 1
+PAGE = 4096
+HEADER = struct.Struct("<8sIIQQQQ")  # magic, version, format, pixels, metadata
+
+
+class Project(NamedTuple):
+    Geometry: QRect
+    Frame: Frame
+    Selection: QRect
+    Effects: tuple[int, int, int]  # flip x, flip y, angle
+    Drawings: list[Stroke]
+    Undone: list[Stroke]  # Redo history, the next redo last
+
+
+def rect(r: QRect) -> list[int]:
+    return [r.x(), r.y(), r.width(), r.height()]
+
+
+def metadata(project: Project) -> bytes:
+    frame = project.Frame
+    return json.dumps({
+        "geometry": rect(project.Geometry),
+        "width": frame.width(),
+        "height": frame.height(),
+        "stride": frame.stride(),
+        "selection": rect(project.Selection),
+        "effects": list(project.Effects),
+        "drawings": [s.toList() for s in project.Drawings],
+        "undone": [s.toList() for s in project.Undone],
+    }, separators=(",", ":")).encode()
+
+
+class ProjectEncoder(Encoder):
+    # Takes a Project instead of an image.
+    name = "Unishot project"
+    extensions = ("unishot",)
+    streamed = True
+
+    def encode(self, project: Project, fileName: str) -> bool:
+        frame = project.Frame
+        meta = metadata(project)
+        pixels = frame.sizeInBytes()
+        metaOffset = PAGE + pixels
+        header = HEADER.pack(MAGIC, VERSION, frame.FORMAT.value,
+                             PAGE, pixels, metaOffset, len(meta))
+        try:
+            if frame.source == os.path.abspath(fileName):
+                # The pixels are already there, and mapped
+                with open(fileName, "r+b") as file:
+                    file.seek(metaOffset)
+                    file.write(meta)
+                    try:
+                        file.truncate()
+                    except OSError:
+                        pass  # Trailing bytes are never read
+                    file.flush()
+                    os.fsync(file.fileno())
+                    file.seek(0)
+                    file.write(header)
+                return True
+
+            temp = fileName + ".part"
+            with open(temp, "wb") as file:
+                file.write(header.ljust(PAGE, b"\0"))
+                file.write(frame.buffer())
+                file.write(meta)
+            os.replace(temp, fileName)
+        except OSError:
+            return False
+        return True
+
+
+def load(path: str) -> Project:
+    # Raises OSError or ValueError when the file is not a usable project
+    path = os.path.abspath(path)
+    with open(path, "rb") as file:
+        try:
+            magic, version, format, pixelsOffset, pixelsSize, metaOffset, \
+                metaSize = HEADER.unpack(file.read(HEADER.size))
+        except struct.error:
+            raise ValueError("Not a Unishot project")
+        if magic != MAGIC or version > VERSION:
+            raise ValueError("Not a Unishot project")
+        if format != Frame.FORMAT.value:
+            raise ValueError("Unsupported pixel format")
+        length = os.fstat(file.fileno()).st_size
+        if metaOffset + metaSize > length or pixelsOffset + pixelsSize > length:
+            raise ValueError("Project file is truncated")
+        file.seek(metaOffset)
+        try:
+            meta = json.loads(file.read(metaSize))
+            w, h, stride = meta["width"], meta["height"], meta["stride"]
+        except (ValueError, KeyError) as e:
+            raise ValueError(f"Broken project metadata: {e}")
+        if stride * h > pixelsSize:
+            raise ValueError("Project file is truncated")
+
+    return Project(
+        QRect(*meta["geometry"]),
+        Frame.mapped(path, pixelsOffset, w, h, stride),
+        QRect(*meta["selection"]),
+        tuple(meta["effects"]),
+        [Stroke.fromList(s) for s in meta["drawings"]],
+        [Stroke.fromList(s) for s in meta["undone"]],
+    )
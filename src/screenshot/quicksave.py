@@ -0,0 +1,97 @@
+import os
+from datetime import datetime
+
+from PySide6.QtCore import QRect, QSettings, QStandardPaths
+from PySide6.QtGui import QGuiApplication
+
+# Fields of a quick-save file name template, in str.format syntax, so
+# "{counter:04}" pads the counter:
+#   {date}     2024-05-17
+#   {time}     14-03-59
+#   {counter}  increments with every quick-save
+#   {screen}   1-based index of the screen under the selection's center
+#   {width}, {height}  selection size in pixels
+DEFAULT_TEMPLATE = "Screenshot {date} {time}.png"
+
+# Files handed out and not saved yet, with the counter they took
+reserved: dict[str, int] = {}
+
+
+def folder() -> str:
+    return QSettings().value("quicksave/folder", "") or os.path.join(
+        QStandardPaths.writableLocation(
+            QStandardPaths.StandardLocation.PicturesLocation), "Unishot")
+
+
+def template() -> str:
+    return QSettings().value("quicksave/template", DEFAULT_TEMPLATE) \
+        or DEFAULT_TEMPLATE
+
+
+def screenIndex(region: QRect) -> int:
+    # 0 when the center is off every screen
+    center = region.center()
+    for i, screen in enumerate(QGuiApplication.screens()):
+        if screen.geometry().contains(center):
+            return i + 1
+    return 0
+
+
+def expand(template: str, region: QRect, counter: int) -> str:
+    # Raises ValueError on an unknown field or a malformed template
+    now = datetime.now()
+    try:
+        name = template.format(
+            date=now.strftime("%Y-%m-%d"),
+            time=now.strftime("%H-%M-%S"),
+            counter=counter,
+            screen=screenIndex(region),
+            width=region.width(),
+            height=region.height(),
+        )
+    except (KeyError, IndexError, ValueError) as e:
+        raise ValueError(f"Invalid quick-save template {template!r}: {e}")
+    if not os.path.splitext(name)[1]:
+        name += ".png"
+    return name
+
+
+def nextFileName(region: QRect) -> str:
+    # A new file for region, the saved selection in global coordinates.
+    # Raises OSError when the folder is not writable. Pass it to release
+    # once the save is done. An invalid template falls back to the default.
+    settings = QSettings()
+    counter = int(settings.value("quicksave/counter", 1))
+    try:
+        name = expand(template(), region, counter)
+    except ValueError:
+        name = expand(DEFAULT_TEMPLATE, region, counter)
+
+    path = os.path.join(folder(), name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    # Never overwrites. The file is created right away, so a second save
+    # within the same second gets a suffix even before the first is written.
+    # Saved with reserved set, a failed save removes it, see Exporter.save.
+    base, ext = os.path.splitext(path)
+    n = 2
+    while True:
+        try:
+            open(path, "xb").close()
+            settings.setValue("quicksave/counter", counter + 1)
+            reserved[path] = counter
+            return path
+        except FileExistsError:
+            path = f"{base} ({n}){ext}"
+            n += 1
+
+
+def release(path: str, saved: bool) -> None:
+    # A failed save hands its counter back, unless a later quick-save
+    # already took the next one
+    counter = reserved.pop(path, None)
+    if counter is None or saved:
+        return
+    settings = QSettings()
+    if int(settings.value("quicksave/counter", 1)) == counter + 1:
+        settings.setValue("quicksave/counter", counter)
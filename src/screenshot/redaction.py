@@ -0,0 +1,162 @@
+from math import log2
+
+from PySide6.QtCore import QRect, Qt
+from PySide6.QtGui import QImage
+
+from .edges import imageArray
+from .viewport import TilePyramid
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+FORMAT = QImage.Format.Format_ARGB32_Premultiplied
+
+
+def blockSize(strength: int) -> int:
+    # Pixelation blocks are powers of two, so pyramid levels match them
+    return 2 ** max(1, min(6, round(log2(max(2, strength)))))
+
+
+def alignedRect(rect: QRect, block: int, bounds: QRect) -> QRect:
+    # Pixelation blocks sit on a grid anchored at the image origin
+    left = rect.left() // block * block
+    top = rect.top() // block * block
+    right = -(-(rect.right() + 1) // block) * block
+    bottom = -(-(rect.bottom() + 1) // block) * block
+    return QRect(left, top, right - left, bottom - top).intersected(bounds)
+
+
+def arrayImage(array) -> QImage:
+    array = np.ascontiguousarray(array)
+    h, w = array.shape[:2]
+    return QImage(array.data, w, h, w * 4, FORMAT).copy()
+
+
+def pixelate(image: QImage, rect: QRect, block: int) -> QImage:
+    rect = rect.intersected(image.rect())
+    outer = alignedRect(rect, block, image.rect())
+    if rect.isEmpty():
+        return QImage()
+
+    if np is None:
+        small = image.copy(outer).scaled(
+            max(1, -(-outer.width() // block)),
+            max(1, -(-outer.height() // block)),
+            Qt.AspectRatioMode.IgnoreAspectRatio,
+            Qt.TransformationMode.SmoothTransformation
+        )
+        return small.scaled(
+            small.width() * block, small.height() * block,
+            Qt.AspectRatioMode.IgnoreAspectRatio,
+            Qt.TransformationMode.FastTransformation
+        ).copy(rect.translated(-outer.topLeft()))
+
+    source = image.copy(outer).convertToFormat(FORMAT)
+    pixels = imageArray(source).astype(np.uint32)
+    h, w = pixels.shape[:2]
+
+    # Block sums with reduceat, then averages spread back over each block
+    ys, xs = np.arange(0, h, block), np.arange(0, w, block)
+    sums = np.add.reduceat(np.add.reduceat(pixels, ys, axis=0), xs, axis=1)
+    heights = np.diff(np.append(ys, h))
+    widths = np.diff(np.append(xs, w))
+    means = sums // (heights[:, None, None] * widths[None, :, None])
+    result = np.repeat(np.repeat(means, heights, axis=0), widths, axis=1)
+
+    local = rect.translated(-outer.topLeft())
+    result = result[local.top():local.bottom() + 1,
+                    local.left():local.right() + 1].astype(np.uint8)
+    del source
+    return arrayImage(result)
+
+
+def boxBlur(pixels, radius: int, axis: int):
+    # Running mean along one axis from a cumulative sum, edges clamped
+    pad = [(0, 0)] * pixels.ndim
+    pad[axis] = (radius + 1, radius)
+    padded = np.pad(pixels, pad, mode="edge")
+    sums = np.cumsum(padded, axis=axis, dtype=np.uint32)
+    n = pixels.shape[axis]
+    upper = np.take(sums, np.arange(2*radius + 1, 2*radius + 1 + n), axis=axis)
+    lower = np.take(sums, np.arange(0, n), axis=axis)
+    return (upper - lower) // (2*radius + 1)
+
+
+def blur(image: QImage, rect: QRect, radius: int) -> QImage:
+    rect = rect.intersected(image.rect())
+    if rect.isEmpty():
+        return QImage()
+    # Sample around the rect, so its borders blur with their surroundings
+    outer = rect.adjusted(-2*radius, -2*radius, 2*radius, 2*radius) \
+        .intersected(image.rect())
+
+    if np is None:
+        return approximateBlur(image.copy(outer), radius) \
+            .copy(rect.translated(-outer.topLeft()))
+
+    source = image.copy(outer).convertToFormat(FORMAT)
+    pixels = imageArray(source).astype(np.uint32)
+    # Two box passes per axis approximate a gaussian
+    for _ in range(2):
+        pixels = boxBlur(boxBlur(pixels, radius, 0), radius, 1)
+
+    local = rect.translated(-outer.topLeft())
+    result = pixels[local.top():local.bottom() + 1,
+                    local.left():local.right() + 1].astype(np.uint8)
+    del source
+    return arrayImage(result)
+
+
+def approximateBlur(image: QImage, radius: int) -> QImage:
+    factor = max(1, radius // 2)
+    small = image.scaled(
+        max(1, image.width() // factor), max(1, image.height() // factor),
+        Qt.AspectRatioMode.IgnoreAspectRatio,
+        Qt.TransformationMode.SmoothTransformation
+    )
+    return small.scaled(
+        image.width(), image.height(),
+        Qt.AspectRatioMode.IgnoreAspectRatio,
+        Qt.TransformationMode.SmoothTransformation
+    )
+
+
+def pyramidLevel(pyramid: TilePyramid, rect: QRect, scale: int) -> tuple[QImage, int, QRect]:
+    # The part of the deepest level not coarser than the requested scale
+    # covering rect, with its factor and where it lies in that level
+    factor = 2 ** int(log2(max(1, scale)))
+    frame = pyramid.frame.rect()
+    bounds = QRect(0, 0, -(-frame.width() // factor), -(-frame.height() // factor))
+    area = QRect(
+        rect.left() // factor, rect.top() // factor,
+        -(-(rect.right() + 1) // factor) - rect.left() // factor,
+        -(-(rect.bottom() + 1) // factor) - rect.top() // factor
+    ).intersected(bounds)
+    return pyramid.region(int(log2(factor)), area), factor, area
+
+
+def previewPixelate(pyramid: TilePyramid, rect: QRect, block: int) -> QImage:
+    # Blocks read straight from the matching pyramid level while dragging,
+    # block sizes being powers of two
+    rect = rect.intersected(pyramid.frame.rect())
+    outer = alignedRect(rect, block, pyramid.frame.rect())
+    small, _, area = pyramidLevel(pyramid, outer, block)
+    return small.scaled(
+        small.width() * block, small.height() * block,
+        Qt.AspectRatioMode.IgnoreAspectRatio,
+        Qt.TransformationMode.FastTransformation
+    ).copy(rect.translated(-area.topLeft() * block))
+
+
+def previewBlur(pyramid: TilePyramid, rect: QRect, radius: int) -> QImage:
+    # Upscales a downsampled pyramid level instead of blurring full pixels
+    rect = rect.intersected(pyramid.frame.rect())
+    small, scale, area = pyramidLevel(pyramid, rect, radius)
+    return small.scaled(
+        small.width() * scale, small.height() * scale,
+        Qt.AspectRatioMode.IgnoreAspectRatio,
+        Qt.TransformationMode.SmoothTransformation
+    ).copy(rect.translated(-area.topLeft() * scale))
@@ -0,0 +1,124 @@
+from PySide6.QtCore import (QObject, QRunnable, QThreadPool, QSettings,
+                            QTimer, QBuffer, QByteArray, QIODevice, QPoint,
+                            Signal)
+from PySide6.QtGui import QImage, QImageWriter
+
+from memory import tracker
+from .frame import Frame
+
+
+class RetentionPolicy:
+    Release = "release"
+    Keep = "keep"
+    Compress = "compress"
+
+
+def policy() -> str:
+    return QSettings().value("memory/retention", RetentionPolicy.Release)
+
+
+def keepSeconds() -> int:
+    return int(QSettings().value("memory/keepSeconds", 30))
+
+
+class CompressTask(QRunnable):
+    # zlib level 1, lossless and still a fraction of the raw size.
+    COMPRESSION = 12
+
+    class Signals(QObject):
+        finished = Signal(int, QByteArray)
+
+    def __init__(self, generation: int, image: QImage) -> None:
+        super().__init__()
+        self.generation = generation
+        self.image = image
+        self.signals = self.Signals()
+
+    def run(self) -> None:
+        data = QByteArray()
+        buffer = QBuffer(data)
+        buffer.open(QIODevice.OpenModeFlag.WriteOnly)
+        writer = QImageWriter(buffer, b"png")
+        writer.setCompression(self.COMPRESSION)
+        if not writer.write(self.image):
+            data = QByteArray()  # Kept uncompressed
+        buffer.close()
+        self.image = None
+        self.signals.finished.emit(self.generation, data)
+
+
+class CaptureRetention(QObject):
+    # Keeps the last capture once the overlay hides, as the policy says:
+    # not at all, raw for a few seconds, or PNG compressed in memory, so
+    # it can be reopened. Frames mapped from a file, projects and lazily
+    # decoded images, are never kept: they are still in their file, and
+    # holding the mapping would keep the file open.
+    released = Signal()
+
+    generation: int
+    frame: Frame
+    origin: QPoint
+    compressed: QByteArray
+    tasks: set[CompressTask]
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.generation = 0
+        self.frame = None
+        self.origin = None
+        self.compressed = None
+        self.tasks = set()
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.release)
+
+    def hold(self, frame: Frame, origin: QPoint) -> None:
+        self.release()
+        if frame is None or frame.source is not None:
+            return
+        self.origin = QPoint(origin)
+
+        match policy():
+            case RetentionPolicy.Keep:
+                self.frame = frame
+                tracker.track("Retention", "frame", frame.image())
+                self.timer.start(keepSeconds() * 1000)
+            case RetentionPolicy.Compress:
+                # Raw until compressed, then only the PNG is kept
+                self.frame = frame
+                tracker.track("Retention", "frame", frame.image())
+                task = CompressTask(self.generation, frame.image())
+                task.setAutoDelete(False)
+                task.signals.finished.connect(self.compressFinished)
+                task.signals.finished.connect(
+                    lambda *_: self.tasks.discard(task))
+                self.tasks.add(task)
+                QThreadPool.globalInstance().start(task)
+
+    def compressFinished(self, generation: int, data: QByteArray) -> None:
+        if generation != self.generation or data.isEmpty():
+            return
+        self.compressed = data
+        self.frame = None
+        tracker.release("Retention", "frame")
+        tracker.track("Retention", "compressed", data)
+
+    def release(self) -> None:
+        self.generation += 1
+        self.timer.stop()
+        if self.frame is not None or self.compressed is not None:
+            self.frame = None
+            self.compressed = None
+            tracker.release("Retention")
+            self.released.emit()
+
+    def last(self) -> tuple[Frame, QPoint]:
+        # The last capture and where it was on the screens, decoded again
+        # if it was compressed. None once released.
+        if self.frame is not None:
+            return self.frame, self.origin
+        if self.compressed is not None:
+            image = QImage.fromData(self.compressed, "png")
+            if not image.isNull():
+                return Frame(image), self.origin
+        return None
@@ -0,0 +1,216 @@
+import zlib
+from collections import Counter
+from time import perf_counter
+from typing import Callable
+
+from PySide6.QtCore import QObject, QRect, QTimer, Signal
+from PySide6.QtGui import QImage, QPainter
+
+from memory import tracker
+from .frame import Frame
+from .control import CaptureControl
+
+
+def rowHashes(image: QImage) -> list[int]:
+    # CRC32 of every row, padding excluded
+    bits = image.constBits()
+    stride = image.bytesPerLine()
+    length = image.width() * image.depth() // 8
+    return [
+        zlib.crc32(bits[y*stride:y*stride+length])
+        for y in range(image.height())
+    ]
+
+
+def findShift(previous: list[int], current: list[int], minVotes=4) -> int:
+    # How many rows the content moved up between two grabs of the same
+    # region, so that current[y] == previous[y + shift]. Every row that is
+    # unique in the previous grab votes for a shift, blank and repeated rows
+    # cannot. Negative when scrolled back up, None when nothing matches.
+    if previous == current:
+        return 0
+    positions = {}
+    for y, row in enumerate(previous):
+        positions[row] = -1 if row in positions else y
+
+    votes = Counter()
+    for y, row in enumerate(current):
+        position = positions.get(row, -1)
+        if position >= 0:
+            votes[position - y] += 1
+    if not votes:
+        return None
+    shift, count = votes.most_common(1)[0]
+    if count < minVotes:
+        return None
+    return shift
+
+
+def staticRows(previous: list[int], current: list[int]) -> int:
+    # Rows at the bottom that did not move, a sticky footer or status bar
+    rows = 0
+    for a, b in zip(reversed(previous), reversed(current)):
+        if a != b:
+            break
+        rows += 1
+    return rows
+
+
+class ScrollStitcher():
+    # Builds one tall image out of consecutive grabs of a scrolled region.
+    # Only the rows a grab adds below the previous one are copied, so the
+    # strip never holds more than the final image. A sticky footer is kept
+    # out of the strip and appended once at the end.
+    chunks: list[QImage]
+    height: int
+    hashes: list[int]
+    footer: QImage
+    footerRows: int
+
+    def __init__(self) -> None:
+        self.chunks = []
+        self.height = 0
+        self.hashes = None
+        self.footer = None
+        self.footerRows = 0
+
+    def add(self, image: QImage) -> int:
+        # Rows appended, None when the grab could not be placed
+        if image.format() != Frame.FORMAT:
+            image = image.convertToFormat(Frame.FORMAT)
+        hashes = rowHashes(image)
+        h = image.height()
+
+        if self.hashes is None:
+            self.append(image, 0, h)
+            self.hashes = hashes
+            return h
+
+        shift = findShift(self.hashes, hashes)
+        if shift is None or shift < 0:
+            # Compared against the last placed grab until one fits again
+            return None
+        if shift == 0:
+            # Only static rows matched, the content may have jumped
+            return 0
+
+        footerRows = min(staticRows(self.hashes, hashes), h - shift)
+        if footerRows > self.footerRows:
+            self.trim(footerRows - self.footerRows)
+        # The strip ends at this row of the previous grab
+        end = h - max(footerRows, self.footerRows)
+        start = end - shift
+        rows = h - footerRows - start
+        if start < 0 or rows <= 0:
+            return None
+
+        self.append(image, start, rows)
+        self.footerRows = footerRows
+        self.footer = image.copy(0, h - footerRows, image.width(), footerRows) \
+            if footerRows else None
+        self.hashes = hashes
+        return rows
+
+    def append(self, image: QImage, y: int, rows: int) -> None:
+        self.chunks.append(image.copy(0, y, image.width(), rows))
+        self.height += rows
+        tracker.track("ScrollCapture", "strip", self.chunks)
+
+    def trim(self, rows: int) -> None:
+        while rows and self.chunks:
+            last = self.chunks.pop()
+            self.height -= last.height()
+            if last.height() > rows:
+                self.append(last, 0, last.height() - rows)
+                rows = 0
+            else:
+                rows -= last.height()
+
+    def result(self) -> QImage:
+        # Chunks are dropped as they are painted
+        chunks = self.chunks + ([self.footer] if self.footer else [])
+        self.chunks, self.footer = [], None
+        if not chunks:
+            return None
+        image = QImage(
+            chunks[0].width(), sum(c.height() for c in chunks), Frame.FORMAT
+        )
+        painter = QPainter(image)
+        y = 0
+        while chunks:
+            chunk = chunks.pop(0)
+            painter.drawImage(0, y, chunk)
+            y += chunk.height()
+        painter.end()
+        self.height = 0
+        self.hashes = None
+        tracker.release("ScrollCapture")
+        return image
+
+
+class ScrollCapture(QObject):
+    # Grabs a fixed region over and over while the user scrolls whatever is
+    # under it, stitching as it goes. Grabs are scheduled back to back, a
+    # slow grab only lowers the rate.
+    finished = Signal(QImage, QRect)
+
+    INTERVAL = 30
+    SETTLE = 150  # For the overlay to leave the screen
+
+    region: QRect
+    stitcher: ScrollStitcher
+    control: CaptureControl
+
+    def __init__(self, grab: Callable[[QRect], QImage]) -> None:
+        super().__init__()
+        self.grab = grab
+        self.region = None
+        self.stitcher = None
+        self.control = None
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.tick)
+
+    def active(self) -> bool:
+        return self.stitcher is not None
+
+    def start(self, region: QRect) -> None:
+        self.region = region
+        self.stitcher = ScrollStitcher()
+        if self.control is None:
+            self.control = CaptureControl()
+            self.control.done.connect(self.finish)
+            self.control.cancelled.connect(self.cancel)
+        self.control.showFor(region, "Scroll down slowly")
+        self.timer.start(self.SETTLE)
+
+    def tick(self) -> None:
+        start = perf_counter()
+        image = self.grab(self.region)
+        if image is None:
+            self.cancel()
+            return
+        rows = self.stitcher.add(image)
+        if rows is None:
+            self.control.setStatus("Lost track, scroll back up a little")
+        else:
+            self.control.setStatus(f"{self.stitcher.height} px")
+        elapsed = int((perf_counter() - start) * 1000)
+        self.timer.start(max(0, self.INTERVAL - elapsed))
+
+    def finish(self) -> None:
+        if not self.active():
+            return
+        self.timer.stop()
+        self.control.hide()
+        image = self.stitcher.result()
+        self.stitcher = None
+        if image is not None:
+            self.finished.emit(image, self.region)
+
+    def cancel(self) -> None:
+        self.timer.stop()
+        if self.control is not None:
+            self.control.hide()
+        self.stitcher = None
+        tracker.release("ScrollCapture")
@@ -1,26 +1,48 @@
-from PySide6.QtWidgets import QWidget, QLabel, QApplication, QFileDialog
+from PySide6.QtWidgets import QWidget, QApplication, QFileDialog
 from PySide6.QtCore import (
-    Qt, QPoint, QEvent, QRect, QStandardPaths)
-from PySide6.QtGui import (QGuiApplication, QPixmap,
-                           QPainter, QColor, QBrush, QScreen,
+    Qt, QPoint, QPointF, QEvent, QRect, QRectF, QStandardPaths, QSettings, Signal)
+from PySide6.QtGui import (QGuiApplication, QImage,
+                           QPainter, QColor, QScreen,
                            QShortcut, QKeySequence)
 
 from typings import Screenshot
+from memory import tracker, MemoryOverlay
 from .area_selection import AreaSelection
 from .toolkit import Toolkit, ToolkitButton, ToolkitColorMenu
-from .drawing import Draw, PostEffects
+from .drawing import Draw, PostEffects, paintDrawings
+from .export import Exporter, StripComposer, encoderFor
+from . import capture, windows
+from .analysis import CaptureAnalysis
+from .frame import Frame
+from .backdrop import Backdrop
+from .viewport import Viewport
+from .imagefile import openImageFile
+from .retention import CaptureRetention
+from .scrolling import ScrollCapture
+from .animation import Recorder, Recording, animationEncoderFor
+from .journal import Journal
+from .project import Project, ProjectEncoder, load as loadProject
+from . import quicksave
 import utils
 
 
 class Screenshooter(QWidget):
+    # Final images leaving the app, with where they came from. Projects and
+    # PNGs large enough to be streamed are never composed whole, so they
+    # are not reported.
+    captured = Signal(QImage, str)
+    # Something the user asked for could not be done, as a title and details
+    failed = Signal(str, str)
+
     __active: bool
     ignoreFocus: bool
     selection: QRect
     screens: list[QScreen]
-    screenshot: QPixmap
+    frame: Frame
     postEffects: PostEffects
+    exporter: Exporter
 
-    previewLabel: QLabel
+    backdrop: Backdrop
     areaSelection: AreaSelection
     draw: Draw
 
@@ -31,22 +53,51 @@ class Screenshooter(QWidget):
         )
         self.move(0, 0)
 
-        self.previewLabel = QLabel(self)
-        self.areaSelection = AreaSelection(self)
-        self.draw = Draw(self)
+        self.viewport = Viewport()
+        self.viewport.changed.connect(self.viewChanged)
+        self.panFrom = None
+        self.backdrop = Backdrop(self, self.viewport)
+        self.areaSelection = AreaSelection(self, self.viewport)
+        self.draw = Draw(self, self.viewport)
         self.postEffects = PostEffects()
+        self.exporter = Exporter()
+        self.exporter.composed.connect(
+            lambda image: self.captured.emit(image, "save"))
+        self.exporter.finished.connect(
+            lambda stats: quicksave.release(stats.FileName, True))
+        self.exporter.failed.connect(
+            lambda fileName: quicksave.release(fileName, False))
+        self.analysis = CaptureAnalysis()
+        self.analysis.ready.connect(self.analysisReady)
+        self.retention = CaptureRetention()
+        self.scrollCapture = ScrollCapture(self.grabRegion)
+        self.scrollCapture.finished.connect(
+            lambda image, region: self.showImage(image, region.topLeft()))
+        self.recorder = Recorder(self.grabRegion)
+        self.recorder.finished.connect(self.saveRecording)
+        self.journal = Journal()
+        self.frame = None
+        self.memoryOverlay = MemoryOverlay(self)
         self.__active = False
 
         self.areaSelection.transformStart.connect(
             self.hideToolkit
         )
         self.areaSelection.transformEnd.connect(
-            lambda sel: [self.setSelection(sel.toRect()), self.showToolkit()]
+            lambda sel: [self.setSelection(sel.toRect()), self.showToolkit(),
+                         self.journal.selection(sel.toRect())]
+        )
+        self.draw.changed.connect(self.journal.change)
+
+        self.draw.redactionsChanged.connect(
+            lambda: self.areaSelection.setRedactions(
+                self.draw.redactions()
+            )
         )
 
-        self.colorMenu = ToolkitColorMenu(self)
-        self.colorMenu.currentColorChanged.connect(self.draw.setColor)
-        self.draw.setColor(self.colorMenu.currentColor())
+        # Built on first use, see getColorMenu
+        self.colorMenu = None
+        self.draw.setColor(ToolkitColorMenu.DEFAULT_COLOR)
 
         self.toolkitHor = Toolkit(
             self,
@@ -56,6 +107,7 @@ class Screenshooter(QWidget):
                 Toolkit.Button.DrawLine, Toolkit.Button.DrawArrow,
                 [Toolkit.Button.DrawSquare, Toolkit.Button.DrawEllipse],
                 Toolkit.Button.DrawText,
+                [Toolkit.Button.DrawPixelate, Toolkit.Button.DrawBlur],
                 Toolkit.Button.Color,
                 Toolkit.Button.Separator,
                 [Toolkit.Button.FlipHor, Toolkit.Button.FlipVer]
@@ -68,7 +120,8 @@ class Screenshooter(QWidget):
                 Toolkit.Button.Close,
                 Toolkit.Button.Copy,
                 Toolkit.Button.Save,
-            ],
+                Toolkit.Button.ScrollCapture,
+            ] + ([Toolkit.Button.Record] if Recorder.available() else []),
             Toolkit.Orientation.Vertical
         )
 
@@ -79,6 +132,8 @@ class Screenshooter(QWidget):
         self.cancelShortcut.activated.connect(self.cancel)
         self.saveShortcut = QShortcut(QKeySequence.StandardKey.Save, self)
         self.saveShortcut.activated.connect(self.saveScreenshot)
+        self.quickSaveShortcut = QShortcut(QKeySequence("Ctrl+Shift+S"), self)
+        self.quickSaveShortcut.activated.connect(self.quickSave)
         self.clipboardShortcut = QShortcut(QKeySequence.StandardKey.Copy, self)
         self.clipboardShortcut.activated.connect(self.copyScreenshot)
         self.undoShortcut = QShortcut(QKeySequence.StandardKey.Undo, self)
@@ -90,83 +145,338 @@ class Screenshooter(QWidget):
         )
         self.selectAllShortcut.activated.connect(
             lambda: self.areaSelection.setSelection(
-                self.screenshot.rect().toRectF()
+                self.frame.rect().toRectF()
             )
         )
+        self.zoomInShortcut = QShortcut(QKeySequence.StandardKey.ZoomIn, self)
+        self.zoomInShortcut.activated.connect(
+            lambda: self.viewport.zoom(Viewport.STEP))
+        self.zoomOutShortcut = QShortcut(QKeySequence.StandardKey.ZoomOut, self)
+        self.zoomOutShortcut.activated.connect(
+            lambda: self.viewport.zoom(1 / Viewport.STEP))
+        self.zoomResetShortcut = QShortcut(QKeySequence("Ctrl+0"), self)
+        self.zoomResetShortcut.activated.connect(self.viewport.reset)
 
     def activate(self) -> None:
         self.__active = True
         self.ignoreFocus = False
         self.shoot()
-        self.selection = self.screenshot.rect()  # select all by default
+        self.present()
+
+    def openImage(self, path: str) -> bool:
+        # Opens an image file in the overlay, as if it had been captured.
+        if path.lower().endswith(".unishot"):
+            return self.openProject(path)
+        frame = openImageFile(path)
+        if frame is None:
+            self.failed.emit("Unable to open image", path)
+            return False
+
+        self.showFrame(
+            frame, QGuiApplication.primaryScreen().geometry().topLeft()
+        )
+        return True
+
+    def showImage(self, image: QImage, origin: QPoint) -> None:
+        self.showFrame(Frame(image), origin)
+
+    def showFrame(self, frame: Frame, origin: QPoint) -> None:
+        self.__active = True
+        self.ignoreFocus = False
+        self.retention.release()
+        self.load(frame, QRect(origin, frame.size()))
+        self.present()
+
+    def reopenLastCapture(self) -> bool:
+        # The capture the overlay last showed, for as long as the retention
+        # policy keeps it. Drawings are not part of it.
+        last = self.retention.last()
+        if last is None:
+            self.failed.emit("Unable to reopen capture",
+                             "The last capture is no longer kept")
+            return False
+        self.showFrame(*last)
+        return True
+
+    def openProject(self, path: str) -> bool:
+        # The capture is mapped, not decoded, annotations stay editable.
+        try:
+            project = loadProject(path)
+        except (OSError, ValueError) as e:
+            self.failed.emit("Unable to open project", f"{path}: {e}")
+            return False
+
+        self.showFrame(project.Frame, project.Geometry.topLeft())
+        self.journal.begin()
+        for stroke in project.Drawings:
+            self.draw.add(stroke)
+        for stroke in project.Undone:
+            self.draw.add(stroke)
+            self.draw.undo()
+        if not project.Selection.isEmpty():
+            self.areaSelection.setSelection(QRectF(project.Selection))
+            self.areaSelection.endTransform()
+        self.setEffects(*project.Effects)
+        return True
+
+    def project(self) -> Project:
+        flip = self.postEffects.flip()
+        return Project(
+            QRect(self.geometry().topLeft(), self.frame.size()),
+            self.frame,
+            QRect(self.selection),
+            (flip.x, flip.y, self.postEffects.angle()),
+            [dr.Stroke for dr in self.draw.drawings],
+            [dr.Stroke for dr in self.draw.undoHistory],
+        )
+
+    def setEffects(self, flipX: int, flipY: int, angle: int) -> None:
+        flip = self.postEffects.flip()
+        flip.x, flip.y = flipX, flipY
+        self.postEffects.setAngle(angle)
+        self.updatePostEffects()
+
+    def restoreSession(self) -> bool:
+        # Reopens the last session that ended without a save or copy,
+        # annotations replayed in order.
+        try:
+            session = self.journal.restore()
+        except (OSError, ValueError) as e:
+            self.failed.emit("Unable to restore session", str(e))
+            return False
+        if session is None:
+            self.failed.emit("Unable to restore session",
+                             "No session was interrupted")
+            return False
+
+        if session.Path is not None:
+            if session.Path.lower().endswith(".unishot"):
+                # Only its capture, the journal has the rest
+                try:
+                    frame = loadProject(session.Path).Frame
+                except (OSError, ValueError) as e:
+                    self.failed.emit("Unable to restore session",
+                                     f"{session.Path}: {e}")
+                    return False
+            else:
+                frame = openImageFile(session.Path)
+            if frame is None:
+                self.failed.emit("Unable to restore session", session.Path)
+                return False
+            self.showFrame(frame, session.Geometry.topLeft())
+        else:
+            self.showImage(session.Image, session.Geometry.topLeft())
+        self.journal.begin()
+        for operation, value in session.Operations:
+            match operation:
+                case "add":
+                    self.draw.add(value)
+                case "undo":
+                    self.draw.undo()
+                case "redo":
+                    self.draw.redo()
+                case "selection":
+                    self.areaSelection.setSelection(QRectF(value))
+                    self.areaSelection.endTransform()
+                case "effects":
+                    self.setEffects(*value)
+        return True
+
+    def startScrollCapture(self) -> None:
+        # The overlay leaves the screen so the user can scroll what is under
+        # the selection. The stitched result comes back in the overlay.
+        region = self.selection.translated(self.geometry().topLeft())
+        self.hide()
+        self.scrollCapture.start(region)
+
+    def startRecording(self) -> None:
+        region = self.selection.translated(self.geometry().topLeft())
+        self.hide()
+        self.recorder.start(region)
+
+    def saveRecording(self, recording: Recording) -> None:
+        # APNG first, it encodes much faster than GIF
+        fileName = self.askFileName(
+            "APNG (*.png *.apng);;GIF (*.gif);;All files (*)")
+        if fileName:
+            self.exporter.save(
+                recording, fileName, animationEncoderFor(fileName))
+        else:
+            recording.release()
+
+    def present(self) -> None:
+        self.selection = self.frame.rect()  # select all by default
 
         self.show()
         self.activateWindow()
+        self.memoryOverlay.setVisible(
+            QSettings().value("debug/memoryOverlay", False, type=bool)
+        )
+
+    def repeatLastRegion(self) -> None:
+        # Grab only the last saved or copied region, skipping the overlay.
+        region = self.lastRegion()
+        if region is None:
+            self.activate()
+            return
+
+        action = QSettings().value("capture/repeatAction", "copy")
+        if action == "overlay":
+            self.captureLastRegion()
+            return
+
+        image = self.grabRegion(region)
+        if image is None:
+            self.activate()
+            return
+        self.captured.emit(image, "repeat")
+        if action == "save":
+            fileName = self.askFileName()
+            if fileName:
+                self.exporter.save(image, fileName)
+        elif action == "quicksave":
+            fileName = self.quickSaveFileName(region)
+            if fileName:
+                self.exporter.save(image, fileName, reserved=True)
+        else:
+            QApplication.clipboard().setImage(image)
+
+    def captureLastRegion(self) -> None:
+        # Opens the overlay with the last region selected, if there is one.
+        region = self.lastRegion()
+        self.activate()
+        if region is not None:
+            self.preselect(region)
+
+    def copyScreen(self) -> None:
+        # All screens straight to the clipboard, without the overlay.
+        region = QGuiApplication.primaryScreen().virtualGeometry()
+        image = self.grabRegion(region)
+        if image is not None:
+            QApplication.clipboard().setImage(image)
+            self.captured.emit(image, "copy")
+
+    def saveScreen(self) -> None:
+        # All screens straight to the quick-save folder, without the overlay.
+        region = QGuiApplication.primaryScreen().virtualGeometry()
+        image = self.grabRegion(region)
+        if image is None:
+            return
+        fileName = self.quickSaveFileName(region)
+        if fileName:
+            self.exporter.save(image, fileName, reserved=True)
+            self.captured.emit(image, "save")
+
+    def grabRegion(self, region: QRect) -> QImage:
+        rects = [
+            region.intersected(screen.geometry())
+            for screen in QGuiApplication.screens()
+            if screen.geometry().intersects(region)
+        ]
+        if not rects:
+            return None
+
+        image = QImage(region.size(), QImage.Format.Format_ARGB32_Premultiplied)
+        image.fill(QColor(0, 0, 0, 0))
+
+        painter = QPainter(image)
+        for rect, grab in zip(rects, capture.backend().grab(rects)):
+            painter.drawImage(utils.QDiff(rect.topLeft(), region.topLeft()), grab)
+        painter.end()
+
+        return image
+
+    def preselect(self, region: QRect) -> None:
+        local = region.translated(-self.geometry().topLeft())
+        local = local.intersected(self.frame.rect())
+        if not local.isEmpty():
+            self.areaSelection.setSelection(QRectF(local))
+            self.areaSelection.endTransform()
+
+    def lastRegion(self) -> QRect:
+        region = QSettings().value("capture/lastRegion")
+        if isinstance(region, QRect) and not region.isEmpty():
+            return region
+        return None
+
+    def rememberRegion(self) -> None:
+        QSettings().setValue(
+            "capture/lastRegion",
+            self.selection.translated(self.geometry().topLeft())
+        )
 
     def shoot(self) -> None:
+        self.retention.release()
         self.screens = QGuiApplication.screens()
+        # Listed before the overlay is shown, so it is not part of the list
+        windowIndex = windows.windowIndex()
 
         screenshots = self.getScreenshots(self.screens)
-        self.screenshot = self.mergeScreenshots(screenshots)
-
         cRect = utils.circumRect(
             [s.Geometry for s in screenshots]
         )
+        # The only full copy of the capture, everything else views it.
+        self.load(Frame(self.mergeScreenshots(screenshots)), cRect, windowIndex)
+
+    def load(self, frame: Frame, cRect: QRect, windowIndex: windows.WindowIndex = None) -> None:
+        self.frame = frame
+        # A lazily decoded frame is not held in memory
+        tracker.track("Screenshooter", "frame",
+                      None if frame.loader else self.frame.image())
 
-        self.setGeometry(cRect)
+        # Opened images may be larger than the screens, what is off them is
+        # never painted
+        self.setGeometry(cRect.intersected(
+            QGuiApplication.primaryScreen().virtualGeometry()))
 
         utils.setScreenOffset(cRect.topLeft())
         self.hideToolkit()
-        self.draw.setCanvas(cRect)
+        self.viewport.setFrame(self.frame, self.size())
+        self.draw.setCanvas(self.frame)
+        self.journal.start(self.frame, cRect)
         self.draw.stop()
         self.postEffects.clear()
-        self.updatePreview(self.screenshot)
-        self.areaSelection.start(self.screenshot, cRect.topLeft())
+        self.backdrop.setFrame(self.frame)
+        self.areaSelection.start(
+            self.frame, cRect.topLeft(), windowIndex
+        )
+        # Analysis needs every pixel, lazily decoded frames go without
+        if frame.loader is None:
+            self.analysis.start(self.frame.image())
 
     def getScreenshots(self, screens: list[QScreen]) -> list[Screenshot]:
-        screenshots = list[Screenshot]()
+        # Images are only valid until the next grab, merge them right away.
+        geometries = [screen.geometry() for screen in screens]
+        images = capture.backend().grab(geometries)
 
-        for screen in screens:
-            screenshots.append(
-                Screenshot(screen.geometry(), screen.grabWindow(0))
-            )
+        return [Screenshot(g, i) for g, i in zip(geometries, images)]
 
-        return screenshots
-
-    def mergeScreenshots(self, screenshots: list[Screenshot]) -> QPixmap:
+    def mergeScreenshots(self, screenshots: list[Screenshot]) -> QImage:
         cRect = utils.circumRect(
             [s.Geometry for s in screenshots]
         )
         offset = cRect.topLeft()
 
-        mergedShot = QPixmap(
+        mergedShot = QImage(
             cRect.width() - offset.x(),
-            cRect.height() - offset.y()
+            cRect.height() - offset.y(),
+            Frame.FORMAT
         )
         mergedShot.fill(QColor(0, 0, 0, 0))
 
         painter = QPainter(mergedShot)
-        for geom, pixmap in screenshots:
-            painter.drawPixmap(
+        for geom, image in screenshots:
+            painter.drawImage(
                 utils.QDiff(geom.topLeft(), offset),
-                pixmap
+                image
             )
         painter.end()
 
         return mergedShot
 
-    def updatePreview(self, newPreview: QPixmap) -> None:
-        newPreview = newPreview.copy()  # Prevent modifying base value
-        w, h = newPreview.width(), newPreview.height()
-
-        painter = QPainter(newPreview)
-
-        painter.setBrush(QBrush(QColor(0, 0, 0, 80)))
-        painter.drawRect(0, 0, w, h)
-        painter.end()
-
-        self.previewLabel.setFixedSize(w, h)
-        self.previewLabel.setPixmap(newPreview)
+    def analysisReady(self, name: str, result: object) -> None:
+        if name == "edges":
+            self.areaSelection.setEdges(result)
 
     def toolkitAction(self, buttonType: Toolkit.Button, button: ToolkitButton) -> None:
         match buttonType:
@@ -176,20 +486,25 @@ class Screenshooter(QWidget):
             case Toolkit.Button.Copy:
                 self.copyScreenshot()
             case Toolkit.Button.Close:
-                self.hide()
+                self.closeOverlay()
+            case Toolkit.Button.ScrollCapture:
+                self.startScrollCapture()
+            case Toolkit.Button.Record:
+                self.startRecording()
             case Toolkit.Button.Cursor:
                 self.draw.stop()
             case Toolkit.Button.Color:
-                self.colorMenu.toggle(
+                colorMenu = self.getColorMenu()
+                colorMenu.toggle(
                     QPoint(
                         button.x()+button.parent().x()+button.width()/2,
                         button.y()+button.parent().y()
                     )
                 )
-                self.colorMenu.currentColorChanged.connect(
+                colorMenu.currentColorChanged.connect(
                     button.setColorIcon
                 )
-                self.colorMenu.deactivated.connect(
+                colorMenu.deactivated.connect(
                     lambda: button.setChecked(False)
                 )
             case Toolkit.Button.FlipHor:
@@ -198,14 +513,19 @@ class Screenshooter(QWidget):
             case Toolkit.Button.FlipVer:
                 self.postEffects.toggleFlip(y=True)
                 self.updatePostEffects()
-            case Toolkit.Button.RotateLeft | Toolkit.Button.RotateRight:
-                raise NotImplementedError
+            case Toolkit.Button.RotateLeft:
+                self.postEffects.rotate(-90)
+                self.updatePostEffects()
+            case Toolkit.Button.RotateRight:
+                self.postEffects.rotate(90)
+                self.updatePostEffects()
             case DrawTools:
                 self.draw.start(buttonType.value)
                 self.toolkitHor.raise_()
                 self.toolkitVer.raise_()
 
-    def saveScreenshot(self) -> None:
+    def askFileName(self, filter="Images (*.png *.jpg *.jpeg *.webp);;"
+                    "Unishot project (*.unishot);;All files (*)") -> str:
         self.ignoreFocus = True
         fileName = QFileDialog.getSaveFileName(
             self,
@@ -213,37 +533,106 @@ class Screenshooter(QWidget):
             dir=QStandardPaths.writableLocation(
                 QStandardPaths.StandardLocation.DesktopLocation
             ),
-            filter="Images (*.png *.jpg *.jpeg);;All files (*)"
+            filter=filter
         )
         self.ignoreFocus = False
-        if fileName != ('', ''):
+        return fileName[0]
+
+    def saveScreenshot(self) -> None:
+        fileName = self.askFileName()
+        if fileName:
+            self.saveTo(fileName)
+
+    def quickSave(self) -> None:
+        # No dialog, and the screenshot is composed on the writer's thread,
+        # so the overlay closes at once. Stays open if there is nowhere to
+        # save to.
+        fileName = self.quickSaveFileName(
+            self.selection.translated(self.geometry().topLeft()))
+        if fileName:
+            self.saveTo(fileName, background=True, reserved=True)
+
+    def quickSaveFileName(self, region: QRect) -> str:
+        # None, and the user told why, when there is nowhere to save to
+        try:
+            return quicksave.nextFileName(region)
+        except OSError as e:
+            self.failed.emit("Unable to quick-save", str(e))
+            return None
+
+    def saveTo(self, fileName: str, background: bool = False,
+               reserved: bool = False) -> None:
+        # reserved when the file is a quick-save placeholder
+        if fileName.lower().endswith(".unishot"):
+            # Saved as it is, selection included, nothing is composed
+            self.rememberRegion()
+            self.exporter.save(self.project(), fileName, ProjectEncoder(), reserved)
+            self.journal.discard()
+            self.hide()
+        else:
+            self.rememberRegion()
+            encoder = encoderFor(
+                fileName, self.selection.width()*self.selection.height()
+            )
+            # Composed before hiding, which releases the overlay, unless
+            # strips can do it later
+            if encoder.streamed or background:
+                self.exporter.save(
+                    self.getStripComposer(), fileName, encoder, reserved
+                )
+            else:
+                image = self.getFinalScreenshot()
+                self.exporter.save(image, fileName, encoder, reserved)
+                self.captured.emit(image, "save")
+            self.journal.discard()
             self.hide()
-            self.getFinalScreenshot().save(fileName[0])
 
     def copyScreenshot(self) -> None:
-        QApplication.clipboard().setImage(
-            self.getFinalScreenshot().toImage())
+        image = self.getFinalScreenshot()
+        QApplication.clipboard().setImage(image)
+        self.captured.emit(image, "copy")
+        self.rememberRegion()
+        self.journal.discard()
         self.hide()
 
-    def getFinalScreenshot(self) -> QPixmap:
-        # Post effects do not apply to drawings.
-        finalScreenshot = self.postEffects.apply(
-            self.screenshot.copy(self.selection)
-        )
+    def getFinalScreenshot(self) -> QImage:
+        # Redactions are baked into the captured pixels, so flipping can
+        # never move them off what they hide. Painting on the view detaches
+        # it, the frame is left untouched.
+        base = self.frame.view(self.selection)
+        paintDrawings(base, self.draw.redactions(), self.selection.topLeft())
 
-        painter = QPainter(finalScreenshot)
-        painter.drawPixmap(
-            QPoint(0, 0), self.draw.drawPixmap().copy(self.selection)
+        # Post effects do not apply to drawings.
+        finalScreenshot = self.postEffects.apply(base)
+        # Whatever leaves the overlay owns its pixels
+        if finalScreenshot.cacheKey() == base.cacheKey():
+            finalScreenshot = finalScreenshot.copy()
+        paintDrawings(
+            finalScreenshot, self.draw.annotations(), self.selection.topLeft()
         )
-        painter.end()
 
         return finalScreenshot
 
-    def updatePostEffects(self) -> None:
-        self.areaSelection.selectionPreview.setEffects(
-            self.postEffects
+    def getStripComposer(self) -> StripComposer:
+        # Rotation is not supported by strips, flips are. A rotated
+        # screenshot is composed here and handed over as it is.
+        if self.postEffects.angle() != 0:
+            image = self.getFinalScreenshot()
+            return StripComposer(Frame(image), image.rect(), (1, 1), [])
+
+        flip = self.postEffects.flip()
+        return StripComposer(
+            self.frame,
+            self.selection,
+            (flip.x, flip.y),
+            [(dr.Position, dr.Pixmap.toImage()) for dr in self.draw.annotations()],
+            [(dr.Position, dr.Pixmap.toImage()) for dr in self.draw.redactions()]
         )
 
+    def updatePostEffects(self) -> None:
+        self.areaSelection.setEffects(self.postEffects)
+        self.journal.effects(self.postEffects)
+
     def setSelection(self, newSelection: QRect) -> None:
         self.selection = newSelection
 
@@ -262,23 +651,67 @@ class Screenshooter(QWidget):
     def hideToolkit(self) -> None:
         self.toolkitHor.hide()
         self.toolkitVer.hide()
-        self.colorMenu.deactivate()
+        if self.colorMenu:
+            self.colorMenu.deactivate()
+
+    def getColorMenu(self) -> ToolkitColorMenu:
+        if self.colorMenu is None:
+            self.colorMenu = ToolkitColorMenu(self)
+            self.colorMenu.currentColorChanged.connect(self.draw.setColor)
+        return self.colorMenu
 
     def alignToolkit(self, geometry: QRect, ox1=0, oy1=0, ox2=0, oy2=0) -> QPoint:
+        selection = self.viewport.viewRect(QRectF(self.selection)).toRect()
         geometry.moveTo(
-            self.selection.topLeft().x()+ox1,
-            self.selection.topLeft().y()+oy1
+            selection.topLeft().x()+ox1,
+            selection.topLeft().y()+oy1
         )
         if not utils.isPointOnScreen(
             geometry.topLeft()
         ):
             geometry.moveTo(
-                self.selection.bottomRight().x()+ox2,
-                self.selection.bottomRight().y()+oy2
+                selection.bottomRight().x()+ox2,
+                selection.bottomRight().y()+oy2
             )
 
         return QPoint(geometry.x(), geometry.y())
 
+    def resizeEvent(self, event) -> None:
+        # The layers cover the window, the viewport maps them to the frame
+        for layer in (self.backdrop, self.areaSelection, self.draw):
+            layer.setGeometry(self.rect())
+        self.viewport.size = self.size()
+
+    def viewChanged(self) -> None:
+        if self.toolkitHor.isVisible():
+            self.showToolkit()
+
+    def wheelEvent(self, event) -> None:
+        # Ctrl zooms at the cursor, the wheel alone pans
+        delta = event.angleDelta()
+        if event.modifiers() & Qt.KeyboardModifier.ControlModifier:
+            self.viewport.zoom(Viewport.STEP ** (delta.y() / 120), event.position())
+        else:
+            self.viewport.pan(QPointF(delta.x(), delta.y()))
+        event.accept()
+
+    def mousePressEvent(self, event) -> None:
+        # Dragging with the middle button pans
+        if event.button() == Qt.MouseButton.MiddleButton:
+            self.panFrom = event.position()
+            event.accept()
+
+    def mouseMoveEvent(self, event) -> None:
+        if self.panFrom is not None:
+            self.viewport.pan(event.position() - self.panFrom)
+            self.panFrom = event.position()
+            event.accept()
+
+    def mouseReleaseEvent(self, event) -> None:
+        if event.button() == Qt.MouseButton.MiddleButton:
+            self.panFrom = None
+            event.accept()
+
     def event(self, event: QEvent) -> bool:
         if event.type() == QEvent.WindowDeactivate and not self.ignoreFocus:
             self.hide()
@@ -288,16 +721,37 @@ class Screenshooter(QWidget):
         return super().event(event)
 
     def cancel(self):
-        if self.colorMenu.active():
+        if self.colorMenu and self.colorMenu.active():
             self.colorMenu.deactivate()
         elif self.draw.active():
             self.toolkitHor.clearTool()
             self.toolkitVer.clearTool()
         else:
-            self.hide()
+            self.closeOverlay()
+
+    def closeOverlay(self) -> None:
+        # Closed on purpose, so there is nothing to restore. Only losing
+        # focus or a crash leave the journal behind.
+        self.journal.discard()
+        self.hide()
 
     def active(self) -> bool:
-        return self.__active
+        return self.__active or self.scrollCapture.active() \
+            or self.recorder.active()
 
     def hideEvent(self, ev) -> None:
         self.__active = False
+        self.analysis.cancel()
+        self.release()
+
+    def release(self) -> None:
+        # Everything derived from the capture goes as soon as the overlay
+        # hides. The frame itself is left to the retention policy.
+        self.backdrop.release()
+        self.viewport.release()
+        tracker.release("Screenshooter")
+        self.areaSelection.release()
+        self.draw.release()
+        self.journal.close()
+        self.retention.hold(self.frame, self.geometry().topLeft())
+        self.frame = None
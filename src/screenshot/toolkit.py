@@ -1,21 +1,89 @@
-from PySide6.QtWidgets import QWidget, QLabel, QGraphicsBlurEffect, QHBoxLayout, QVBoxLayout, QPushButton, QColorDialog, QFrame
-from PySide6.QtGui import QPixmap, Qt, QColor, QMouseEvent
-from PySide6.QtCore import QSize, Signal, QPoint, QEvent
+from PySide6.QtWidgets import QWidget, QLabel, QGraphicsBlurEffect, QGraphicsScene, QGraphicsPixmapItem, QHBoxLayout, QVBoxLayout, QPushButton, QColorDialog, QFrame
+from PySide6.QtGui import QPixmap, Qt, QColor, QMouseEvent, QPainter, QIcon, QImageReader, QGuiApplication
+from PySide6.QtCore import QSize, Signal, QPoint, QEvent, QRectF
 from math import floor
 
 from typings import ToolkitButtonTypes, ToolkitOrientation, DrawTools
 
 
+class IconAtlas():
+    # Icons decoded once per size and device pixel ratio, then shared by
+    # every button showing them. The 512px sources are never kept around.
+    icons: dict[tuple[str, int, int], QIcon]
+
+    def __init__(self) -> None:
+        self.icons = {}
+
+    def icon(self, name: str, size: QSize) -> QIcon:
+        key = (name, size.width(), size.height())
+        icon = self.icons.get(key)
+        if icon is None:
+            icon = QIcon()
+            ratios = {s.devicePixelRatio() for s in QGuiApplication.screens()}
+            for ratio in sorted(ratios or {1.0}):
+                icon.addPixmap(self.pixmap(name, size, ratio))
+            self.icons[key] = icon
+        return icon
+
+    def pixmap(self, name: str, size: QSize, ratio: float) -> QPixmap:
+        reader = QImageReader(":/icons/"+name)
+        reader.setScaledSize(size * ratio)
+        pixmap = QPixmap.fromImage(reader.read())
+        pixmap.setDevicePixelRatio(ratio)
+        return pixmap
+
+    def clear(self) -> None:
+        self.icons.clear()
+
+
+atlas = IconAtlas()
+
+
 class ToolkitBackground(QLabel):
+    # A soft, blurred panel. Rendered once per size and device pixel ratio
+    # and shared, instead of a live blur effect on every repaint.
+    COLOR = QColor(255, 255, 255, 235)
+    BLUR_RADIUS = 5
+
+    cache: dict[tuple[int, int, float], QPixmap] = {}
+
     def __init__(self, parent: QWidget, size: QSize) -> None:
         super().__init__(parent)
-
+        self.setStyleSheet("border:none")
         self.setFixedSize(size)
 
-        blur = QGraphicsBlurEffect(self)
-        self.setGraphicsEffect(blur)
-        self.setStyleSheet(
-            "background-color: rgba(255, 255, 255, 235);border:none")
+    def resizeEvent(self, ev) -> None:
+        self.setPixmap(self.background(self.size(), self.devicePixelRatioF()))
+        super().resizeEvent(ev)
+
+    @classmethod
+    def background(cls, size: QSize, ratio: float) -> QPixmap:
+        key = (size.width(), size.height(), ratio)
+        pixmap = cls.cache.get(key)
+        if pixmap is None:
+            pixmap = cls.cache[key] = cls.render(size, ratio)
+        return pixmap
+
+    @classmethod
+    def render(cls, size: QSize, ratio: float) -> QPixmap:
+        source = QPixmap(size * ratio)
+        source.fill(cls.COLOR)
+
+        item = QGraphicsPixmapItem(source)
+        blur = QGraphicsBlurEffect()
+        blur.setBlurRadius(cls.BLUR_RADIUS * ratio)
+        item.setGraphicsEffect(blur)
+        scene = QGraphicsScene()
+        scene.addItem(item)
+
+        pixmap = QPixmap(source.size())
+        pixmap.fill(Qt.GlobalColor.transparent)
+        painter = QPainter(pixmap)
+        scene.render(painter, QRectF(pixmap.rect()), QRectF(source.rect()))
+        painter.end()
+
+        pixmap.setDevicePixelRatio(ratio)
+        return pixmap
 
 
 class ToolkitSeparator(QFrame):
@@ -104,13 +172,13 @@ class ToolkitButton(QPushButton):
         match buttonType:
             case ToolkitButtonTypes.Save:
                 label = "Save to..."
-                icon = QPixmap(":/icons/"+buttonType.value)
+                icon = atlas.icon(buttonType.value, self.iconSize())
             case ToolkitButtonTypes.Copy:
                 label = "Copy to Clipboard"
-                icon = QPixmap(":/icons/"+buttonType.value)
+                icon = atlas.icon(buttonType.value, self.iconSize())
             case ToolkitButtonTypes.Close:
                 label = "Close"
-                icon = QPixmap(":/icons/"+buttonType.value)
+                icon = atlas.icon(buttonType.value, self.iconSize())
             case ToolkitButtonTypes.Color:
                 label = "Tool color"
                 icon = self.getColorIcon(
@@ -119,21 +187,31 @@ class ToolkitButton(QPushButton):
                 self.setCheckable(True)
             case ToolkitButtonTypes.Cursor:
                 label = "Cursor"
-                icon = QPixmap(":/icons/"+buttonType.value)
+                icon = atlas.icon(buttonType.value, self.iconSize())
                 self.setCheckable(True)
+            case ToolkitButtonTypes.ScrollCapture:
+                label = "Scrolling capture"
+                icon = atlas.icon(buttonType.value, self.iconSize())
+            case ToolkitButtonTypes.Record:
+                label = "Record animation"
+                icon = atlas.icon(buttonType.value, self.iconSize())
             case ToolkitButtonTypes.FlipVer:
                 label = "Flip vertically"
-                icon = QPixmap(":/icons/"+buttonType.value)
+                icon = atlas.icon(buttonType.value, self.iconSize())
             case ToolkitButtonTypes.FlipHor:
                 label = "Flip horizontally"
-                icon = QPixmap(":/icons/"+buttonType.value)
-            case ToolkitButtonTypes.RotateRight | ToolkitButtonTypes.RotateLeft:
-                raise NotImplementedError
+                icon = atlas.icon(buttonType.value, self.iconSize())
+            case ToolkitButtonTypes.RotateLeft:
+                label = "Rotate left"
+                icon = atlas.icon(buttonType.value, self.iconSize())
+            case ToolkitButtonTypes.RotateRight:
+                label = "Rotate right"
+                icon = atlas.icon(buttonType.value, self.iconSize())
             case DrawTools:
                 self.setCheckable(True)
                 drawTool = buttonType.value
                 label = drawTool.name
-                icon = QPixmap(":/icons/"+drawTool.value)
+                icon = atlas.icon(drawTool.value, self.iconSize())
 
         self.setToolTip(label)
         self.setIcon(icon)
@@ -262,8 +340,8 @@ class ToolkitGroup(QWidget):
     class ExpandButton(QPushButton):
         def __init__(self, parent: QWidget):
             super().__init__(parent)
-            self.setIcon(QPixmap(":/icons/expand"))
             self.setIconSize(QSize(10, 10))
+            self.setIcon(atlas.icon("expand", self.iconSize()))
             self.setFixedSize(QSize(13, 13))
             self.setStyleSheet("""
             QPushButton {
@@ -281,51 +359,65 @@ class ToolkitGroup(QWidget):
     activated = Signal(QWidget)
     buttonClicked = Signal(QMouseEvent, ToolkitButton)
 
-    buttons: list[ToolkitButtonTypes]
+    types: list[ToolkitButtonTypes]
+    buttons: list[ToolkitButton]
     mainButton: ToolkitButton
     __active: bool
+    __built: bool
 
     def __init__(self, parent: QWidget, parentToolkit: Toolkit, buttons: list[Button]):
         super().__init__(parent)
         self.toolkit = parentToolkit
         self.__active = False
-        self.buttons = []
-        self.mainButton = None
+        self.__built = False
         self.hide()
 
+        self.types = []
+        for btnType in buttons:
+            if btnType is self.Button.Cursor:
+                print(btnType, "is not supported in groups.")
+            else:
+                self.types.append(btnType)
+
+        tools = [t for t in self.types if t is not self.Button.Separator]
+        if len(tools) <= 1:
+            raise Exception("Group is empty or consists of only 1 button.")
+
+        # Only the main button sits in the toolkit, the popup with the rest
+        # of the group is built the first time it is expanded.
+        self.mainButton = self.createButton(tools[0])
+        self.buttons = [self.mainButton]
+
+        self.expandButton = self.ExpandButton(self)
+        self.expandButton.clicked.connect(self.toggle)
+        self.alignExpandButton()
+
+    def createButton(self, btnType: Button) -> ToolkitButton:
+        btn = ToolkitButton(self, btnType, QSize(30, 30))
+        btn.clickedT.connect(self.buttonClickEvent)
+        return btn
+
+    def build(self) -> None:
+        self.__built = True
+
         layout = QVBoxLayout(self)
         layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
         layout.setContentsMargins(0, 0, 0, 0)
         layout.setDirection(QVBoxLayout.Direction.BottomToTop)
 
-        for btnType in reversed(buttons):
-            if btnType is self.Button.Cursor:
-                buttons.remove(btnType)
-                print(btnType, "is not supported in groups.")
-            elif btnType is self.Button.Separator:
+        for btnType in reversed(self.types):
+            if btnType is self.Button.Separator:
                 sep = ToolkitSeparator(self, ToolkitOrientation.Horizontal)
                 layout.addWidget(sep, alignment=Qt.AlignmentFlag.AlignCenter)
-            else:
-                btn = ToolkitButton(self, btnType, QSize(30, 30))
-                btn.clickedT.connect(self.buttonClickEvent)
-
+            elif btnType is not self.mainButton.buttonType():
+                btn = self.createButton(btnType)
                 layout.addWidget(btn)
-                self.buttons.append(btn)
-
-        if len(self.buttons) <= 1:
-            raise Exception("Group is empty or consists of only 1 button.")
-
-        self.mainButton = self.buttons[-1]
-        layout.removeWidget(self.mainButton)
+                self.buttons.insert(-1, btn)
 
         self.adjustSize()
         self.background = ToolkitBackground(self, self.size())
         self.background.lower()
 
-        self.expandButton = self.ExpandButton(self)
-        self.expandButton.clicked.connect(self.toggle)
-        self.alignExpandButton()
-
     def setMainButton(self, button: ToolkitButton):
         layout = self.layout()
         toolkitLayout = self.toolkit.layout()
@@ -372,6 +464,8 @@ class ToolkitGroup(QWidget):
         return self.__active
 
     def activate(self) -> None:
+        if not self.__built:
+            self.build()
         self.__active = True
         self.activated.emit(self)
         self.align()
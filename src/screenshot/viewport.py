@@ -0,0 +1,201 @@
+from math import ceil, floor, log2
+
+from PySide6.QtCore import QObject, QPoint, QPointF, QRect, QRectF, QSize, Qt, Signal
+from PySide6.QtGui import QImage, QPainter, QTransform
+
+from memory import tracker
+from .frame import Frame
+
+
+class TilePyramid():
+    # Halved levels of a frame, built a tile at a time the first time they
+    # are drawn and kept until the frame goes. Tiles are scaled straight
+    # from the frame, so only the levels and regions actually looked at
+    # exist, and each is scaled down once. Tiles of a frame still being
+    # decoded are scaled roughly and kept only once their rows are there.
+    TILE = 256
+
+    frame: Frame
+    tiles: dict[tuple[int, int, int], QImage]
+
+    def __init__(self, frame: Frame) -> None:
+        self.frame = frame
+        self.tiles = {}
+
+    def levels(self) -> int:
+        size = max(self.frame.width(), self.frame.height())
+        return max(0, ceil(log2(max(1, size / self.TILE))))
+
+    def levelFor(self, scale: float) -> int:
+        # The smallest level still at least as detailed as the view
+        if scale >= 1:
+            return 0
+        return min(self.levels(), floor(log2(1 / scale)))
+
+    def tile(self, level: int, tx: int, ty: int) -> QImage:
+        key = (level, tx, ty)
+        if key in self.tiles:
+            return self.tiles[key]
+
+        factor = 2 ** level
+        t = self.TILE * factor
+        source = QRect(tx*t, ty*t, t, t).intersected(self.frame.rect())
+        ready = self.frame.request(source)
+        tile = self.frame.view(source, wait=False).scaled(
+            ceil(source.width() / factor), ceil(source.height() / factor),
+            Qt.AspectRatioMode.IgnoreAspectRatio,
+            Qt.TransformationMode.SmoothTransformation if ready
+            else Qt.TransformationMode.FastTransformation
+        )
+        if not ready:
+            return tile
+        self.tiles[key] = tile
+        tracker.track("Viewport", "pyramid", list(self.tiles.values()))
+        return tile
+
+    def region(self, level: int, rect: QRect) -> QImage:
+        # rect of a level, in that level's pixels, pieced together from tiles
+        image = QImage(rect.size(), Frame.FORMAT)
+        image.fill(0)
+        painter = QPainter(image)
+        painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_Source)
+        for ty in range(rect.top() // self.TILE, rect.bottom() // self.TILE + 1):
+            for tx in range(rect.left() // self.TILE, rect.right() // self.TILE + 1):
+                painter.drawImage(QPoint(tx, ty) * self.TILE - rect.topLeft(),
+                                  self.tile(level, tx, ty))
+        painter.end()
+        return image
+
+    def draw(self, painter: QPainter, transform: QTransform, scale: float,
+             rect: QRect) -> None:
+        # Paints rect of the frame, in image space, through transform
+        rect = rect.intersected(self.frame.rect())
+        if rect.isEmpty():
+            return
+        level = self.levelFor(scale)
+        if level == 0:
+            painter.setTransform(transform)
+            painter.drawImage(rect.topLeft(), self.frame.view(rect, wait=False))
+            return
+
+        factor = 2 ** level
+        painter.setTransform(QTransform.fromScale(factor, factor) * transform)
+        painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+        t = self.TILE * factor
+        for ty in range(rect.top() // t, rect.bottom() // t + 1):
+            for tx in range(rect.left() // t, rect.right() // t + 1):
+                painter.drawImage(QPoint(tx, ty) * self.TILE,
+                                  self.tile(level, tx, ty))
+
+
+class Viewport(QObject):
+    # How the frame is shown in the overlay: a scale and the view position
+    # of the image origin. Selection and drawings stay in image space, only
+    # painting and mouse positions go through here. Zoomed out, the frame
+    # is drawn from a pyramid instead of being scaled down on every paint.
+    changed = Signal()
+    decoded = Signal(QRect)  # Rows of a lazily decoded frame arrived
+
+    MIN_SCALE = 1 / 32
+    MAX_SCALE = 32
+    STEP = 1.25
+
+    scale: float
+    offset: QPointF
+    size: QSize
+    pyramid: TilePyramid
+    loader: object
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.scale = 1.0
+        self.offset = QPointF(0, 0)
+        self.size = QSize()
+        self.pyramid = None
+        self.loader = None
+
+    def setFrame(self, frame: Frame, size: QSize) -> None:
+        self.disconnectLoader()
+        self.pyramid = TilePyramid(frame)
+        self.size = size
+        if frame.loader is not None:
+            self.loader = frame.loader
+            self.loader.decoded.connect(self.decoded)
+        self.reset()
+
+    def release(self) -> None:
+        self.disconnectLoader()
+        self.pyramid = None
+        tracker.release("Viewport")
+
+    def disconnectLoader(self) -> None:
+        if self.loader is not None:
+            self.loader.decoded.disconnect(self.decoded)
+            self.loader = None
+
+    def transform(self) -> QTransform:
+        return QTransform(self.scale, 0, 0, self.scale,
+                          self.offset.x(), self.offset.y())
+
+    def toImage(self, pos: QPointF) -> QPointF:
+        return (QPointF(pos) - self.offset) / self.scale
+
+    def imagePoint(self, pos: QPointF) -> QPoint:
+        # The nearest pixel boundary
+        return self.toImage(pos).toPoint()
+
+    def toView(self, pos: QPointF) -> QPointF:
+        return QPointF(pos) * self.scale + self.offset
+
+    def viewRect(self, rect: QRectF) -> QRectF:
+        return QRectF(self.toView(rect.topLeft()), self.toView(rect.bottomRight()))
+
+    def imageRect(self, rect: QRect) -> QRect:
+        # Every image pixel touching rect of the view
+        return QRectF(self.toImage(rect.topLeft()),
+                      self.toImage(QPointF(rect.right() + 1, rect.bottom() + 1))
+                      ).toAlignedRect()
+
+    def paint(self, painter: QPainter, rect: QRect, transform: QTransform = None) -> None:
+        # The frame within rect, in image space, under an optional image
+        # space transform
+        if self.pyramid is not None:
+            self.pyramid.draw(painter, (transform or QTransform()) * self.transform(),
+                              self.scale, rect)
+
+    def reset(self) -> None:
+        self.scale = 1.0
+        self.offset = QPointF(0, 0)
+        self.changed.emit()
+
+    def zoom(self, factor: float, at: QPointF = None) -> None:
+        # Keeps the image point under at where it is
+        if at is None:
+            at = QPointF(self.size.width() / 2, self.size.height() / 2)
+        scale = max(self.MIN_SCALE, min(self.MAX_SCALE, self.scale * factor))
+        if scale == self.scale:
+            return
+        anchor = self.toImage(at)
+        self.scale = scale
+        self.offset = at - anchor * scale
+        self.clamp()
+        self.changed.emit()
+
+    def pan(self, delta: QPointF) -> None:
+        previous = QPointF(self.offset)
+        self.offset += QPointF(delta)
+        self.clamp()
+        if self.offset != previous:
+            self.changed.emit()
+
+    def clamp(self) -> None:
+        # An image larger than the view always fills it, a smaller one
+        # stays inside it
+        if self.pyramid is None:
+            return
+        frame = self.pyramid.frame
+        w, h = frame.width() * self.scale, frame.height() * self.scale
+        x = sorted((0, self.size.width() - w))
+        y = sorted((0, self.size.height() - h))
+        self.offset = QPointF(max(x[0], min(x[1], self.offset.x())),
+                              max(y[0], min(y[1], self.offset.y())))
@@ -0,0 +1,267 @@
+import ctypes
+import ctypes.util
+import os
+import sys
+
+from PySide6.QtCore import QRect, QPoint, QSettings
+from PySide6.QtGui import QGuiApplication
+
+
+class WindowProvider():
+    # Lists visible top-level windows in global logical coordinates,
+    # topmost first.
+    name: str = ""
+
+    @staticmethod
+    def available() -> bool:
+        return True
+
+    def windows(self) -> list[QRect]:
+        raise NotImplementedError
+
+
+class FakeWindowProvider(WindowProvider):
+    name = "fake"
+
+    rects: list[QRect]
+
+    def __init__(self, rects: list[QRect] = None) -> None:
+        if rects is None:
+            geom = QGuiApplication.primaryScreen().geometry()
+            rects = [
+                QRect(geom.x() + 40, geom.y() + 40, 300, 200),
+                QRect(geom.x() + 200, geom.y() + 120, 400, 300),
+                QRect(geom.x(), geom.bottom() - 39, geom.width(), 40),
+                geom,
+            ]
+        self.rects = rects
+
+    def windows(self) -> list[QRect]:
+        return list(self.rects)
+
+
+class X11WindowProvider(WindowProvider):
+    # Children of the root window are returned by XQueryTree in stacking
+    # order, bottommost first. With a reparenting window manager these are
+    # the frames, decorations included.
+    name = "x11"
+
+    IsViewable = 2
+
+    class XWindowAttributes(ctypes.Structure):
+        _fields_ = [
+            ("x", ctypes.c_int), ("y", ctypes.c_int),
+            ("width", ctypes.c_int), ("height", ctypes.c_int),
+            ("border_width", ctypes.c_int), ("depth", ctypes.c_int),
+            ("visual", ctypes.c_void_p), ("root", ctypes.c_ulong),
+            ("class", ctypes.c_int), ("bit_gravity", ctypes.c_int),
+            ("win_gravity", ctypes.c_int), ("backing_store", ctypes.c_int),
+            ("backing_planes", ctypes.c_ulong),
+            ("backing_pixel", ctypes.c_ulong),
+            ("save_under", ctypes.c_int), ("colormap", ctypes.c_ulong),
+            ("map_installed", ctypes.c_int), ("map_state", ctypes.c_int),
+            ("all_event_masks", ctypes.c_long),
+            ("your_event_mask", ctypes.c_long),
+            ("do_not_propagate_mask", ctypes.c_long),
+            ("override_redirect", ctypes.c_int), ("screen", ctypes.c_void_p),
+        ]
+
+    @staticmethod
+    def available() -> bool:
+        return sys.platform.startswith("linux") \
+            and bool(os.environ.get("DISPLAY")) \
+            and QGuiApplication.platformName() == "xcb" \
+            and ctypes.util.find_library("X11") is not None
+
+    def __init__(self) -> None:
+        x11 = self.x11 = ctypes.CDLL(ctypes.util.find_library("X11"))
+        x11.XOpenDisplay.restype = ctypes.c_void_p
+        x11.XOpenDisplay.argtypes = [ctypes.c_char_p]
+        x11.XCloseDisplay.argtypes = [ctypes.c_void_p]
+        x11.XDefaultRootWindow.restype = ctypes.c_ulong
+        x11.XDefaultRootWindow.argtypes = [ctypes.c_void_p]
+        x11.XQueryTree.argtypes = [
+            ctypes.c_void_p, ctypes.c_ulong,
+            ctypes.POINTER(ctypes.c_ulong), ctypes.POINTER(ctypes.c_ulong),
+            ctypes.POINTER(ctypes.POINTER(ctypes.c_ulong)),
+            ctypes.POINTER(ctypes.c_uint)
+        ]
+        x11.XGetWindowAttributes.argtypes = [
+            ctypes.c_void_p, ctypes.c_ulong,
+            ctypes.POINTER(self.XWindowAttributes)
+        ]
+        x11.XFree.argtypes = [ctypes.c_void_p]
+
+    def windows(self) -> list[QRect]:
+        x11 = self.x11
+        display = x11.XOpenDisplay(None)
+        if not display:
+            return []
+
+        root, parent = ctypes.c_ulong(), ctypes.c_ulong()
+        children = ctypes.POINTER(ctypes.c_ulong)()
+        count = ctypes.c_uint()
+        rects = []
+        try:
+            if not x11.XQueryTree(
+                display, x11.XDefaultRootWindow(display),
+                ctypes.byref(root), ctypes.byref(parent),
+                ctypes.byref(children), ctypes.byref(count)
+            ):
+                return []
+
+            attrs = self.XWindowAttributes()
+            for i in range(count.value):
+                if not x11.XGetWindowAttributes(
+                    display, children[i], ctypes.byref(attrs)
+                ):
+                    continue
+                if attrs.map_state != self.IsViewable or \
+                        attrs.width <= 1 or attrs.height <= 1:
+                    continue
+                border = attrs.border_width
+                rects.append(QRect(
+                    attrs.x, attrs.y,
+                    attrs.width + 2*border, attrs.height + 2*border
+                ))
+            if children:
+                x11.XFree(children)
+        finally:
+            x11.XCloseDisplay(display)
+
+        # X11 works in device pixels
+        ratio = QGuiApplication.primaryScreen().devicePixelRatio()
+        if ratio != 1:
+            rects = [QRect(
+                round(r.x()/ratio), round(r.y()/ratio),
+                round(r.width()/ratio), round(r.height()/ratio)
+            ) for r in rects]
+
+        rects.reverse()
+        return rects
+
+
+class Win32WindowProvider(WindowProvider):
+    # EnumWindows walks top-level windows in z-order, topmost first.
+    name = "win32"
+
+    DWMWA_EXTENDED_FRAME_BOUNDS = 9
+    DWMWA_CLOAKED = 14
+
+    @staticmethod
+    def available() -> bool:
+        return sys.platform == "win32"
+
+    def windows(self) -> list[QRect]:
+        from ctypes import wintypes
+
+        user32, dwm = ctypes.windll.user32, ctypes.windll.dwmapi
+        EnumWindowsProc = ctypes.WINFUNCTYPE(
+            wintypes.BOOL, wintypes.HWND, wintypes.LPARAM)
+        user32.EnumWindows.argtypes = [EnumWindowsProc, wintypes.LPARAM]
+        user32.IsWindowVisible.argtypes = [wintypes.HWND]
+        user32.IsIconic.argtypes = [wintypes.HWND]
+        user32.GetWindowRect.argtypes = [wintypes.HWND, ctypes.POINTER(wintypes.RECT)]
+        dwm.DwmGetWindowAttribute.argtypes = [
+            wintypes.HWND, wintypes.DWORD, ctypes.c_void_p, wintypes.DWORD]
+        ratio = QGuiApplication.primaryScreen().devicePixelRatio()
+        rects = []
+
+        def visit(hwnd, _) -> bool:
+            if not user32.IsWindowVisible(hwnd) or user32.IsIconic(hwnd):
+                return True
+
+            cloaked = wintypes.DWORD()
+            dwm.DwmGetWindowAttribute(
+                hwnd, self.DWMWA_CLOAKED,
+                ctypes.byref(cloaked), ctypes.sizeof(cloaked)
+            )
+            if cloaked.value:
+                return True
+
+            # Extended frame bounds exclude the invisible resize borders
+            bounds = wintypes.RECT()
+            if dwm.DwmGetWindowAttribute(
+                hwnd, self.DWMWA_EXTENDED_FRAME_BOUNDS,
+                ctypes.byref(bounds), ctypes.sizeof(bounds)
+            ) != 0 and not user32.GetWindowRect(hwnd, ctypes.byref(bounds)):
+                return True
+
+            left, top = bounds.left, bounds.top
+            right, bottom = bounds.right, bounds.bottom
+            if right - left > 1 and bottom - top > 1:
+                rects.append(QRect(
+                    round(left/ratio), round(top/ratio),
+                    round((right-left)/ratio), round((bottom-top)/ratio)
+                ))
+            return True
+
+        if not user32.EnumWindows(EnumWindowsProc(visit), 0):
+            raise ctypes.WinError()
+        return rects
+
+
+PROVIDERS = [Win32WindowProvider, X11WindowProvider, FakeWindowProvider]
+
+
+def provider() -> WindowProvider:
+    # Selected with the UNISHOT_WINDOW_PROVIDER variable, or the first
+    # native one available.
+    name = os.environ.get("UNISHOT_WINDOW_PROVIDER")
+    for cls in PROVIDERS:
+        if (cls.name == name if name else cls is not FakeWindowProvider) \
+                and cls.available():
+            return cls()
+    return None
+
+
+class WindowIndex():
+    # Buckets window rectangles into a coarse grid, so looking up the window
+    # under the cursor only scans the few windows overlapping that cell.
+    # Windows are added topmost first, so every bucket is in z-order and
+    # the first window containing a point is the one visible there.
+    CELL = 128
+
+    buckets: dict[tuple[int, int], list[QRect]]
+    rects: list[QRect]
+
+    def __init__(self, rects: list[QRect]) -> None:
+        self.rects = rects
+        self.buckets = {}
+        for rect in rects:
+            for cell in self.cells(rect):
+                self.buckets.setdefault(cell, []).append(rect)
+
+    def cells(self, rect: QRect):
+        c = self.CELL
+        for cy in range(rect.top() // c, rect.bottom() // c + 1):
+            for cx in range(rect.left() // c, rect.right() // c + 1):
+                yield (cx, cy)
+
+    def windowAt(self, point: QPoint) -> QRect:
+        bucket = self.buckets.get(
+            (point.x() // self.CELL, point.y() // self.CELL), ()
+        )
+        for rect in bucket:
+            if rect.contains(point):
+                return rect
+        return None
+
+
+def snapEnabled() -> bool:
+    return QSettings().value("selection/windowSnap", True, type=bool)
+
+
+def windowIndex() -> WindowIndex:
+    # Enumerated once per capture, before the overlay is shown.
+    if not snapEnabled():
+        return None
+    prov = provider()
+    if prov is None:
+        return None
+    try:
+        bounds = QGuiApplication.primaryScreen().virtualGeometry()
+        rects = [r.intersected(bounds) for r in prov.windows()]
+        return WindowIndex([r for r in rects if not r.isEmpty()])
+    except OSError:
+        return None  # No snapping to windows this time
@@ -3,17 +3,28 @@ from enum import Enum
 import aenum
 
 from PySide6.QtCore import QPoint, QRect
-from PySide6.QtGui import QPixmap
+from PySide6.QtGui import QPixmap, QImage
 
 
 class Screenshot(NamedTuple):
     Geometry: QRect
-    Pixmap: QPixmap
+    Image: QImage
 
 
 class Drawing(NamedTuple):
     Position: QPoint
     Pixmap: QPixmap
+    # Redactions replace captured pixels and are applied before post effects
+    Redaction: bool = False
+    # What it was drawn from, see Draw.render
+    Stroke: "Stroke" = None
+
+
+class ExportStats(NamedTuple):
+    FileName: str
+    Encoder: str
+    Time: float  # seconds
+    Size: int  # bytes
 
 
 # Ignore duplicate values with aenum
@@ -44,6 +55,28 @@ class DrawTools(Enum):
     Square = "square"
     Ellipse = "circle"
     Text = "text"
+    Pixelate = "pixelate"
+    Blur = "blur"
+
+
+class Stroke(NamedTuple):
+    # The input of a drawing, enough to draw it again
+    Tool: DrawTools
+    Color: int  # QColor.rgba()
+    PenWidth: int
+    Points: list[tuple[int, int]]  # Start and end, every point for brushes
+    Text: str = ""
+    FontSize: float = 0
+
+    def toList(self) -> list:
+        # Plain data for JSON
+        return [self.Tool.value, *self[1:]]
+
+    @classmethod
+    def fromList(cls, data: list) -> "Stroke":
+        tool, color, penWidth, points, *rest = data
+        return cls(DrawTools(tool), color, penWidth,
+                   [tuple(p) for p in points], *rest)
 
 
 class ToolkitButtonTypes(Enum):
@@ -57,6 +90,8 @@ class ToolkitButtonTypes(Enum):
     FlipHor = "flip_hor"
     Color = "color"
     Cursor = "cursor"
+    ScrollCapture = "scroll"
+    Record = "record"
     Separator = "separator"
     DrawBrush = DrawTools.Brush
     DrawLine = DrawTools.Line
@@ -64,3 +99,5 @@ class ToolkitButtonTypes(Enum):
     DrawSquare = DrawTools.Square
     DrawEllipse = DrawTools.Ellipse
     DrawText = DrawTools.Text
+    DrawPixelate = DrawTools.Pixelate
+    DrawBlur = DrawTools.Blur
@@ -0,0 +1,113 @@
+import os
+import sys
+import threading
+import traceback
+from collections import Counter
+from datetime import datetime
+from time import monotonic
+
+from PySide6.QtCore import QObject, QSettings, QStandardPaths, QTimer
+
+
+def enabled() -> bool:
+    return QSettings().value("debug/watchdog", False, type=bool)
+
+
+def thresholdMs() -> int:
+    return max(20, int(QSettings().value("debug/stallMs", 200)))
+
+
+def logPath() -> str:
+    return os.path.join(QStandardPaths.writableLocation(
+        QStandardPaths.StandardLocation.AppLocalDataLocation), "stalls.log")
+
+
+class Watchdog(QObject):
+    # Reports when the event loop stops turning for longer than the
+    # threshold, with where the GUI thread was. A timer on the event loop
+    # keeps a heartbeat, a thread watches it and samples the GUI thread's
+    # Python stack for as long as the heartbeat is late. Once the loop
+    # turns again the stall is logged with its stacks, the most sampled
+    # first, to stdout and stalls.log.
+    #
+    # Both wake up several times per threshold, so it is off by default.
+    MAX_SAMPLES = 100
+
+    timer: QTimer
+    thread: threading.Thread
+    stopping: threading.Event
+    heartbeat: float
+    guiThread: int
+    log: str
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.beat)
+        self.thread = None
+        self.stopping = None
+        self.heartbeat = monotonic()
+        self.guiThread = None
+        self.log = None
+
+    def start(self) -> None:
+        # Also applies changed settings, connected to the options
+        self.stop()
+        if not enabled():
+            return
+        threshold = thresholdMs() / 1000
+        self.guiThread = threading.get_ident()
+        self.log = logPath()
+        self.heartbeat = monotonic()
+        self.timer.start(round(threshold * 1000 / 4))
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(
+            target=self.watch, args=(self.stopping, threshold),
+            name="Watchdog", daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.timer.stop()
+        if self.thread is not None:
+            self.stopping.set()
+            self.thread.join()
+            self.thread = None
+
+    def beat(self) -> None:
+        self.heartbeat = monotonic()
+
+    def watch(self, stopping: threading.Event, threshold: float) -> None:
+        # Runs on the watchdog thread
+        samples = Counter()
+        began = None
+        while not stopping.wait(threshold / 4):
+            last = self.heartbeat
+            if monotonic() - last > threshold:
+                if began is None:
+                    began = last
+                if sum(samples.values()) < self.MAX_SAMPLES:
+                    frame = sys._current_frames().get(self.guiThread)
+                    if frame is not None:
+                        samples["".join(traceback.format_stack(frame))] += 1
+                    frame = None  # Holds every local of the GUI thread
+            elif began is not None:
+                self.report(last - began, samples)
+                samples = Counter()
+                began = None
+
+    def report(self, seconds: float, samples: Counter) -> None:
+        count = sum(samples.values())
+        lines = [f"{datetime.now():%Y-%m-%d %H:%M:%S} Event loop stalled "
+                 f"for {seconds*1000:.0f} ms, {count} samples"]
+        for stack, n in samples.most_common():
+            lines.append(f"  {n}/{count} samples:")
+            lines.append(stack.rstrip("\n"))
+        text = "\n".join(lines) + "\n"
+
+        print(text, end="")
+        try:
+            os.makedirs(os.path.dirname(self.log), exist_ok=True)
+            with open(self.log, "a") as file:
+                file.write(text)
+        except OSError as e:
+            print("Unable to write stall log:", e)
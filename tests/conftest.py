@@ -0,0 +1,31 @@
+import os
+import sys
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from PySide6.QtCore import QSettings, QStandardPaths  # noqa: E402
+from PySide6.QtWidgets import QApplication  # noqa: E402
+
+
+@pytest.fixture(scope="session", autouse=True)
+def app(tmp_path_factory):
+    # Settings and data go to throwaway locations, never the user's
+    QStandardPaths.setTestModeEnabled(True)
+    QSettings.setDefaultFormat(QSettings.Format.IniFormat)
+    QSettings.setPath(QSettings.Format.IniFormat, QSettings.Scope.UserScope,
+                      str(tmp_path_factory.mktemp("settings")))
+    app = QApplication.instance() or QApplication([])
+    app.setOrganizationName("UnishotTests")
+    return app
+
+
+@pytest.fixture(autouse=True)
+def settings():
+    # Every test starts from the defaults
+    settings = QSettings()
+    settings.clear()
+    yield settings
+    settings.clear()
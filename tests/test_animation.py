@@ -0,0 +1,163 @@
+import struct
+import zlib
+
+import pytest
+from PySide6.QtCore import QRect, QSize
+from PySide6.QtGui import QColor, QImage, QImageReader, QPainter
+
+np = pytest.importorskip("numpy")
+
+from screenshot.animation import (  # noqa: E402
+    ApngEncoder, GifEncoder, Palette, Recording, changedRect)
+from screenshot.frame import Frame  # noqa: E402
+
+SIZE = QSize(64, 48)
+COLORS = [QColor(255, 255, 255), QColor(200, 30, 30), QColor(30, 120, 200),
+          QColor(20, 20, 20)]
+
+
+def screens() -> list[QImage]:
+    # A few opaque frames of a handful of colors, so quantizing is exact
+    image = QImage(SIZE, Frame.FORMAT)
+    image.fill(COLORS[0])
+    images = [image]
+    for color, rect in zip(COLORS[1:], [QRect(4, 4, 10, 8), QRect(30, 20, 20, 20),
+                                        QRect(8, 6, 10, 8)]):
+        image = image.copy()
+        painter = QPainter(image)
+        painter.fillRect(rect, color)
+        painter.end()
+        images.append(image)
+    return images
+
+
+def record(images: list[QImage], times: list[float]) -> Recording:
+    # As the recorder keeps them: the first frame whole, then what changed
+    recording = Recording(SIZE)
+    recording.add(images[0].rect(), images[0], times[0])
+    for previous, image, time in zip(images, images[1:], times[1:]):
+        rect = changedRect(previous, image)
+        recording.add(rect, image.copy(rect), time)
+    recording.end = times[-1] + 0.5
+    return recording
+
+
+def chunks(data: bytes) -> list[tuple[bytes, bytes]]:
+    assert data[:8] == b"\x89PNG\r\n\x1a\n"
+    result, offset = [], 8
+    while offset < len(data):
+        length, = struct.unpack_from(">I", data, offset)
+        tag = data[offset + 4:offset + 8]
+        body = data[offset + 8:offset + 8 + length]
+        crc, = struct.unpack_from(">I", data, offset + 8 + length)
+        assert crc == zlib.crc32(body, zlib.crc32(tag))
+        result.append((tag, body))
+        offset += 12 + length
+    return result
+
+
+def test_gif_round_trip(tmp_path):
+    images = screens()
+    path = str(tmp_path / "a.gif")
+    assert GifEncoder().encode(record(images, [0, 0.1, 0.35, 0.4]), path)
+
+    reader = QImageReader(path)
+    assert reader.imageCount() == len(images)
+    delays = []
+    for expected in images:
+        frame = reader.read()
+        assert not frame.isNull(), reader.errorString()
+        assert frame.convertToFormat(Frame.FORMAT) == expected
+        delays.append(reader.nextImageDelay())
+    # Centiseconds, and never shorter than 2/100 s
+    assert delays == [100, 250, 50, 500]
+
+
+def test_apng_round_trip(tmp_path):
+    images = screens()
+    path = str(tmp_path / "a.png")
+    assert ApngEncoder().encode(record(images, [0, 0.1, 0.35, 0.4]), path)
+
+    # Players without APNG support show the first frame
+    assert QImage(path).convertToFormat(Frame.FORMAT) == images[0]
+
+    parsed = chunks(open(path, "rb").read())
+    tags = [tag for tag, _ in parsed]
+    assert tags[0] == b"IHDR" and tags[-1] == b"IEND"
+    body = dict(parsed)
+    assert struct.unpack(">II", body[b"acTL"]) == (len(images), 0)
+    palette = np.frombuffer(body[b"PLTE"], np.uint8).reshape(-1, 3)
+    alpha = np.full(len(palette), 255, np.uint8)
+    alpha[:len(body[b"tRNS"])] = np.frombuffer(body[b"tRNS"], np.uint8)
+
+    # Replays the frames, checking sequence numbers and delays on the way
+    canvas = np.zeros((SIZE.height(), SIZE.width(), 4), np.uint8)
+    sequence, delays, frames = 0, [], []
+    control = None
+    for tag, data in parsed:
+        if tag == b"fcTL":
+            fields = struct.unpack(">IIIIIHHBB", data)
+            assert fields[0] == sequence
+            sequence += 1
+            control = fields
+            delays.append(fields[5] / fields[6])
+        elif tag in (b"IDAT", b"fdAT"):
+            if tag == b"fdAT":
+                assert struct.unpack_from(">I", data)[0] == sequence
+                sequence += 1
+                data = data[4:]
+            _, w, h, x, y, _, _, _, blend = control
+            rows = np.frombuffer(zlib.decompress(data), np.uint8).reshape(h, w + 1)
+            assert not rows[:, 0].any()
+            indices = rows[:, 1:]
+            patch = np.dstack([palette[indices], alpha[indices]])
+            area = canvas[y:y + h, x:x + w]
+            if blend:
+                opaque = patch[..., 3] > 0
+                area[opaque] = patch[opaque]
+            else:
+                area[...] = patch
+            frames.append(canvas.copy())
+
+    assert delays == [0.1, 0.25, 0.05, 0.5]
+    assert len(frames) == len(images)
+    for replayed, expected in zip(frames, images):
+        rgba = expected.convertToFormat(QImage.Format.Format_RGBA8888)
+        pixels = np.frombuffer(rgba.constBits(), np.uint8).reshape(
+            SIZE.height(), SIZE.width(), 4)
+        assert (replayed == pixels).all()
+
+
+def test_long_delays_are_cut_to_16_bits():
+    recording = Recording(SIZE)
+    image = screens()[0]
+    recording.add(image.rect(), image, 0)
+    recording.add(QRect(0, 0, 1, 1), image.copy(0, 0, 1, 1), 1000)
+    recording.end = 1000.001
+    assert recording.delays(100) == [0xFFFF, 1]
+
+
+def test_frames_only_cover_what_changed_once_quantized():
+    images = screens()
+    recording = Recording(SIZE)
+    recording.add(images[0].rect(), images[0], 0)
+    # Recorded whole, though only one rect changed, then not at all
+    recording.add(images[1].rect(), images[1], 0.1)
+    recording.add(images[1].rect(), images[1], 0.2)
+    palette = Palette([patch for _, patch in recording.frames])
+    rects = [rect for rect, _ in ApngEncoder().frames(recording, palette)]
+    assert rects == [images[0].rect(), QRect(4, 4, 10, 8), QRect(0, 0, 1, 1)]
+
+
+def test_gif_restarts_its_code_table(tmp_path):
+    # Long flat runs and noise, enough to fill the table several times
+    rng = np.random.default_rng(0)
+    array = np.full((120, 400, 4), 255, np.uint8)
+    array[20:100, :, :3] = rng.integers(0, 4, (80, 400, 1)) * 60
+    image = QImage(array.data, 400, 120, 1600, Frame.FORMAT).copy()
+    recording = Recording(image.size())
+    recording.add(image.rect(), image, 0)
+    recording.end = 1
+    path = str(tmp_path / "a.gif")
+    assert GifEncoder().encode(recording, path)
+    assert QImage(path).convertToFormat(Frame.FORMAT) == image
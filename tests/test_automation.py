@@ -0,0 +1,103 @@
+from multiprocessing import shared_memory
+
+import pytest
+from PySide6.QtCore import QObject, QRect, QSettings, Signal
+from PySide6.QtGui import QColor, QImage
+
+from instance import automation
+from instance.automation import Automation
+
+
+class Shooter(QObject):
+    # Grabs a solid image the size of the region
+    captured = Signal(QImage, str)
+
+    def grabRegion(self, region: QRect) -> QImage:
+        image = QImage(region.size(), QImage.Format.Format_ARGB32_Premultiplied)
+        image.fill(QColor(10, 20, 30))
+        return image
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(automation, "time", lambda: clock[0])
+    return clock
+
+
+@pytest.fixture
+def auto(app, clock):
+    auto = Automation(Shooter())
+    yield auto
+    auto.close()
+
+
+def listed(auto: Automation) -> list[tuple[int, str]]:
+    return [(c["id"], c["source"]) for c in auto.handle("list", [])["captures"]]
+
+
+def test_fetch_hands_over_rgba_pixels(auto):
+    id = auto.handle("grab", ["0", "0", "3", "2"])["id"]
+    reply = auto.handle("fetch", [str(id)])
+    assert (reply["width"], reply["height"], reply["stride"]) == (3, 2, 12)
+    assert reply["format"] == "RGBA8888"
+    # Attached by name, as a client does
+    segment = shared_memory.SharedMemory(reply["segment"])
+    assert bytes(segment.buf[:4]) == bytes([10, 20, 30, 255])
+    segment.close()
+    # Fetched again from the same segment
+    assert auto.handle("fetch", [str(id)])["segment"] == reply["segment"]
+
+
+def test_unknown_capture(auto):
+    with pytest.raises(ValueError):
+        auto.handle("fetch", ["42"])
+    with pytest.raises(ValueError):
+        auto.handle("grab", ["1", "2"])
+
+
+def test_grabs_are_kept_apart_from_the_history(auto):
+    # No screenshots are kept by default, grabs still are
+    a = auto.handle("grab", [])["id"]
+    b = auto.handle("grab", [])["id"]
+    assert auto.record(QImage(4, 4, QImage.Format.Format_RGB32), "copy") is None
+    QSettings().setValue("automation/recentCaptures", 1)
+    c = auto.record(QImage(4, 4, QImage.Format.Format_RGB32), "copy")
+    d = auto.record(QImage(4, 4, QImage.Format.Format_RGB32), "save")
+    assert listed(auto) == [(a, "automation"), (b, "automation"), (d, "save")]
+    assert c not in auto.captures
+
+
+def test_released_grabs_go(auto):
+    a = auto.handle("grab", [])["id"]
+    auto.handle("fetch", [str(a)])
+    auto.handle("release", [str(a)])
+    assert listed(auto) == []
+    assert not auto.segments
+
+
+def test_released_screenshots_stay_listed(auto):
+    QSettings().setValue("automation/recentCaptures", 2)
+    id = auto.record(QImage(4, 4, QImage.Format.Format_RGB32), "copy")
+    auto.handle("fetch", [str(id)])
+    auto.handle("release", [str(id)])
+    assert listed(auto) == [(id, "copy")]
+    assert not auto.segments
+
+
+def test_grabs_expire(auto, clock):
+    QSettings().setValue("automation/grabSeconds", 10)
+    a = auto.handle("grab", [])["id"]
+    assert auto.timer.isActive()
+    clock[0] += 6
+    b = auto.handle("grab", [])["id"]
+    auto.handle("fetch", [str(a)])
+    clock[0] += 5
+    auto.expire()
+    assert listed(auto) == [(b, "automation")]
+    assert not auto.segments
+    # Due when the next grab expires, give or take a coarse timer
+    assert 4000 < auto.timer.remainingTime() < 6000
+    clock[0] += 5
+    auto.expire()
+    assert listed(auto) == []
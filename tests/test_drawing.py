@@ -0,0 +1,24 @@
+from PySide6.QtCore import QRect
+from PySide6.QtGui import QColor
+from PySide6.QtWidgets import QWidget
+
+from screenshot.drawing import Draw
+from screenshot.viewport import Viewport
+from typings import DrawTools, Stroke
+
+
+def test_brush_canvas_covers_its_points(app):
+    parent = QWidget()
+    parent.resize(100, 80)
+    draw = Draw(parent, Viewport())
+    # Reaches well past the widget, as on a zoomed out frame
+    points = [(300, 200), (340, 260), (900, 230)]
+    drawing = draw.render(Stroke(DrawTools.Brush, QColor(255, 0, 0).rgba(), 4, points))
+    margin = 4 * 2.5
+    assert drawing.Position == QRect(300 - margin, 200 - margin,
+                                     601 + 2*margin, 61 + 2*margin)
+    assert drawing.Pixmap.size() == drawing.Position.size()
+    image = drawing.Pixmap.toImage()
+    # The stroke is drawn where its points are, relative to the canvas
+    assert image.pixelColor(340 - 290, 260 - 190).alpha() > 0
+    assert image.pixelColor(5, 5).alpha() == 0
@@ -0,0 +1,48 @@
+import pytest
+from PySide6.QtGui import QColor, QImage, QPainter
+
+np = pytest.importorskip("numpy")
+
+from screenshot.edges import EdgeMap  # noqa: E402
+from screenshot.frame import Frame  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def edges() -> EdgeMap:
+    # A light panel from (100, 50) to (299, 199) on a dark background, and
+    # a faint one that is not an edge
+    image = QImage(400, 300, Frame.FORMAT)
+    image.fill(QColor(30, 30, 30))
+    painter = QPainter(image)
+    painter.fillRect(100, 50, 200, 150, QColor(230, 230, 230))
+    painter.fillRect(320, 50, 40, 150, QColor(40, 40, 40))
+    painter.end()
+    return EdgeMap(image)
+
+
+def test_borders_snap_to_the_nearest_edge(edges):
+    # Boundary x lies between pixels x-1 and x
+    assert edges.snapX(95, 60, 190) == 100
+    assert edges.snapX(304, 60, 190) == 300
+    assert edges.snapY(53, 110, 290) == 50
+    assert edges.snapY(196, 110, 290) == 200
+
+
+def test_nothing_to_snap_to_in_range(edges):
+    assert edges.snapX(80, 60, 190) == 80
+    assert edges.snapX(95, 60, 190, radius=3) == 95
+
+
+def test_faint_edges_are_ignored(edges):
+    assert edges.snapX(318, 60, 190) == 318
+
+
+def test_edge_must_cover_most_of_the_span(edges):
+    # Along 0-280, the panel's left edge only covers rows 50-199
+    assert edges.snapX(97, 0, 280) == 97
+    assert edges.snapX(97, 0, 280, minStrength=0.5) == 100
+
+
+def test_spans_off_the_image_are_clamped(edges):
+    assert edges.snapX(98, -100, 1000, minStrength=0.3) == 100
+    assert edges.snapY(202, 110, 5000) == 200
@@ -0,0 +1,123 @@
+import os
+
+import pytest
+from PySide6.QtCore import QRect, QSettings
+from PySide6.QtGui import QColor, QImage, QPainter
+
+from screenshot.export import (
+    Exporter, JpegEncoder, PalettePngEncoder, PngEncoder, StripComposer,
+    StripPngEncoder, encoderFor)
+from screenshot.frame import Frame
+
+
+def capture() -> QImage:
+    image = QImage(300, 200, Frame.FORMAT)
+    image.fill(QColor(20, 40, 60))
+    painter = QPainter(image)
+    for i in range(0, 300, 15):
+        painter.fillRect(i, (i * 7) % 200, 15, 40, QColor(i % 256, 200, 255 - i % 256))
+    painter.fillRect(200, 20, 60, 60, QColor(255, 255, 255, 100))
+    painter.end()
+    return image
+
+
+def patch(width: int, height: int, color: QColor) -> QImage:
+    image = QImage(width, height, Frame.FORMAT)
+    image.fill(QColor(0, 0, 0, 0))
+    painter = QPainter(image)
+    painter.fillRect(2, 2, width - 4, height - 4, color)
+    painter.end()
+    return image
+
+
+def composer(flip=(1, 1)) -> StripComposer:
+    return StripComposer(
+        Frame(capture()), QRect(20, 10, 250, 170), flip,
+        [(QRect(40, 30, 50, 40), patch(50, 40, QColor(255, 0, 0, 180)))],
+        [(QRect(100, 100, 80, 30), patch(80, 30, QColor(0, 0, 0)))],
+    )
+
+
+def decoded(path: str) -> QImage:
+    return QImage(path).convertToFormat(Frame.FORMAT)
+
+
+@pytest.mark.parametrize("flip", [(1, 1), (-1, 1), (1, -1), (-1, -1)])
+def test_strips_match_the_whole_screenshot(monkeypatch, flip):
+    expected = composer(flip).compose()
+    monkeypatch.setattr(StripComposer, "STRIP_BYTES", 250 * 4 * 7)
+    strips = list(composer(flip).strips())
+    assert len(strips) > 20
+    top = 0
+    for strip in strips:
+        assert strip == expected.copy(0, top, strip.width(), strip.height())
+        top += strip.height()
+    assert top == expected.height()
+
+
+def test_streamed_png_matches_a_normal_encode(tmp_path, monkeypatch):
+    monkeypatch.setattr(StripComposer, "STRIP_BYTES", 250 * 4 * 16)
+    normal, streamed = str(tmp_path / "a.png"), str(tmp_path / "b.png")
+    assert PngEncoder().encode(composer((-1, 1)).compose(), normal)
+    assert StripPngEncoder().encode(composer((-1, 1)), streamed)
+    assert decoded(streamed) == decoded(normal)
+
+
+def test_encoder_choice():
+    assert type(encoderFor("a.png")) is PngEncoder
+    assert type(encoderFor("a.PNG", 20_000_000)) is StripPngEncoder
+    assert type(encoderFor("a.jpg")) is JpegEncoder
+    QSettings().setValue("export/palettePng", True)
+    assert type(encoderFor("a.png")) is PalettePngEncoder
+    QSettings().setValue("export/palettePng", False)
+    QSettings().setValue("export/streamedMegapixels", 0)
+    assert type(encoderFor("a.png", 20_000_000)) is PngEncoder
+
+
+def test_palette_png_is_exact_for_few_colors(tmp_path):
+    image = QImage(64, 64, Frame.FORMAT)
+    image.fill(QColor(10, 200, 30))
+    image.setPixelColor(5, 7, QColor(250, 0, 100))
+    path = str(tmp_path / "a.png")
+    assert PalettePngEncoder().encode(image, path)
+    assert QImage(path).format() == QImage.Format.Format_Indexed8
+    assert decoded(path) == image
+
+
+def test_exporter_reports_stats(tmp_path, app):
+    path = str(tmp_path / "a.jpg")
+    exporter = Exporter()
+    finished = []
+    exporter.finished.connect(finished.append)
+    exporter.save(capture(), path)
+    exporter.wait()
+    app.processEvents()
+    stats, = finished
+    assert stats.FileName == path
+    assert stats.Encoder == "JPEG"
+    assert stats.Size == os.path.getsize(path) > 0
+    assert stats.Time >= 0
+
+
+def test_failed_export_leaves_nothing(tmp_path, app):
+    path = str(tmp_path / "a.png")
+    exporter = Exporter()
+    failed = []
+    exporter.failed.connect(failed.append)
+    exporter.save(QImage(), path)
+    exporter.wait()
+    app.processEvents()
+    assert failed == [path]
+    assert not os.path.exists(path)
+
+
+@pytest.mark.parametrize("reserved", [True, False])
+def test_failed_export_removes_only_reserved_files(tmp_path, app, reserved):
+    # An empty file is someone else's unless the caller reserved it
+    path = str(tmp_path / "a.png")
+    open(path, "xb").close()
+    exporter = Exporter()
+    exporter.save(QImage(), path, reserved=reserved)
+    exporter.wait()
+    app.processEvents()
+    assert os.path.exists(path) != reserved
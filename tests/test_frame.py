@@ -0,0 +1,84 @@
+import gc
+import weakref
+
+import pytest
+from PySide6.QtCore import QRect
+from PySide6.QtGui import QColor, QImage, QPainter
+
+from screenshot.frame import Frame
+
+
+def capture() -> QImage:
+    image = QImage(200, 100, Frame.FORMAT)
+    image.fill(QColor(10, 20, 30))
+    image.setPixelColor(50, 40, QColor(200, 100, 0))
+    return image
+
+
+def test_views_share_the_frame_pixels():
+    frame = Frame(capture())
+    view = frame.view(QRect(40, 30, 20, 20))
+    assert view.size() == QRect(40, 30, 20, 20).size()
+    assert view.pixelColor(10, 10) == QColor(200, 100, 0)
+    assert view == capture().copy(40, 30, 20, 20)
+
+
+def test_painting_a_view_leaves_the_frame_untouched():
+    frame = Frame(capture())
+    view = frame.view(QRect(40, 30, 20, 20))
+    painter = QPainter(view)
+    painter.fillRect(view.rect(), QColor(255, 0, 0))
+    painter.end()
+    assert view.pixelColor(10, 10) == QColor(255, 0, 0)
+    assert frame.image() == capture()
+    assert frame.view(QRect(40, 30, 20, 20)).pixelColor(10, 10) == QColor(200, 100, 0)
+
+
+def test_painting_the_image_leaves_the_frame_untouched():
+    frame = Frame(capture())
+    image = frame.image()
+    image.fill(QColor(0, 0, 255))
+    image.setPixelColor(0, 0, QColor(255, 255, 255))
+    assert frame.image() == capture()
+    assert frame.view(QRect(0, 0, 1, 1)).pixelColor(0, 0) == QColor(10, 20, 30)
+
+
+def test_views_keep_the_frame_alive():
+    frame = Frame(capture())
+    alive = weakref.ref(frame)
+    view = frame.view(QRect(40, 30, 20, 20))
+    image = frame.image()
+    del frame
+    gc.collect()
+    assert alive() is not None
+    del view
+    gc.collect()
+    assert alive() is not None
+    del image
+    gc.collect()
+    assert alive() is None
+
+
+def test_views_outside_the_frame_are_clipped():
+    frame = Frame(capture())
+    assert frame.view(QRect(190, 90, 50, 50)).size() == QRect(0, 0, 10, 10).size()
+    assert frame.view(QRect(300, 0, 10, 10)).isNull()
+    assert frame.view(QRect(60, 50, -20, -20)) == capture().copy(40, 30, 20, 20)
+
+
+def test_buffer_is_read_only():
+    frame = Frame(capture())
+    buffer = frame.buffer()
+    assert buffer.readonly
+    assert buffer.nbytes == frame.sizeInBytes()
+
+
+def test_array_of_a_rect():
+    np = pytest.importorskip("numpy")
+    frame = Frame(capture())
+    array = frame.array(QRect(40, 30, 20, 20))
+    assert array.shape == (20, 20, 4)
+    assert not array.flags.writeable
+    # BGRA on little endian
+    assert list(array[10, 10]) == [0, 100, 200, 255]
+    assert np.all(array[0, 0] == [30, 20, 10, 255])
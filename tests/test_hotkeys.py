@@ -0,0 +1,95 @@
+import sys
+
+import pytest
+from PySide6.QtCore import QSettings
+
+import hotkeys
+from hotkeys import FakeHotkeyBackend, HotkeyManager, PollHotkeyBackend, keyCombination
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    monkeypatch.setenv("UNISHOT_HOTKEY_BACKEND", "fake")
+    clock = [100.0]
+    monkeypatch.setattr(hotkeys, "monotonic", lambda: clock[0])
+    manager = HotkeyManager()
+    manager.clock = clock
+    yield manager
+    manager.stop()
+
+
+def test_bindings_come_from_the_settings(manager):
+    QSettings().setValue("hotkeys/region", "Ctrl+F9")
+    manager.start()
+    assert isinstance(manager.backend, FakeHotkeyBackend)
+
+    activated = []
+    manager.activated.connect(activated.append)
+    manager.backend.press("Print")
+    manager.backend.press("Ctrl+F9")
+    manager.backend.press("Ctrl+Print")
+    assert activated == ["capture", "region"]
+
+
+def test_repeated_presses_are_debounced(manager):
+    manager.start()
+    activated = []
+    manager.activated.connect(activated.append)
+    manager.backend.press("Print")
+    manager.clock[0] += HotkeyManager.DEBOUNCE / 2
+    manager.backend.press("Print")
+    manager.backend.press("Shift+Print")
+    manager.clock[0] += HotkeyManager.DEBOUNCE
+    manager.backend.press("Print")
+    assert activated == ["capture", "repeat", "capture"]
+
+
+class GlobalHotkeys:
+    # Records what the poll backend asks of the global_hotkeys package
+    def __init__(self) -> None:
+        self.calls = []
+        self.hotkeys = []
+
+    def register_hotkey(self, key, modifiers, callback) -> None:
+        self.hotkeys.append((key, modifiers, callback))
+
+    def clear_hotkeys(self) -> None:
+        self.hotkeys = []
+
+    def start_checking_hotkeys(self) -> None:
+        self.calls.append("start")
+
+    def stop_checking_hotkeys(self) -> None:
+        self.calls.append("stop")
+
+
+def test_poll_backend_runs_a_single_checker(monkeypatch):
+    package = GlobalHotkeys()
+    monkeypatch.setitem(sys.modules, "global_hotkeys", package)
+    backend = PollHotkeyBackend()
+    bindings = {"capture": keyCombination("Print")}
+    backend.register(bindings)
+    backend.register({"region": keyCombination("Ctrl+Shift+F9")})
+    assert package.calls == ["start"]
+    assert [h[:2] for h in package.hotkeys] == [
+        ("print_screen", []), ("f9", ["control", "shift"])]
+
+    pressed = []
+    backend.pressed.connect(pressed.append)
+    package.hotkeys[0][2]()
+    assert pressed == ["capture"]
+
+    backend.unregister()
+    backend.register(bindings)
+    backend.close()
+    assert package.calls == ["start", "stop", "start", "stop"]
+    assert package.hotkeys == []
+
+
+def test_bindings_not_grabbed_are_reported(manager, monkeypatch):
+    monkeypatch.setattr(FakeHotkeyBackend, "register", lambda self, bindings: ["region"])
+    QSettings().setValue("hotkeys/region", "Ctrl+F9")
+    failed = []
+    manager.failed.connect(failed.append)
+    manager.start()
+    assert failed == ["Ctrl+F9 (region)"]
@@ -0,0 +1,76 @@
+import os
+import shutil
+
+import pytest
+from PySide6.QtCore import QRect, QSettings, Qt
+from PySide6.QtGui import QColor, QImage, QPainter
+
+from screenshot.export import StripComposer
+from screenshot.frame import Frame
+from screenshot.imagefile import LazyDecoder, openImageFile
+
+
+@pytest.fixture
+def jpeg(tmp_path):
+    # 1.2 megapixels, decoded lazily from 1
+    QSettings().setValue("open/lazyMegapixels", 1)
+    image = QImage(1000, 1200, QImage.Format.Format_RGB32)
+    painter = QPainter(image)
+    for y in range(0, image.height(), 50):
+        painter.fillRect(0, y, image.width(), 50, QColor(y % 256, 255 - y % 256, 90))
+    painter.end()
+    path = str(tmp_path / "a.jpg")
+    image.save(path, quality=95)
+    return path
+
+
+def reference(path: str) -> QImage:
+    return QImage(path).convertToFormat(Frame.FORMAT)
+
+
+def test_small_files_are_decoded_at_once(jpeg):
+    QSettings().setValue("open/lazyMegapixels", 16)
+    frame = openImageFile(jpeg)
+    assert frame.loader is None
+    assert frame.image() == reference(jpeg)
+
+
+def test_views_wait_for_their_rows(jpeg):
+    frame = openImageFile(jpeg)
+    assert isinstance(frame.loader, LazyDecoder)
+    rect = QRect(100, 900, 300, 200)
+    assert frame.view(rect) == reference(jpeg).copy(rect)
+    assert frame.image() == reference(jpeg)
+    assert not frame.loader.missing
+
+
+def test_requests_do_not_wait(jpeg):
+    frame = openImageFile(jpeg)
+    assert not frame.request(frame.rect())
+    frame.load()
+    assert frame.request(frame.rect())
+
+
+def test_failed_rows_are_retried(jpeg, tmp_path):
+    copy = str(tmp_path / "b.jpg")
+    shutil.copy(jpeg, copy)
+    frame = openImageFile(copy)
+    os.remove(copy)
+
+    rect = QRect(0, 0, 10, 10)
+    frame.load(rect)
+    assert 0 in frame.loader.missing
+
+    shutil.copy(jpeg, copy)
+    frame.load(rect)
+    assert 0 not in frame.loader.missing
+    assert frame.view(rect) == reference(jpeg).copy(rect)
+
+
+def test_strips_of_a_lazy_frame(jpeg, monkeypatch):
+    # Each strip waits for its own rows
+    monkeypatch.setattr(StripComposer, "STRIP_BYTES", 600 * 4 * 40)
+    frame = openImageFile(jpeg)
+    selection = QRect(100, 50, 600, 300)
+    composer = StripComposer(frame, selection, (1, -1), [])
+    assert composer.compose() == reference(jpeg).copy(selection).flipped(Qt.Orientation.Vertical)
@@ -0,0 +1,84 @@
+import sys
+import threading
+import time
+
+import pytest
+from PySide6.QtCore import QEvent
+
+import instance
+from instance import client, frame, parseArgs, unframe
+from instance.server import InstanceServer
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="Unix sockets")
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch, app):
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    server = InstanceServer()
+    assert server.listen()
+    yield server
+    # Sockets go before the server, which would delete them mid-signal
+    pump(app, lambda: not server.buffers)
+    app.sendPostedEvents(None, QEvent.Type.DeferredDelete)
+    server.server.close()
+
+
+def pump(app, until, timeout=5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not until() and time.monotonic() < deadline:
+        app.processEvents()
+        time.sleep(0.005)
+
+
+def test_parse_args(tmp_path, monkeypatch):
+    assert parseArgs([]) == []
+    assert parseArgs(["region"]) == ["region"]
+    assert parseArgs(["bogus"]) is None
+    assert parseArgs(["open"]) is None
+    monkeypatch.chdir(tmp_path)
+    assert parseArgs(["open", "a.png"]) == ["open", str(tmp_path / "a.png")]
+
+
+def test_framing():
+    buffer = frame(b"capture") + frame(b"open\0/a b.png") + frame(b"par")[:5]
+    first, buffer = unframe(buffer)
+    second, buffer = unframe(buffer)
+    assert (first, second) == (b"capture", b"open\0/a b.png")
+    assert unframe(buffer) == (None, buffer)
+
+
+def test_commands_are_forwarded(server, app):
+    received = []
+    server.command.connect(lambda name, args: received.append((name, args)))
+    assert InstanceServer.running()
+    assert instance.send(["open", "/tmp/a b.png"])
+    assert instance.send(["bogus"])
+    assert instance.send(["copy"])
+    pump(app, lambda: len(received) == 2)
+    assert received == [("open", ["/tmp/a b.png"]), ("copy", [])]
+
+
+def test_second_server_does_not_listen(server):
+    assert not InstanceServer().listen()
+
+
+def test_nothing_to_forward_to(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    assert not InstanceServer.running()
+    assert not instance.send(["capture"])
+
+
+def test_requests_are_answered_while_the_loop_runs(server, app):
+    # The client blocks on its reply, so it runs on a thread of its own
+    class Echo:
+        def handle(self, request, args):
+            return {"request": request, "args": args}
+    server.automation = Echo()
+    replies = []
+    thread = threading.Thread(
+        target=lambda: replies.append(client.request("list", 7)))
+    thread.start()
+    pump(app, lambda: replies)
+    thread.join()
+    assert replies == [{"request": "list", "args": ["7"]}]
@@ -0,0 +1,160 @@
+import os
+
+import pytest
+from PySide6.QtCore import QRect
+from PySide6.QtGui import QColor, QImage
+
+from screenshot.drawing import PostEffects
+from screenshot.frame import Frame
+from screenshot.journal import Journal
+from screenshot.project import Project, ProjectEncoder, load
+from typings import DrawTools, Stroke
+
+STROKE = Stroke(DrawTools.Arrow, QColor(255, 0, 0).rgba(), 3, [(1, 2), (30, 40)])
+
+
+@pytest.fixture
+def journal(tmp_path, monkeypatch):
+    monkeypatch.setattr(Journal, "directory", staticmethod(lambda: str(tmp_path)))
+    journal = Journal()
+    yield journal
+    journal.wait()
+
+
+def capture() -> QImage:
+    image = QImage(40, 30, Frame.FORMAT)
+    image.fill(QColor(10, 120, 200))
+    image.setPixelColor(3, 4, QColor(255, 255, 0))
+    return image
+
+
+def operate(journal: Journal) -> None:
+    effects = PostEffects()
+    effects.toggleFlip(x=True)
+    effects.setAngle(90)
+    journal.change("add", STROKE)
+    journal.selection(QRect(2, 3, 20, 10))
+    journal.change("undo", STROKE)
+    journal.change("redo", STROKE)
+    journal.effects(effects)
+
+
+OPERATIONS = [
+    ("add", STROKE),
+    ("selection", QRect(2, 3, 20, 10)),
+    ("undo", None),
+    ("redo", None),
+    ("effects", (-1, 1, 90)),
+]
+
+
+def test_round_trip(journal):
+    journal.start(Frame(capture()), QRect(-40, 10, 40, 30))
+    operate(journal)
+    journal.close()
+    journal.wait()
+
+    session = Journal.read(journal.sessionPath())
+    assert session.Geometry == QRect(-40, 10, 40, 30)
+    assert session.Image == capture()
+    assert session.Path is None
+    assert session.Operations == OPERATIONS
+
+
+def test_nothing_written_before_the_first_operation(journal):
+    journal.start(Frame(capture()), QRect(0, 0, 40, 30))
+    journal.close()
+    journal.wait()
+    assert not os.path.exists(journal.sessionPath())
+
+
+def test_discard_removes_the_session(journal):
+    journal.start(Frame(capture()), QRect(0, 0, 40, 30))
+    operate(journal)
+    journal.discard()
+    journal.wait()
+    assert not os.path.exists(journal.sessionPath())
+
+
+def test_record_cut_short_is_ignored(journal):
+    journal.start(Frame(capture()), QRect(0, 0, 40, 30))
+    operate(journal)
+    journal.close()
+    journal.wait()
+    size = os.path.getsize(journal.sessionPath())
+    os.truncate(journal.sessionPath(), size - 1)
+    assert Journal.read(journal.sessionPath()).Operations == OPERATIONS[:-1]
+
+
+def test_mapped_capture_is_journaled_by_path(journal, tmp_path):
+    path = str(tmp_path / "a.unishot")
+    frame = Frame(capture())
+    ProjectEncoder().encode(Project(frame.rect(), frame, QRect(), (1, 1, 0), [], []), path)
+    journal.start(load(path).Frame, QRect(5, 5, 40, 30))
+    operate(journal)
+    journal.close()
+    journal.wait()
+
+    session = Journal.read(journal.sessionPath())
+    assert session.Path == path
+    assert session.Image is None
+    assert session.Geometry == QRect(5, 5, 40, 30)
+    assert os.path.getsize(journal.sessionPath()) < 1000
+
+
+def test_interrupted_session_is_restored_once(journal):
+    journal.start(Frame(capture()), QRect(0, 0, 40, 30))
+    operate(journal)
+    journal.wait()  # Left open, as a crash would
+
+    restarted = Journal()
+    assert restarted.recovered
+    session = restarted.restore()
+    assert session.Image == capture()
+    assert session.Operations == OPERATIONS
+    assert restarted.restore() is None
+
+
+def test_damaged_session_raises_and_is_kept(journal):
+    journal.start(Frame(capture()), QRect(0, 0, 40, 30))
+    operate(journal)
+    journal.wait()
+    with open(journal.sessionPath(), "r+b") as file:
+        file.write(b"garbage")
+
+    restarted = Journal()
+    with pytest.raises(ValueError):
+        restarted.restore()
+    assert restarted.interrupted()
+
+
+class Full:
+    # A file on a disk that fills up: one write gets partly through
+    def __init__(self, file, after: int) -> None:
+        self.file = file
+        self.after = after
+
+    def write(self, data: bytes) -> None:
+        self.after -= 1
+        if self.after == 0:
+            self.file.write(data[:3])
+            raise OSError(28, "No space left on device")
+        self.file.write(data)
+
+    def flush(self) -> None:
+        self.file.flush()
+
+    def close(self) -> None:
+        self.file.close()
+
+
+def test_failed_write_ends_the_journal(journal):
+    journal.start(Frame(capture()), QRect(0, 0, 40, 30))
+    journal.begin()
+    journal.wait()
+    journal.file = Full(journal.file, 2)
+    operate(journal)
+    journal.wait()
+    assert journal.file is None
+    # Nothing is appended after the record cut short
+    assert Journal.read(journal.sessionPath()).Operations == OPERATIONS[:1]
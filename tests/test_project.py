@@ -0,0 +1,75 @@
+import pytest
+from PySide6.QtCore import QRect
+from PySide6.QtGui import QColor, QImage, QPainter
+
+from screenshot.frame import Frame
+from screenshot.project import Project, ProjectEncoder, load
+from typings import DrawTools, Stroke
+
+
+def capture() -> QImage:
+    image = QImage(120, 90, Frame.FORMAT)
+    image.fill(QColor(30, 60, 90))
+    painter = QPainter(image)
+    painter.fillRect(10, 20, 50, 30, QColor(250, 200, 10))
+    painter.fillRect(70, 5, 20, 70, QColor(10, 200, 120, 128))
+    painter.end()
+    return image
+
+
+def project(frame: Frame, selection=QRect(5, 6, 60, 40)) -> Project:
+    return Project(
+        QRect(-120, 40, frame.width(), frame.height()),
+        frame,
+        selection,
+        (-1, 1, 90),
+        [Stroke(DrawTools.Square, QColor(255, 0, 0).rgba(), 3, [(10, 10), (40, 30)]),
+         Stroke(DrawTools.Text, QColor(0, 0, 255).rgba(), 2, [(50, 50)], "Hi", 14.5)],
+        [Stroke(DrawTools.Pixelate, QColor(0, 0, 0).rgba(), 4, [(0, 0), (20, 20)])],
+    )
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "a.unishot")
+    saved = project(Frame(capture()))
+    assert ProjectEncoder().encode(saved, path)
+
+    loaded = load(path)
+    assert loaded.Geometry == saved.Geometry
+    assert loaded.Selection == saved.Selection
+    assert loaded.Effects == saved.Effects
+    assert loaded.Drawings == saved.Drawings
+    assert loaded.Undone == saved.Undone
+    # Mapped straight from the file
+    assert loaded.Frame.source == path
+    assert loaded.Frame.image() == capture()
+
+
+def test_resave_in_place(tmp_path):
+    path = str(tmp_path / "a.unishot")
+    ProjectEncoder().encode(project(Frame(capture())), path)
+
+    loaded = load(path)
+    changed = loaded._replace(Selection=QRect(1, 2, 3, 4), Drawings=[])
+    assert ProjectEncoder().encode(changed, path)
+
+    again = load(path)
+    assert again.Selection == QRect(1, 2, 3, 4)
+    assert again.Drawings == []
+    assert again.Frame.image() == capture()
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "a.unishot"
+    path.write_bytes(b"\x89PNG\r\n\x1a\n" + bytes(100))
+    with pytest.raises(ValueError):
+        load(str(path))
+
+
+def test_rejects_truncated_files(tmp_path):
+    path = tmp_path / "a.unishot"
+    ProjectEncoder().encode(project(Frame(capture())), str(path))
+    data = path.read_bytes()
+    path.write_bytes(data[:len(data) // 2])
+    with pytest.raises(ValueError):
+        load(str(path))
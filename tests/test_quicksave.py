@@ -0,0 +1,100 @@
+import os
+from datetime import datetime
+
+import pytest
+from PySide6.QtCore import QRect, QSettings
+from PySide6.QtGui import QGuiApplication
+
+from screenshot import quicksave
+
+
+class Now(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return cls(2024, 5, 17, 14, 3, 59)
+
+
+@pytest.fixture(autouse=True)
+def now(monkeypatch):
+    monkeypatch.setattr(quicksave, "datetime", Now)
+
+
+@pytest.fixture
+def folder(tmp_path):
+    QSettings().setValue("quicksave/folder", str(tmp_path))
+    return tmp_path
+
+
+def onScreen(width=500, height=400) -> QRect:
+    return QRect(QGuiApplication.primaryScreen().geometry().topLeft(),
+                 QRect(0, 0, width, height).size())
+
+
+def test_default_template():
+    assert quicksave.expand(quicksave.DEFAULT_TEMPLATE, onScreen(), 1) == \
+        "Screenshot 2024-05-17 14-03-59.png"
+
+
+def test_fields():
+    name = quicksave.expand("{counter:04} s{screen} {width}x{height}",
+                            onScreen(500, 400), 7)
+    assert name == "0007 s1 500x400.png"
+
+
+def test_folders_and_extension_are_kept():
+    assert quicksave.expand("{date}/{time}.jpg", onScreen(), 1) == \
+        "2024-05-17/14-03-59.jpg"
+
+
+def test_screen_is_0_off_every_screen():
+    assert quicksave.expand("{screen}", QRect(-100000, -100000, 10, 10), 1) == "0.png"
+
+
+@pytest.mark.parametrize("template", ["{bogus}", "{counter", "{0}", "{counter:x"])
+def test_invalid_templates(template):
+    with pytest.raises(ValueError):
+        quicksave.expand(template, onScreen(), 1)
+
+
+def test_next_file_name_never_overwrites(folder):
+    QSettings().setValue("quicksave/template", "shot")
+    first = quicksave.nextFileName(onScreen())
+    second = quicksave.nextFileName(onScreen())
+    assert first == os.path.join(folder, "shot.png")
+    assert second == os.path.join(folder, "shot (2).png")
+    assert os.path.exists(first) and os.path.exists(second)
+
+
+def test_invalid_template_falls_back_to_default(folder):
+    QSettings().setValue("quicksave/template", "{bogus}")
+    assert quicksave.nextFileName(onScreen()) == \
+        os.path.join(folder, "Screenshot 2024-05-17 14-03-59.png")
+
+
+def test_counter(folder):
+    QSettings().setValue("quicksave/template", "{counter}")
+    QSettings().setValue("quicksave/counter", 5)
+    saved = quicksave.nextFileName(onScreen())
+    quicksave.release(saved, True)
+    failed = quicksave.nextFileName(onScreen())
+    assert (saved, failed) == (os.path.join(folder, "5.png"), os.path.join(folder, "6.png"))
+
+    # A failed save hands its number back
+    quicksave.release(failed, False)
+    assert int(QSettings().value("quicksave/counter")) == 6
+
+    # Unless a later save already took the next one
+    first = quicksave.nextFileName(onScreen())
+    quicksave.nextFileName(onScreen())
+    quicksave.release(first, False)
+    assert int(QSettings().value("quicksave/counter")) == 8
+
+
+def test_unwritable_folder_raises(folder):
+    # A file where the folder should be
+    blocker = folder / "blocker"
+    blocker.write_bytes(b"")
+    QSettings().setValue("quicksave/folder", str(blocker / "shots"))
+    with pytest.raises(OSError):
+        quicksave.nextFileName(onScreen())
+    assert QSettings().value("quicksave/counter") is None
@@ -0,0 +1,95 @@
+import pytest
+from PySide6.QtCore import QRect
+from PySide6.QtGui import QColor, QImage, QPainter
+
+from screenshot import redaction
+from screenshot.frame import Frame
+from screenshot.viewport import TilePyramid
+
+
+def capture() -> QImage:
+    # Vertical stripes, 3 pixels wide, so no block or blur keeps them
+    image = QImage(600, 400, Frame.FORMAT)
+    image.fill(QColor(0, 0, 0))
+    painter = QPainter(image)
+    for x in range(0, 600, 6):
+        painter.fillRect(x, 0, 3, 400, QColor(240, 180, 60))
+    painter.end()
+    return image
+
+
+def colors(image: QImage) -> set[int]:
+    return {image.pixel(x, y) for y in range(image.height()) for x in range(image.width())}
+
+
+@pytest.fixture(params=[True, False], ids=["numpy", "qt"])
+def numpy(request, monkeypatch):
+    if not request.param:
+        monkeypatch.setattr(redaction, "np", None)
+    elif redaction.np is None:
+        pytest.skip("numpy is not installed")
+
+
+def test_block_sizes_are_powers_of_two():
+    assert [redaction.blockSize(s) for s in (1, 2, 5, 6, 10, 16, 100, 1000)] == \
+        [2, 2, 4, 8, 8, 16, 64, 64]
+
+
+def test_aligned_rect_sits_on_the_block_grid():
+    bounds = QRect(0, 0, 100, 50)
+    assert redaction.alignedRect(QRect(5, 9, 10, 10), 8, bounds) == QRect(0, 8, 16, 16)
+    assert redaction.alignedRect(QRect(90, 40, 10, 10), 16, bounds) == QRect(80, 32, 20, 18)
+
+
+def test_pixelate_averages_each_block(numpy):
+    rect = QRect(13, 21, 100, 60)
+    image = redaction.pixelate(capture(), rect, 8)
+    assert image.size() == rect.size()
+    # Blocks are anchored at the image origin, not at the rect
+    blocks = {}
+    for y in range(image.height()):
+        for x in range(image.width()):
+            key = ((rect.left() + x) // 8, (rect.top() + y) // 8)
+            blocks.setdefault(key, set()).add(image.pixel(x, y))
+    assert all(len(block) == 1 for block in blocks.values())
+    assert len(colors(image)) < len(blocks)
+
+
+def test_pixelate_is_clipped_to_the_image(numpy):
+    assert redaction.pixelate(capture(), QRect(580, 390, 50, 50), 16).size() == \
+        QRect(580, 390, 20, 10).size()
+    assert redaction.pixelate(capture(), QRect(700, 0, 10, 10), 16).isNull()
+
+
+def test_blur_hides_detail(numpy):
+    rect = QRect(100, 100, 60, 40)
+    image = redaction.blur(capture(), rect, 6)
+    assert image.size() == rect.size()
+    middle = image.copy(20, 10, 20, 20)
+    # Stripes going from 0 to 240 blur into a band near their mean
+    red = {QColor(p).red() for p in colors(middle)}
+    assert max(red) - min(red) < 100
+
+
+def test_blur_leaves_flat_color_alone():
+    image = QImage(100, 80, Frame.FORMAT)
+    image.fill(QColor(30, 90, 200))
+    blurred = redaction.blur(image, QRect(10, 10, 50, 40), 5)
+    assert colors(blurred) == {QColor(30, 90, 200).rgba()}
+
+
+def test_previews_match_their_final_form():
+    frame = Frame(capture())
+    pyramid = TilePyramid(frame)
+    rect = QRect(200, 260, 300, 120)  # Across tiles
+    preview = redaction.previewPixelate(pyramid, rect, 8)
+    assert preview.size() == rect.size()
+    final = redaction.pixelate(frame.image(), rect, 8)
+    for x, y in [(0, 0), (150, 60), (299, 119)]:
+        a, b = QColor(preview.pixel(x, y)), QColor(final.pixel(x, y))
+        assert abs(a.red() - b.red()) < 16 and abs(a.green() - b.green()) < 16
+
+    preview = redaction.previewBlur(pyramid, rect, 10)
+    assert preview.size() == rect.size()
+    red = {QColor(p).red() for p in colors(preview.copy(20, 20, 200, 80))}
+    assert max(red) - min(red) < 100
@@ -0,0 +1,102 @@
+from PySide6.QtCore import QRect
+from PySide6.QtGui import QColor, QImage, QPainter
+
+from screenshot.capture import FakeCaptureBackend
+from screenshot.frame import Frame
+from screenshot.scrolling import ScrollStitcher, findShift, staticRows
+
+REGION = QRect(0, 0, 320, 240)
+
+
+def page(height: int) -> QImage:
+    # What the fake desktop shows from its top, as tall as asked
+    image = FakeCaptureBackend().render(
+        QRect(REGION.x(), REGION.y(), REGION.width(), height), 0)
+    return image.convertToFormat(Frame.FORMAT)
+
+
+def withFooter(image: QImage, rows: int) -> QImage:
+    # A sticky footer drawn over the bottom rows, the same in every grab
+    image = image.convertToFormat(Frame.FORMAT)
+    painter = QPainter(image)
+    painter.fillRect(0, image.height() - rows, image.width(), rows,
+                     QColor(200, 30, 30))
+    painter.fillRect(10, image.height() - rows + 4, 40, 8, QColor(0, 0, 0))
+    painter.end()
+    return image
+
+
+def test_find_shift_scrolled_down():
+    previous = list(range(100))
+    current = previous[30:] + list(range(1000, 1030))
+    assert findShift(previous, current) == 30
+
+
+def test_find_shift_scrolled_up():
+    previous = list(range(100, 200))
+    current = list(range(80, 100)) + previous[:80]
+    assert findShift(previous, current) == -20
+
+
+def test_find_shift_unchanged():
+    rows = list(range(50))
+    assert findShift(rows, list(rows)) == 0
+
+
+def test_find_shift_repeated_rows_do_not_vote():
+    # Blank rows match everywhere, only the unique ones place the grab
+    previous = [0] * 40 + list(range(1, 11))
+    current = [0] * 35 + list(range(1, 11)) + [0] * 5
+    assert findShift(previous, current) == 5
+
+
+def test_find_shift_needs_enough_votes():
+    previous = list(range(100))
+    current = [99, 98] + list(range(1000, 1098))
+    assert findShift(previous, current) is None
+    assert findShift(previous, list(range(1000, 1100))) is None
+
+
+def test_static_rows():
+    assert staticRows([1, 2, 3, 9, 9], [4, 5, 6, 9, 9]) == 2
+    assert staticRows([1, 2, 3], [4, 5, 6]) == 0
+
+
+def test_stitcher_rebuilds_the_page():
+    backend = FakeCaptureBackend(scroll=40)
+    stitcher = ScrollStitcher()
+    assert stitcher.add(backend.grab([REGION])[0]) == REGION.height()
+    for _ in range(5):
+        assert stitcher.add(backend.grab([REGION])[0]) == 40
+    assert stitcher.result() == page(REGION.height() + 5 * 40)
+
+
+def test_stitcher_skips_grabs_that_did_not_scroll():
+    backend = FakeCaptureBackend(scroll=0)
+    stitcher = ScrollStitcher()
+    stitcher.add(backend.grab([REGION])[0])
+    assert stitcher.add(backend.grab([REGION])[0]) == 0
+    assert stitcher.result() == page(REGION.height())
+
+
+def test_stitcher_keeps_a_sticky_footer_once():
+    backend = FakeCaptureBackend(scroll=30)
+    stitcher = ScrollStitcher()
+    for _ in range(4):
+        stitcher.add(withFooter(backend.grab([REGION])[0], 20))
+
+    # The page as it scrolled by above the footer, then the footer
+    content = REGION.height() - 20 + 3 * 30
+    expected = withFooter(page(content + 20), 20)
+    assert stitcher.result() == expected
+
+
+def test_stitcher_waits_for_a_grab_that_fits():
+    backend = FakeCaptureBackend(scroll=40)
+    stitcher = ScrollStitcher()
+    stitcher.add(backend.grab([REGION])[0])
+    unrelated = QImage(REGION.size(), Frame.FORMAT)
+    unrelated.fill(QColor(10, 20, 30))
+    assert stitcher.add(unrelated) is None
+    assert stitcher.add(backend.grab([REGION])[0]) == 40
+    assert stitcher.result() == page(REGION.height() + 40)
@@ -0,0 +1,96 @@
+import pytest
+from PySide6.QtCore import QPoint, QPointF, QRect, QSize
+from PySide6.QtGui import QColor, QImage
+
+from screenshot.frame import Frame
+from screenshot.viewport import TilePyramid, Viewport
+
+
+def frame(width=2000, height=1000) -> Frame:
+    image = QImage(width, height, Frame.FORMAT)
+    image.fill(QColor(40, 80, 120))
+    return Frame(image)
+
+
+@pytest.fixture
+def viewport(app) -> Viewport:
+    viewport = Viewport()
+    viewport.setFrame(frame(), QSize(800, 600))
+    return viewport
+
+
+def test_zoom_keeps_the_point_under_the_cursor(viewport):
+    at = QPointF(300, 200)
+    before = viewport.toImage(at)
+    viewport.zoom(2, at)
+    assert viewport.scale == 2
+    assert viewport.toImage(at) == before
+    viewport.zoom(1 / 1.25, at)
+    assert viewport.toImage(at) == before
+
+
+def test_zoom_is_limited(viewport):
+    for _ in range(100):
+        viewport.zoom(Viewport.STEP)
+    assert viewport.scale == Viewport.MAX_SCALE
+    for _ in range(100):
+        viewport.zoom(1 / Viewport.STEP)
+    assert viewport.scale == Viewport.MIN_SCALE
+
+
+def test_larger_image_always_fills_the_view(viewport):
+    viewport.pan(QPointF(500, 500))
+    assert viewport.offset == QPointF(0, 0)
+    viewport.pan(QPointF(-5000, -5000))
+    # 2000x1000 against 800x600
+    assert viewport.offset == QPointF(-1200, -400)
+
+
+def test_smaller_image_stays_inside_the_view(viewport):
+    viewport.zoom(0.25, QPointF(0, 0))
+    # 500x250 against 800x600
+    viewport.pan(QPointF(-100, -100))
+    assert viewport.offset == QPointF(0, 0)
+    viewport.pan(QPointF(5000, 5000))
+    assert viewport.offset == QPointF(300, 350)
+
+
+def test_changes_are_signalled_once(viewport):
+    changes = []
+    viewport.changed.connect(lambda: changes.append(1))
+    viewport.pan(QPointF(10, 10))  # Clamped back, nothing changes
+    viewport.zoom(2)
+    viewport.zoom(1)
+    assert len(changes) == 1
+
+
+def test_view_and_image_space(viewport):
+    viewport.zoom(2, QPointF(0, 0))
+    viewport.pan(QPointF(-100, -50))
+    assert viewport.toView(viewport.toImage(QPointF(123, 45))) == QPointF(123, 45)
+    assert viewport.toImage(QPointF(100, 50)) == QPointF(100, 50)
+    # The nearest pixel boundary
+    assert viewport.imagePoint(QPointF(100.8, 50.8)) == QPoint(100, 50)
+    assert viewport.imagePoint(QPointF(101.2, 51.2)) == QPoint(101, 51)
+    # Every image pixel a view rect touches
+    assert viewport.imageRect(QRect(100, 50, 3, 3)) == QRect(100, 50, 2, 2)
+    assert viewport.imageRect(QRect(101, 51, 2, 2)) == QRect(100, 50, 2, 2)
+
+
+def test_pyramid_levels():
+    pyramid = TilePyramid(frame(2000, 1000))
+    assert pyramid.levels() == 3  # 2000 / 256 needs three halvings
+    assert pyramid.levelFor(2) == 0
+    assert pyramid.levelFor(1) == 0
+    assert pyramid.levelFor(0.5) == 1
+    assert pyramid.levelFor(0.3) == 1
+    assert pyramid.levelFor(1 / 32) == 3
+
+
+def test_pyramid_tiles_are_cached_once_decoded():
+    pyramid = TilePyramid(frame(2000, 1000))
+    tile = pyramid.tile(1, 3, 1)
+    # The last tile of the level is cut at the frame's edge
+    assert tile.size() == QSize(1000 - 3*256, 500 - 256)
+    assert pyramid.tile(1, 3, 1) is tile
+    assert tile.pixelColor(0, 0) == QColor(40, 80, 120)
@@ -0,0 +1,38 @@
+from PySide6.QtCore import QPoint, QRect
+
+from screenshot.windows import FakeWindowProvider, WindowIndex
+
+DIALOG = QRect(300, 200, 200, 150)
+EDITOR = QRect(100, 100, 900, 700)
+DESKTOP = QRect(0, 0, 1920, 1080)
+
+
+def test_topmost_window_under_the_point():
+    # Topmost first, as providers list them
+    index = WindowIndex([DIALOG, EDITOR, DESKTOP])
+    assert index.windowAt(QPoint(350, 250)) == DIALOG
+    assert index.windowAt(QPoint(150, 150)) == EDITOR
+    assert index.windowAt(QPoint(1500, 900)) == DESKTOP
+
+
+def test_a_larger_window_on_top_hides_smaller_ones():
+    index = WindowIndex([EDITOR, DIALOG])
+    assert index.windowAt(QPoint(350, 250)) == EDITOR
+
+
+def test_nothing_outside_every_window():
+    index = WindowIndex([DIALOG, EDITOR])
+    assert index.windowAt(QPoint(50, 50)) is None
+    assert index.windowAt(QPoint(-500, 5000)) is None
+
+
+def test_windows_spanning_cells():
+    wide = QRect(0, 0, 10 * WindowIndex.CELL, 10)
+    index = WindowIndex([wide])
+    for x in range(0, wide.width(), 37):
+        assert index.windowAt(QPoint(x, 5)) == wide
+
+
+def test_fake_provider():
+    rects = [DIALOG, EDITOR]
+    assert FakeWindowProvider(rects).windows() == rects